@@ -2,12 +2,24 @@ from langchain_core.prompts import ChatPromptTemplate
 from agents.state import AgentState
 from config import get_settings
 from agents.utils import get_llm
+from agents.intent import classify_intent, tier_for_intent
+from agents.fallbacks import remaining_budget, templated_reply, complete_sentences
+from agents.sentence_stream import SentenceStreamer
+from services.reply_cache import reply_cache
+from services.semantic_cache import semantic_cache
+from services.single_flight import single_flight, fingerprint
+import asyncio
 import re
+from typing import Dict, List, Optional
+
+# Text streamed so far by each in-flight LLM call, keyed by prompt fingerprint, so every
+# coalesced caller (not just the one that started the flight) can salvage it at its deadline
+_partials: Dict[str, List[str]] = {}
 
 class ConversationAgent:
     def __init__(self):
         settings = get_settings()
-        self.llm = get_llm()
+        self.settings = settings
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a sentient {species} plant. You are self-aware and perceive your environment through these sensors:
 - Photoelectric Sensor (Ambient Light)
@@ -41,34 +53,85 @@ Priorities: low, medium, high"""),
         ])
 
     async def run(self, state: AgentState):
-        """Legacy run method for full response logic."""
+        """
+        Legacy run method for full response logic.
+        Honors the request deadline in state["deadline"]; result["answer_tier"] reports who answered:
+        cache, semantic_cache, llm, partial (streamed sentences so far) or template.
+        """
         sensor_info = state.get("sensor_analysis") or "Not provided."
         know_info = state.get("plant_knowledge") or "Use general knowledge."
 
-        chain = self.prompt | self.llm
-        response = await chain.ainvoke({
+        # [CACHE] Same species + query + sensor bands -> reuse a recent reply
+        cache_key = reply_cache.make_key(state["species"], state.get("user_query", "Hello"), state.get("sensor_data"))
+        cached = reply_cache.get(cache_key)
+        if cached:
+            print(f"DEBUG: [ReplyCache] HIT for {cache_key}")
+            return dict(cached, answer_tier="cache")
+
+        # [CACHE] Paraphrase of a recently answered question ("are you thirsty" ~ "do you need water")
+        intent = self._intent_for(state)
+        cached = semantic_cache.lookup(cache_key, intent)
+        if cached:
+            return dict(cached, answer_tier="semantic_cache")
+
+        # [BUDGET] Not enough time left for a model round trip -> instant templated reply
+        remaining = remaining_budget(state)
+        if remaining is not None and remaining < self.settings.MIN_LLM_BUDGET_SECONDS:
+            print(f"DEBUG: [Conversation] Only {remaining:.2f}s of budget left, using template")
+            return dict(templated_reply(state), answer_tier="template")
+
+        tier = self._tier_for(state, intent)
+        chain = self.prompt | get_llm(tier)
+        inputs = {
             "species": state["species"],
             "user_query": state.get("user_query", "Hello"),
             "sensor_analysis": sensor_info,
             "plant_knowledge": know_info
-        })
+        }
+        key = fingerprint(tier, sorted(inputs.items()))
+
+        async def generate():
+            parts = _partials[key] = []
+            try:
+                async for chunk in chain.astream(inputs):
+                    parts.append(chunk.content)
+            finally:
+                if _partials.get(key) is parts:
+                    del _partials[key]
+            result = self._parse_output("".join(parts))
+            # Cached even if the caller's deadline already passed, so the next ask is instant
+            reply_cache.put(cache_key, result)
+            semantic_cache.add(cache_key, result, intent)
+            return result
+
+        # Identical concurrent prompts share one LLM call
+        flight = single_flight.do("llm", key, generate)
+        try:
+            result = await asyncio.wait_for(flight, timeout=remaining)
+        except asyncio.TimeoutError:
+            # The stream may belong to another caller's flight - its text so far is shared by fingerprint
+            return self._deadline_result("".join(_partials.get(key, ())), state)
         
-        return self._parse_output(response.content)
+        return dict(result, answer_tier="llm")
+
+    def _deadline_result(self, partial: str, state: AgentState):
+        """Best answer available when the budget runs out mid-generation."""
+        if "Reply:" in partial:
+            parsed = self._parse_output(partial)
+            spoken = complete_sentences(parsed["conversation_response"])
+            if spoken:
+                print(f"DEBUG: [Conversation] Deadline hit, returning partial reply ({len(spoken)} chars)")
+                return dict(parsed, conversation_response=spoken, answer_tier="partial")
+        print("DEBUG: [Conversation] Deadline hit before a full sentence, using template")
+        return dict(templated_reply(state), answer_tier="template")
 
     async def stream_run(self, state: AgentState):
-        """Streaming version of the agent logic. Yields sentences as they arrive."""
+        """Streaming version of the agent logic. Yields metadata, then sentences as they arrive."""
         sensor_info = state.get("sensor_analysis") or "Not provided."
         know_info = state.get("plant_knowledge") or "Use general knowledge."
 
-        chain = self.prompt | self.llm
-        
-        full_content = ""
-        meta_captured = False
-        mood = "neutral"
-        priority = "low"
-        
-        # Buffer to catch the metadata before sentences start
-        buffer = ""
+        chain = self.prompt | self._llm_for(state)
+        streamer = SentenceStreamer()
         
         async for chunk in chain.astream({
             "species": state["species"],
@@ -76,41 +139,26 @@ Priorities: low, medium, high"""),
             "sensor_analysis": sensor_info,
             "plant_knowledge": know_info
         }):
-            content = chunk.content
-            full_content += content
-            buffer += content
-            
-            # 1. Capture Metadata (Mood/Priority) if not yet done
-            if not meta_captured and "Reply:" in buffer:
-                # Try to extract metadata before the "Reply:" tag
-                meta_part = buffer.split("Reply:")[0]
-                mood_match = re.search(r"Mood:\s*(\w+)", meta_part, re.I)
-                pri_match = re.search(r"Priority:\s*(\w+)", meta_part, re.I)
-                
-                if mood_match: mood = mood_match.group(1).lower()
-                if pri_match: priority = pri_match.group(1).lower()
-                
-                # yield the metadata first as a special dict
-                yield {"type": "metadata", "mood": mood, "priority": priority}
-                
-                # Strip metadata from buffer to start looking for sentences
-                buffer = buffer.split("Reply:")[1]
-                meta_captured = True
-            
-            # 2. Yield sentences as they finish
-            if meta_captured:
-                # Look for sentence boundaries
-                sentences = re.split(r'(?<=[.!?])\s+', buffer)
-                if len(sentences) > 1:
-                    # yield everything except the last (potentially incomplete) one
-                    for s in sentences[:-1]:
-                        if s.strip():
-                            yield {"type": "sentence", "text": s.strip()}
-                    buffer = sentences[-1]
+            for event in streamer.feed(chunk.content):
+                yield event
 
         # Yield any remaining text in buffer
-        if buffer.strip():
-            yield {"type": "sentence", "text": buffer.strip()}
+        for event in streamer.finish():
+            yield event
+
+    def _intent_for(self, state: AgentState) -> str:
+        """The routed intent, or a local keyword guess if the router didn't run."""
+        return state.get("intent_tag") or classify_intent(state.get("user_query", ""))
+
+    def _tier_for(self, state: AgentState, intent: Optional[str] = None) -> str:
+        """Picks the model tier from the routed intent."""
+        intent = intent or self._intent_for(state)
+        tier = tier_for_intent(intent)
+        print(f"DEBUG: [Conversation] Intent {intent} -> {tier} model")
+        return tier
+
+    def _llm_for(self, state: AgentState):
+        return get_llm(self._tier_for(state))
 
     def _parse_output(self, content: str):
         """Helper to parse the pipe-separated format."""
@@ -0,0 +1,48 @@
+import re
+import time
+from typing import Optional
+from agents.state import AgentState
+
+def start_budget(seconds: float) -> Optional[float]:
+    """Returns an absolute deadline (time.monotonic based) for a request, or None if budgets are disabled."""
+    return time.monotonic() + seconds if seconds and seconds > 0 else None
+
+def remaining_budget(state: AgentState) -> Optional[float]:
+    """Seconds left before the request's deadline (None = unbounded)."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def bounded_timeout(state: AgentState, timeout: float) -> float:
+    """The smaller of a node's own timeout and what is left of the request budget."""
+    remaining = remaining_budget(state)
+    return timeout if remaining is None else min(timeout, remaining)
+
+def complete_sentences(text: str) -> str:
+    """Cuts a partially streamed reply back to its last finished sentence ('' if none finished yet)."""
+    ends = [m.end() for m in re.finditer(r"[.!?](?=\s|$)", text)]
+    return text[:ends[-1]].strip() if ends else ""
+
+def templated_reply(state: AgentState) -> dict:
+    """Instant, LLM-free species reply driven by the current sensor readings."""
+    species = state.get("species") or "plant"
+    sensors = state.get("sensor_data") or {}
+    moisture = sensors.get("moisture")
+    temperature = sensors.get("temperature")
+    light = sensors.get("light")
+
+    if moisture is not None and moisture < 20.0:
+        text, mood, priority = f"I'm your {species}, and I'm parched! Could you give me a drink, please?", "thirsty", "high"
+    elif moisture is not None and moisture > 85.0:
+        text, mood, priority = f"Your {species} here. My feet are soaking wet, so let me dry out a little.", "concerned", "medium"
+    elif temperature is not None and temperature > 32.0:
+        text, mood, priority = f"Phew, it's {temperature:.0f} degrees! This {species} could use some shade.", "concerned", "medium"
+    elif temperature is not None and temperature < 10.0:
+        text, mood, priority = f"Brr, {temperature:.0f} degrees is chilly for a {species}. Can you move me somewhere warmer?", "concerned", "medium"
+    elif light is not None and light < 15.0:
+        text, mood, priority = f"It's pretty dark in here. This {species} would love a sunnier spot.", "grumpy", "low"
+    else:
+        text, mood, priority = f"Hi, I'm your {species}! Everything feels just right at the moment.", "happy", "low"
+
+    return {"conversation_response": text, "mood": mood, "priority": priority}
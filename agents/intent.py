@@ -0,0 +1,154 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+INTENT_TAGS = ["IDENTITY", "HEALTH", "KNOWLEDGE", "GREETING", "JOKE", "AMBIGUOUS"]
+
+# Intents a low-latency model answers just as well as the pro model
+SIMPLE_INTENTS = {"GREETING", "JOKE", "AMBIGUOUS"}
+
+# Keyword phrases -> intent evidence. All phrases are compiled into ONE alternation regex,
+# so a query is scanned once no matter how many phrases there are.
+INTENT_PHRASES: Dict[str, List[str]] = {
+    "JOKE": ["joke", "jokes", "funny", "pun", "puns", "make me laugh", "humor", "riddle"],
+    "IDENTITY": [
+        "who are you", "your name", "about yourself", "what are you", "what kind of plant",
+        "where are you from", "where do you come from", "your story", "your origin", "introduce yourself",
+        "call you",
+    ],
+    "HEALTH": [
+        "how are you", "feel", "feeling", "water", "thirsty", "moisture", "light", "sun", "sunlight",
+        "temperature", "temp", "hot", "cold", "hungry", "health", "healthy", "need", "dry", "droopy",
+        "enough", "okay", "doing", "soil",
+    ],
+    "KNOWLEDGE": [
+        "why", "how much", "how often", "ideal", "fertilizer", "fertiliser", "care", "routine",
+        "habitat", "potting", "native", "grow", "prune", "repot", "propagate", "soil type", "advice",
+    ],
+    "GREETING": ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "howdy", "hey plant", "yo"],
+}
+
+# Keywords that mean "this question is about the plant's current state" (used by ingest).
+SENSOR_KEYWORDS = [
+    "light", "moisture", "water", "temperature", "temp", "hungry", "health",
+    "care", "how are you", "routine", "advice", "habitat", "potting", "fertilizer"
+]
+
+def _compile_alternation(phrases) -> "re.Pattern":
+    ordered = sorted(set(phrases), key=len, reverse=True)  # Longest phrase wins at each position
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in ordered) + r")\b", re.I)
+
+_PHRASE_TAGS: Dict[str, List[str]] = {}
+for _tag, _phrases in INTENT_PHRASES.items():
+    for _phrase in _phrases:
+        _PHRASE_TAGS.setdefault(_phrase, []).append(_tag)
+_INTENT_MATCHER = _compile_alternation(_PHRASE_TAGS)
+_SENSOR_MATCHER = re.compile("|".join(re.escape(k) for k in sorted(SENSOR_KEYWORDS, key=len, reverse=True)))
+
+def is_sensor_query(query_text: str) -> bool:
+    """Single-pass substring check for sensor-related keywords."""
+    return bool(query_text) and _SENSOR_MATCHER.search(query_text.lower()) is not None
+
+# Small labelled seed corpus for the linear model (same six tags as RouterAgent).
+TRAINING_DATA: List[Tuple[str, str]] = [
+    ("who are you", "IDENTITY"), ("tell me about yourself", "IDENTITY"), ("what is your name", "IDENTITY"),
+    ("what kind of plant are you", "IDENTITY"), ("where do you come from", "IDENTITY"),
+    ("introduce yourself", "IDENTITY"), ("what's your story", "IDENTITY"), ("what are you", "IDENTITY"),
+    ("what species are you", "IDENTITY"), ("tell me your origin story", "IDENTITY"),
+    ("describe your personality", "IDENTITY"), ("are you a basil plant", "IDENTITY"),
+    ("how are you", "HEALTH"), ("how are you feeling", "HEALTH"), ("do you need water", "HEALTH"),
+    ("are you thirsty", "HEALTH"), ("is the soil too dry", "HEALTH"), ("are you getting enough light", "HEALTH"),
+    ("is it too hot for you", "HEALTH"), ("are you cold", "HEALTH"), ("are you hungry", "HEALTH"),
+    ("how is your health", "HEALTH"), ("are the conditions okay for you", "HEALTH"),
+    ("do you need more sun", "HEALTH"), ("how are you doing today", "HEALTH"), ("are you healthy", "HEALTH"),
+    ("should i water you now", "HEALTH"), ("you look droopy are you ok", "HEALTH"),
+    ("where do cacti come from", "KNOWLEDGE"), ("how often should basil be watered", "KNOWLEDGE"),
+    ("what is the ideal temperature for basil", "KNOWLEDGE"), ("what fertilizer do you like", "KNOWLEDGE"),
+    ("how much sunlight should you be getting", "KNOWLEDGE"), ("what is your native habitat", "KNOWLEDGE"),
+    ("how do i prune you", "KNOWLEDGE"), ("when should i repot you", "KNOWLEDGE"),
+    ("what potting mix is best", "KNOWLEDGE"), ("how do you propagate a spider plant", "KNOWLEDGE"),
+    ("why do leaves turn yellow", "KNOWLEDGE"), ("what is your care routine", "KNOWLEDGE"),
+    ("how fast do you grow", "KNOWLEDGE"), ("give me some care advice", "KNOWLEDGE"),
+    ("how often do succulents need water", "KNOWLEDGE"),
+    ("hello", "GREETING"), ("hi", "GREETING"), ("hey plant", "GREETING"), ("good morning", "GREETING"),
+    ("good evening plant", "GREETING"), ("hey there", "GREETING"), ("howdy", "GREETING"),
+    ("hi buddy", "GREETING"), ("hello my friend", "GREETING"), ("yo plant", "GREETING"),
+    ("good afternoon", "GREETING"), ("hey you", "GREETING"),
+    ("tell me a joke", "JOKE"), ("say something funny", "JOKE"), ("make me laugh", "JOKE"),
+    ("do you know any jokes", "JOKE"), ("tell me a plant pun", "JOKE"), ("got any puns", "JOKE"),
+    ("tell me a funny story", "JOKE"), ("joke please", "JOKE"), ("cheer me up with a joke", "JOKE"),
+    ("give me a riddle", "JOKE"), ("what's the funniest thing you know", "JOKE"),
+    ("hmm", "AMBIGUOUS"), ("what", "AMBIGUOUS"), ("uh", "AMBIGUOUS"), ("banana", "AMBIGUOUS"),
+    ("the thing", "AMBIGUOUS"), ("blue car", "AMBIGUOUS"), ("okay then", "AMBIGUOUS"),
+    ("never mind", "AMBIGUOUS"), ("what time is it", "AMBIGUOUS"), ("play some music", "AMBIGUOUS"),
+    ("i don't know", "AMBIGUOUS"), ("so anyway", "AMBIGUOUS"),
+]
+
+class IntentEngine:
+    """
+    Zero-LLM intent classifier: one compiled alternation regex for keyword evidence plus a
+    softmax linear model over hashed word uni/bigrams, trained on TRAINING_DATA at first use.
+    predict() returns (tag, confidence); callers fall back to the LLM below their threshold.
+    """
+    def __init__(self, dim: int = 1024, epochs: int = 400, learning_rate: float = 0.5, l2: float = 1e-3):
+        self.dim = dim
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def featurize(self, query: str) -> np.ndarray:
+        text = (query or "").lower()
+        words = re.findall(r"[a-z']+", text)
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        feats += [f"p:{tag}" for m in _INTENT_MATCHER.finditer(text) for tag in _PHRASE_TAGS[m.group(0).lower()]]
+        feats.append(f"len:{min(len(words), 4)}")
+
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in feats:
+            vec[zlib.crc32(feat.encode("utf-8")) % self.dim] += 1.0
+        return vec
+
+    def train(self, data: List[Tuple[str, str]] = TRAINING_DATA):
+        x = np.stack([self.featurize(q) for q, _ in data])
+        y = np.zeros((len(data), len(INTENT_TAGS)), dtype=np.float32)
+        for i, (_, tag) in enumerate(data):
+            y[i, INTENT_TAGS.index(tag)] = 1.0
+
+        w = np.zeros((self.dim, len(INTENT_TAGS)), dtype=np.float32)
+        b = np.zeros(len(INTENT_TAGS), dtype=np.float32)
+        for _ in range(self.epochs):
+            probs = self._softmax(x @ w + b)
+            grad = probs - y
+            w -= self.learning_rate * (x.T @ grad / len(data) + self.l2 * w)
+            b -= self.learning_rate * grad.mean(axis=0)
+        self.weights, self.bias = w, b
+
+    def predict(self, query: str) -> Tuple[str, float]:
+        if not (query or "").strip():
+            return "HEALTH", 1.0  # Heartbeat without a query -> health check
+        if self.weights is None:
+            self.train()
+        probs = self._softmax((self.featurize(query) @ self.weights + self.bias)[None, :])[0]
+        best = int(np.argmax(probs))
+        return INTENT_TAGS[best], float(probs[best])
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        z = logits - logits.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+# Global singleton instance
+intent_engine = IntentEngine()
+
+def classify_intent(query: str) -> str:
+    """Local intent guess returning one of the RouterAgent tags."""
+    return intent_engine.predict(query)[0]
+
+def tier_for_intent(intent_tag: str) -> str:
+    """Maps an intent tag to the model tier that should answer it ("fast" or "pro")."""
+    return "fast" if (intent_tag or "AMBIGUOUS") in SIMPLE_INTENTS else "pro"
@@ -45,9 +45,18 @@ Instructions:
 
     def run(self, state: AgentState):
         chain = self.prompt | self.llm
-        response = chain.invoke({
-            "species": state["species"],
-            "sensor_analysis": state.get("sensor_analysis", "No sensor data analysis available."),
-            "user_query": state.get("user_query", "No specific query")
-        })
+        response = chain.invoke(self._inputs(state))
+        return {"plant_knowledge": response.content}
+
+    async def arun(self, state: AgentState):
+        """Non-blocking version of run() for the async graph."""
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke(self._inputs(state))
         return {"plant_knowledge": response.content}
+
+    def _inputs(self, state: AgentState):
+        return {
+            "species": state["species"],
+            "sensor_analysis": state.get("sensor_analysis") or "No sensor data analysis available.",
+            "user_query": state.get("user_query") or "No specific query"
+        }
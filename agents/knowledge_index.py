@@ -0,0 +1,160 @@
+import re
+import time
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Sequence
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from config import get_settings
+from models import get_engine, PlantKnowledge
+
+NO_LOCAL_DATA = "No local data found."
+
+# Common / scientific / sloppy names -> normalized canonical species
+SPECIES_ALIASES = {
+    "sweet basil": "basil",
+    "ocimum basilicum": "basil",
+    "cacti": "cactus",
+    "cactaceae": "cactus",
+    "lavandula": "lavender",
+    "aloe": "aloe vera",
+    "aloevera": "aloe vera",
+    "spider": "spider plant",
+    "chlorophytum comosum": "spider plant",
+    "lily": "peace lily",
+    "spathiphyllum": "peace lily",
+}
+
+def normalize_species(name: str) -> str:
+    """'  Aloe-Vera ' -> 'aloe vera'; aliases resolve to their canonical species."""
+    key = re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).strip()
+    return SPECIES_ALIASES.get(key, key)
+
+def format_know_text(biological_info: str, care_tips: str, lore: str) -> str:
+    """The botanical context fragment injected into agent prompts."""
+    return f"Biology: {biological_info}\nCare: {care_tips}\nLore/Identity: {lore}"
+
+def table_stamp(model, *terms) -> Optional[tuple]:
+    """
+    Cheap change detector for a small reference table: row count, max id and the sum of each term.
+    Lets a process notice writes made elsewhere (e.g. debug/seed_plants.py) without reloading the rows.
+    """
+    try:
+        with Session(get_engine()) as session:
+            return tuple(session.exec(
+                select(func.count(), func.max(model.id), *(func.sum(t) for t in terms)).select_from(model)).one())
+    except Exception as e:
+        print(f"WARNING: [Knowledge] Could not check {model.__tablename__} for changes: {e}")
+        return None
+
+def _knowledge_stamp() -> Optional[tuple]:
+    k = PlantKnowledge
+    return table_stamp(k, func.length(k.species) + func.length(k.biological_info) + func.length(k.care_tips) + func.length(k.lore))
+
+class StampCheck:
+    """Re-reads a table stamp at most every KNOWLEDGE_REFRESH_SECONDS; True when it moved since the last load."""
+    def __init__(self, stamp_fn):
+        self._stamp_fn = stamp_fn
+        self._stamp = None
+        self._checked = 0.0
+
+    def loaded(self, from_database: bool):
+        # Snapshots built from explicit rows (tests, tools) aren't tied to the database
+        self._stamp = self._stamp_fn() if from_database else None
+        self._checked = time.monotonic()
+
+    def changed(self) -> bool:
+        interval = get_settings().KNOWLEDGE_REFRESH_SECONDS
+        if self._stamp is None or interval <= 0 or time.monotonic() - self._checked < interval:
+            return False
+        self._checked = time.monotonic()
+        stamp = self._stamp_fn()
+        return stamp is not None and stamp != self._stamp
+
+class KnowledgeEntry(NamedTuple):
+    species: str
+    biological_info: str
+    care_tips: str
+    lore: str
+    know_text: str
+
+class KnowledgeIndex:
+    """
+    Immutable in-memory snapshot of PlantKnowledge, keyed by normalized species.
+    Voice queries read a precomputed know_text instead of opening a session per request.
+    A commit touching PlantKnowledge invalidates the snapshot; the next lookup rebuilds it
+    and swaps it in whole, so readers never see a half-built index. Writes from other processes
+    are picked up by a periodic table_stamp() check (KNOWLEDGE_REFRESH_SECONDS).
+    """
+    def __init__(self):
+        self._entries: Optional[Mapping[str, KnowledgeEntry]] = None
+        self._check = StampCheck(_knowledge_stamp)
+        self.version = 0  # Bumped on every rebuild so derived indexes (lore passages) know to follow
+
+    def load(self, rows: Optional[Sequence[PlantKnowledge]] = None) -> int:
+        """Builds the index from PlantKnowledge rows (or the database when rows is None)."""
+        self._check.loaded(from_database=rows is None)
+        if rows is None:
+            try:
+                with Session(get_engine()) as session:
+                    rows = session.exec(select(PlantKnowledge)).all()
+            except Exception as e:
+                print(f"WARNING: [KnowledgeIndex] Could not load plant knowledge: {e}")
+                rows = []
+
+        entries = {}
+        for row in rows:
+            key = normalize_species(row.species)
+            if key in entries:
+                continue  # Keep the first row, matching the old .first() lookup
+            entries[key] = KnowledgeEntry(
+                species=row.species,
+                biological_info=row.biological_info,
+                care_tips=row.care_tips,
+                lore=row.lore,
+                know_text=format_know_text(row.biological_info, row.care_tips, row.lore)
+            )
+        self._entries = MappingProxyType(entries)
+        self.version += 1
+        return len(entries)
+
+    def invalidate(self):
+        self._entries = None
+
+    def entries(self) -> Mapping[str, KnowledgeEntry]:
+        """The current snapshot (normalized species -> entry), loading it if needed."""
+        entries = self._entries
+        if entries is None or self._check.changed():
+            self.load()
+            entries = self._entries
+        return entries
+
+    def lookup(self, species: str) -> Optional[KnowledgeEntry]:
+        entries = self.entries()
+        key = normalize_species(species)
+        entry = entries.get(key)
+        if entry is None and key.endswith("s"):
+            entry = entries.get(key[:-1])  # "Cactuses", "Basils"
+        return entry
+
+    def know_text(self, species: str) -> str:
+        entry = self.lookup(species)
+        return entry.know_text if entry else NO_LOCAL_DATA
+
+# Global singleton instance
+knowledge_index = KnowledgeIndex()
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_knowledge_changes(session, flush_context):
+    # new/dirty/deleted still describe what was just flushed at this point
+    if any(isinstance(obj, PlantKnowledge) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["plant_knowledge_changed"] = True
+
+@event.listens_for(OrmSession, "after_commit")
+def _refresh_on_commit(session):
+    if session.info.pop("plant_knowledge_changed", False):
+        knowledge_index.invalidate()
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("plant_knowledge_changed", None)
@@ -0,0 +1,180 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import List, NamedTuple, Optional
+import numpy as np
+from config import get_settings
+from agents.knowledge_index import knowledge_index, normalize_species, NO_LOCAL_DATA
+from services.semantic_cache import HashingTfidfVectorizer
+
+GENERAL_SPECIES = "general"  # Corpus file stem for passages that apply to every species
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class Passage(NamedTuple):
+    species: str   # normalized species key (or GENERAL_SPECIES)
+    label: str     # Biology / Care / Lore/Identity (knowledge rows) or Notes (corpus files)
+    text: str
+
+def split_passages(text: str, max_words: int = 60) -> List[str]:
+    """Groups whole sentences into passages of at most ~max_words words (paragraphs never merge)."""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        current, words = [], 0
+        for sentence in _SENTENCE_END.split(paragraph.strip()):
+            sentence = " ".join(sentence.split())
+            if not sentence:
+                continue
+            n = len(sentence.split())
+            if current and words + n > max_words:
+                passages.append(" ".join(current))
+                current, words = [], 0
+            current.append(sentence)
+            words += n
+        if current:
+            passages.append(" ".join(current))
+    return passages
+
+class LoreStore:
+    """
+    Local passage retrieval for the Conversation Agent prompt.
+    PlantKnowledge fields and any <species>.md/.txt files in LORE_CORPUS_PATH are split into
+    passages, embedded with the offline hashing vectorizer and saved as an IDF-weighted,
+    L2-normalized float32 matrix that is memory-mapped back in. A query costs one mat-vec over
+    the species' rows, so only the top-k passages reach the prompt however large the corpus grows.
+    The on-disk index is reused across restarts while the source passages are unchanged.
+    """
+    def __init__(self, index_path: Optional[str] = None, corpus_path: Optional[str] = None):
+        settings = get_settings()
+        self.index_path = index_path or settings.LORE_INDEX_PATH
+        self.corpus_path = corpus_path if corpus_path is not None else settings.LORE_CORPUS_PATH
+        self.top_k = settings.LORE_TOP_K
+        self.passage_words = settings.LORE_PASSAGE_WORDS
+        self.vectorizer = HashingTfidfVectorizer(settings.LORE_INDEX_DIM)
+
+        self._matrix: Optional[np.ndarray] = None   # np.memmap (rows x dim)
+        self._idf: Optional[np.ndarray] = None
+        self._passages: List[Passage] = []
+        self._rows_by_species = {}
+        self._built_version = None                  # knowledge_index.version the index reflects
+
+    def build(self) -> int:
+        """(Re)builds or reopens the on-disk index from the current knowledge snapshot. Returns the passage count."""
+        entries = knowledge_index.entries()
+        version = knowledge_index.version
+        passages = self._collect(entries)
+        digest = hashlib.sha1(
+            json.dumps([self.vectorizer.dim, passages], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+        if not passages:
+            # Nothing to index (and an empty .npy can't be memory-mapped)
+            self._matrix = np.zeros((0, self.vectorizer.dim), dtype=np.float32)
+            self._idf = np.ones(self.vectorizer.dim, dtype=np.float32)
+            self._passages, self._rows_by_species = [], {}
+            self._built_version = version
+            return 0
+
+        matrix_file, meta_file = self._files()
+        meta = self._read_meta(meta_file)
+        if not (meta and meta.get("digest") == digest and os.path.exists(matrix_file)):
+            self._write(passages, digest, matrix_file, meta_file)
+            meta = self._read_meta(meta_file)
+            print(f"DEBUG: [LoreStore] Embedded {len(passages)} passages")
+
+        self._matrix = np.load(matrix_file, mmap_mode="r")
+        self._idf = np.asarray(meta["idf"], dtype=np.float32)
+        self._passages = [Passage(*p) for p in meta["passages"]]
+        rows = {}
+        for i, p in enumerate(self._passages):
+            rows.setdefault(p.species, []).append(i)
+        self._rows_by_species = {s: np.asarray(r, dtype=np.intp) for s, r in rows.items()}
+        self._built_version = version
+        return len(self._passages)
+
+    def search(self, species: str, query: str, k: Optional[int] = None) -> List[Passage]:
+        """Top-k passages for this species (plus general ones) by cosine similarity to the query."""
+        knowledge_index.entries()  # Reloads (and bumps the version) after a PlantKnowledge commit
+        if self._built_version != knowledge_index.version:
+            self.build()
+        k = k or self.top_k
+
+        key = normalize_species(species)
+        if key not in self._rows_by_species and key.endswith("s"):
+            key = key[:-1]
+        parts = [self._rows_by_species.get(key), self._rows_by_species.get(GENERAL_SPECIES)]
+        parts = [p for p in parts if p is not None]
+        if not parts:
+            return []
+        rows = np.concatenate(parts)
+
+        q = self.vectorizer.transform(query or "") * self._idf
+        q /= max(float(np.linalg.norm(q)), 1e-9)
+        scores = np.asarray(self._matrix[rows] @ q)
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        # Best first; ties keep corpus order so an unmatched query still gets biology/care/lore
+        top = sorted(top, key=lambda i: (-scores[i], rows[i]))
+        return [self._passages[rows[i]] for i in top]
+
+    def context(self, species: str, query: str, k: Optional[int] = None) -> str:
+        """Prompt fragment with only the relevant passages."""
+        passages = self.search(species, query, k)
+        if not passages:
+            return NO_LOCAL_DATA
+        return "\n".join(f"{p.label}: {p.text}" for p in passages)
+
+    def _collect(self, entries) -> List[tuple]:
+        passages = []
+        for key in sorted(entries):
+            entry = entries[key]
+            for label, text in (("Biology", entry.biological_info), ("Care", entry.care_tips), ("Lore/Identity", entry.lore)):
+                passages.extend((key, label, p) for p in split_passages(text, self.passage_words))
+
+        if self.corpus_path and os.path.isdir(self.corpus_path):
+            files = sorted(glob.glob(os.path.join(self.corpus_path, "*.md")) + glob.glob(os.path.join(self.corpus_path, "*.txt")))
+            for path in files:
+                stem = os.path.splitext(os.path.basename(path))[0]
+                key = GENERAL_SPECIES if stem.lower() == GENERAL_SPECIES else normalize_species(stem)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                except OSError as e:
+                    print(f"WARNING: [LoreStore] Could not read {path}: {e}")
+                    continue
+                passages.extend((key, "Notes", p) for p in split_passages(text, self.passage_words))
+        return passages
+
+    def _write(self, passages: List[tuple], digest: str, matrix_file: str, meta_file: str):
+        tf = np.zeros((len(passages), self.vectorizer.dim), dtype=np.float32)
+        for i, (_, _, text) in enumerate(passages):
+            tf[i] = self.vectorizer.transform(text)
+        df = np.count_nonzero(tf, axis=0).astype(np.float32)
+        idf = np.log((1.0 + len(passages)) / (1.0 + df)) + 1.0
+        weighted = tf * idf
+        weighted /= np.maximum(np.linalg.norm(weighted, axis=1, keepdims=True), 1e-9)
+
+        os.makedirs(self.index_path, exist_ok=True)
+        # Write-then-rename so a reader never maps a half-written matrix
+        with open(matrix_file + ".tmp", "wb") as f:
+            np.save(f, weighted.astype(np.float32))
+        os.replace(matrix_file + ".tmp", matrix_file)
+        with open(meta_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"digest": digest, "idf": idf.tolist(), "passages": passages}, f)
+        os.replace(meta_file + ".tmp", meta_file)
+
+    def _files(self):
+        return os.path.join(self.index_path, "passages.npy"), os.path.join(self.index_path, "passages.json")
+
+    @staticmethod
+    def _read_meta(meta_file: str) -> Optional[dict]:
+        try:
+            with open(meta_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+# Global singleton instance
+lore_store = LoreStore()
@@ -1,29 +1,102 @@
+import asyncio
 from langgraph.graph import StateGraph, END
 from agents.state import AgentState
 from agents.conversation_agent import ConversationAgent
-from sqlmodel import Session, select
-from models import get_engine, PlantKnowledge
-
-def fast_find_knowledge(species: str):
-    """Sync check for plant knowledge in local DB."""
-    try:
-        engine = get_engine()
-        with Session(engine) as session:
-            statement = select(PlantKnowledge).where(PlantKnowledge.species == species)
-            return session.exec(statement).first()
-    except Exception:
-        return None
+from agents.router_agent import RouterAgent
+from agents.sensor_agent import SensorAgent
+from agents.knowledge_agent import KnowledgeAgent
+from agents.intent import SIMPLE_INTENTS
+from agents.fallbacks import bounded_timeout
+from agents.sensor_rules import sensor_rules
+from agents.knowledge_index import knowledge_index
+from agents.lore_store import lore_store
+from config import get_settings
+
+def local_knowledge_context(species: str, query: str = None) -> str:
+    """
+    Botanical context without a DB round trip: the passages most relevant to the query,
+    or the whole precomputed knowledge entry when there is no query to rank against.
+    """
+    if query:
+        try:
+            return lore_store.context(species, query)
+        except Exception as e:
+            print(f"WARNING: [Knowledge] Lore retrieval failed ({e}), using full knowledge entry")
+    return knowledge_index.know_text(species)
+
+def _with_timeout(node, timeout: float, fallback, label: str):
+    """Wraps an async node so a slow LLM degrades to local context instead of stalling the graph."""
+    async def run(state: AgentState):
+        try:
+            return await asyncio.wait_for(node(state), timeout=bounded_timeout(state, timeout))
+        except Exception as e:
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+            print(f"DEBUG: [Graph] {label} {reason}, using local context")
+            return fallback(state)
+    return run
+
+def _with_trend(node):
+    """Appends the device's recent trend (ring buffers, no DB query) to the sensor analysis."""
+    async def run(state: AgentState):
+        result = await node(state)
+        from services.recent_readings import recent_readings
+        trend = recent_readings.trend_text(state.get("device_id") or "")
+        if trend and result.get("sensor_analysis"):
+            result = {**result, "sensor_analysis": f"{result['sensor_analysis']} {trend}"}
+        return result
+    return run
+
+async def _local_context(state: AgentState):
+    """Sensor analysis and botanical context from the rule engine and local indexes (no LLM calls)."""
+    return {**sensor_rules.analyze(state["species"], state.get("sensor_data") or {}),
+            "plant_knowledge": local_knowledge_context(state["species"], state.get("user_query"))}
+
+def _route_after_intent(state: AgentState):
+    if state.get("intent_tag") in SIMPLE_INTENTS:
+        return "local_context"
+    return ["analyze_sensors", "find_knowledge"]
 
 def create_pot_graph():
-    # Only one agent needed for the simplified graph to reduce latency
+    """
+    Router -> {Sensor, Knowledge} (concurrently) -> Conversation.
+    Simple intents (greetings/jokes) skip the LLM-backed experts but still get the local sensor
+    analysis and botanical context, and the expert path costs max(sensor, knowledge) rather than their sum.
+    """
+    settings = get_settings()
+    timeout = settings.AGENT_NODE_TIMEOUT_SECONDS
+
+    router = RouterAgent()
+    sensor = SensorAgent()
+    knowledge = KnowledgeAgent()
     digital_soul = ConversationAgent()
-    
+
     workflow = StateGraph(AgentState)
-    
-    # Single node architecture: Interprets context and generates response in one pass
+
+    workflow.add_node("route_intent", _with_timeout(
+        router.arun, timeout, lambda s: {"intent_tag": "AMBIGUOUS"}, "Router"))
+    local_knowledge = lambda s: {"plant_knowledge": local_knowledge_context(s["species"], s.get("user_query"))}
+    workflow.add_node("analyze_sensors", _with_trend(_with_timeout(
+        sensor.arun, timeout, lambda s: sensor_rules.analyze(s["species"], s.get("sensor_data") or {}), "Sensor Agent")))
+    workflow.add_node("find_knowledge", _with_timeout(knowledge.arun, timeout, local_knowledge, "Knowledge Agent")
+                      if settings.KNOWLEDGE_AGENT_USE_LLM else local_knowledge)
+    workflow.add_node("local_context", _with_trend(_local_context))
     workflow.add_node("generate_conversation", digital_soul.run)
-    
-    workflow.set_entry_point("generate_conversation")
+
+    workflow.set_entry_point("route_intent")
+    workflow.add_conditional_edges(
+        "route_intent", _route_after_intent, ["analyze_sensors", "find_knowledge", "local_context"])
+    # Join: conversation waits for both parallel experts
+    workflow.add_edge(["analyze_sensors", "find_knowledge"], "generate_conversation")
+    workflow.add_edge("local_context", "generate_conversation")
     workflow.add_edge("generate_conversation", END)
-    
+
     return workflow.compile()
+
+_pot_graph = None
+
+def pot_graph():
+    """The compiled graph ingest requests run through (built on first use, then shared)."""
+    global _pot_graph
+    if _pot_graph is None:
+        _pot_graph = create_pot_graph()
+    return _pot_graph
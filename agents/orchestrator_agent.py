@@ -3,6 +3,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from agents.state import AgentState
 from config import get_settings
 from agents.utils import get_llm
+from agents.fallbacks import remaining_budget
 
 class ActionAgent:
     def __init__(self):
@@ -26,6 +27,15 @@ Sensor Analysis: {sensor_analysis}
         ])
 
     def run(self, state: AgentState):
+        # [BUDGET] Verification is a luxury - skip it when the request deadline is nearly spent
+        remaining = remaining_budget(state)
+        if remaining is not None and remaining < get_settings().MIN_LLM_BUDGET_SECONDS:
+            return {
+                "reply_text": state.get("conversation_response", ""),
+                "mood": state.get("mood") or "neutral",
+                "priority": state.get("priority") or "low"
+            }
+
         chain = self.prompt | self.llm
         response = chain.invoke({
             "conversation_response": state.get("conversation_response", "No response generated"),
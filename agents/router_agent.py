@@ -2,11 +2,13 @@ from langchain_core.prompts import ChatPromptTemplate
 from agents.state import AgentState
 from config import get_settings
 from agents.utils import get_llm
+from agents.intent import intent_engine, INTENT_TAGS
 
 class RouterAgent:
     def __init__(self):
         settings = get_settings()
-        self.llm = get_llm()
+        self.confidence_threshold = settings.INTENT_CONFIDENCE_THRESHOLD
+        self.llm = get_llm("fast") # Emitting a single tag doesn't need the pro model
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are the Intent Router for a Smart Plant Pot.
 Your job is to categorize the user's query into one of the following tags:
@@ -26,16 +28,37 @@ User Query: {user_query}
         ])
 
     def run(self, state: AgentState):
-        if not state.get("user_query"):
-            return {"intent_tag": "HEALTH"} # Default to health check for heartbeat
+        local = self._local_intent(state)
+        if local:
+            return local
             
         chain = self.prompt | self.llm
         response = chain.invoke({"user_query": state["user_query"]})
-        tag = response.content.strip().upper()
-        
-        # Validation
-        valid_tags = ["IDENTITY", "HEALTH", "KNOWLEDGE", "GREETING", "JOKE", "AMBIGUOUS"]
-        if tag not in valid_tags:
+        return {"intent_tag": self._validate(response.content)}
+
+    async def arun(self, state: AgentState):
+        """Non-blocking version of run() for the async graph."""
+        local = self._local_intent(state)
+        if local:
+            return local
+
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({"user_query": state["user_query"]})
+        return {"intent_tag": self._validate(response.content)}
+
+    def _local_intent(self, state: AgentState):
+        if not state.get("user_query"):
+            return {"intent_tag": "HEALTH"} # Default to health check for heartbeat
+
+        # [LOCAL] Microsecond classifier first; only unsure queries pay for an LLM round trip
+        tag, confidence = intent_engine.predict(state["user_query"])
+        if confidence >= self.confidence_threshold:
+            return {"intent_tag": tag}
+        print(f"DEBUG: [Router] Local intent {tag} too unsure ({confidence:.2f}), asking LLM")
+        return None
+
+    def _validate(self, content: str) -> str:
+        tag = content.strip().upper()
+        if tag not in INTENT_TAGS:
             tag = "AMBIGUOUS"
-            
-        return {"intent_tag": tag}
+        return tag
@@ -2,10 +2,12 @@ from langchain_core.prompts import ChatPromptTemplate
 from agents.state import AgentState
 from config import get_settings
 from agents.utils import get_llm
+from agents.sensor_rules import sensor_rules
 
 class SensorAgent:
     def __init__(self):
         settings = get_settings()
+        self.use_llm = settings.SENSOR_AGENT_USE_LLM
         self.llm = get_llm()
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a Sensor Analysis Agent for a smart plant pot.
@@ -17,6 +19,20 @@ Current data: {sensor_data}
         ])
 
     def run(self, state: AgentState):
+        rules = sensor_rules.analyze(state["species"], state["sensor_data"])
+        if not self.use_llm:
+            return rules
+
         chain = self.prompt | self.llm
         response = chain.invoke({"sensor_data": state["sensor_data"]})
-        return {"sensor_analysis": response.content}
+        return {"sensor_analysis": response.content, "sensor_severity": rules["sensor_severity"]}
+
+    async def arun(self, state: AgentState):
+        """Non-blocking version of run() for the async graph."""
+        rules = sensor_rules.analyze(state["species"], state["sensor_data"])
+        if not self.use_llm:
+            return rules
+
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({"sensor_data": state["sensor_data"]})
+        return {"sensor_analysis": response.content, "sensor_severity": rules["sensor_severity"]}
@@ -0,0 +1,174 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlmodel import Session, select
+from models import get_engine, PlantKnowledge, PlantIdealRange
+from agents.knowledge_index import StampCheck, normalize_species, table_stamp
+
+CHANNELS = ["temperature", "moisture", "light"]
+UNITS = {"temperature": "C", "moisture": "%", "light": "%"}
+SEVERITIES = ["ok", "warning", "critical"]
+
+# Used when a species has no knowledge row (or a channel can't be parsed)
+DEFAULT_RANGES = {"temperature": (15.0, 30.0), "moisture": (30.0, 70.0), "light": (30.0, 80.0)}
+
+# Care-tip phrases -> (min, max) on the 0-100% sensor scales. First match wins, so specific phrases go first.
+MOISTURE_PHRASES = [
+    ("bone dry", (5.0, 35.0)),
+    ("drought tolerant", (10.0, 40.0)),
+    ("well-drained", (15.0, 45.0)),
+    ("infrequently", (15.0, 50.0)),
+    ("slightly moist", (30.0, 60.0)),
+    ("consistently moist", (40.0, 75.0)),
+    ("humidity", (40.0, 75.0)),
+    ("moist", (35.0, 70.0)),
+]
+LIGHT_PHRASES = [
+    ("low to medium", (15.0, 55.0)),
+    ("bright, indirect", (40.0, 75.0)),
+    ("bright indirect", (40.0, 75.0)),
+    ("indirect", (25.0, 65.0)),
+    ("full sun", (60.0, 100.0)),
+    ("direct light", (60.0, 100.0)),
+    ("hours of sun", (55.0, 100.0)),
+]
+_TEMP_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\s*°?\s*C", re.I)
+
+# How far outside the range (as a fraction of the range width) counts as critical
+CRITICAL_FRACTION = 0.25
+
+def parse_ideal_ranges(care_tips: str) -> Dict[str, Tuple[float, float]]:
+    """Parses 'Ideal temp: 21-30C' plus moisture/light phrases into numeric ranges."""
+    text = (care_tips or "").lower()
+    ranges = dict(DEFAULT_RANGES)
+
+    match = _TEMP_PATTERN.search(text)
+    if match:
+        low, high = float(match.group(1)), float(match.group(2))
+        ranges["temperature"] = (min(low, high), max(low, high))
+    for phrase, rng in MOISTURE_PHRASES:
+        if phrase in text:
+            ranges["moisture"] = rng
+            break
+    for phrase, rng in LIGHT_PHRASES:
+        if phrase in text:
+            ranges["light"] = rng
+            break
+    return ranges
+
+def refresh_ideal_ranges(session: Session) -> int:
+    """Re-parses every PlantKnowledge row into PlantIdealRange. Returns the number of species stored."""
+    existing = {r.species: r for r in session.exec(select(PlantIdealRange)).all()}
+    count = 0
+    for knowledge in session.exec(select(PlantKnowledge)).all():
+        ranges = parse_ideal_ranges(knowledge.care_tips)
+        row = existing.get(knowledge.species) or PlantIdealRange(
+            species=knowledge.species, temp_min=0, temp_max=0, moisture_min=0, moisture_max=0, light_min=0, light_max=0)
+        row.temp_min, row.temp_max = ranges["temperature"]
+        row.moisture_min, row.moisture_max = ranges["moisture"]
+        row.light_min, row.light_max = ranges["light"]
+        session.add(row)
+        count += 1
+    session.commit()
+    sensor_rules.invalidate()
+    return count
+
+class SensorRuleEngine:
+    """
+    Deterministic replacement for the Sensor Agent's LLM call.
+    Ideal ranges live in one (species x channel x [min, max]) array, so a whole fleet of
+    readings is scored in a single vectorized pass.
+    """
+    def __init__(self):
+        self._species_index: Optional[Dict[str, int]] = None
+        self._ranges = np.zeros((0, len(CHANNELS), 2), dtype=np.float64)
+        r = PlantIdealRange
+        self._check = StampCheck(lambda: table_stamp(
+            r, r.temp_min + r.temp_max + r.moisture_min + r.moisture_max + r.light_min + r.light_max))
+
+    def load(self, rows: Optional[Sequence[PlantIdealRange]] = None):
+        """Loads ranges from PlantIdealRange rows (or the database when rows is None)."""
+        self._check.loaded(from_database=rows is None)
+        if rows is None:
+            try:
+                with Session(get_engine()) as session:
+                    rows = session.exec(select(PlantIdealRange)).all()
+            except Exception as e:
+                print(f"WARNING: [SensorRules] Could not load ideal ranges: {e}")
+                rows = []
+
+        default = [DEFAULT_RANGES[c] for c in CHANNELS]
+        table = [default]
+        index = {}
+        for row in rows:
+            index[normalize_species(row.species)] = len(table)
+            table.append([(row.temp_min, row.temp_max), (row.moisture_min, row.moisture_max), (row.light_min, row.light_max)])
+        self._ranges = np.asarray(table, dtype=np.float64)
+        self._species_index = index
+
+    def invalidate(self):
+        self._species_index = None
+
+    def ranges_for(self, species: str) -> Dict[str, Tuple[float, float]]:
+        idx = self._indices([species])[0]
+        return {c: (float(self._ranges[idx, i, 0]), float(self._ranges[idx, i, 1])) for i, c in enumerate(CHANNELS)}
+
+    def evaluate(self, species: Sequence[str], readings: np.ndarray):
+        """
+        Scores N readings (N x 3 array of temperature, moisture, light) against each species' ranges.
+        Returns (deviation N x 3 signed fraction of range width, severity N x 3 codes 0/1/2).
+        """
+        readings = np.asarray(readings, dtype=np.float64).reshape(-1, len(CHANNELS))
+        idx = self._indices(species)  # May lazily load, so resolve before touching self._ranges
+        ranges = self._ranges[idx]
+        low, high = ranges[..., 0], ranges[..., 1]
+        width = np.maximum(high - low, 1e-9)
+
+        deviation = (np.minimum(readings - low, 0.0) + np.maximum(readings - high, 0.0)) / width
+        severity = np.where(deviation == 0.0, 0, np.where(np.abs(deviation) < CRITICAL_FRACTION, 1, 2))
+        return deviation, severity
+
+    def analyze(self, species: str, sensor_data: dict) -> dict:
+        """Single-device sensor_analysis text and overall severity."""
+        return self.analyze_fleet([species], [sensor_data])[0]
+
+    def analyze_fleet(self, species: Sequence[str], sensor_data: Sequence[dict]) -> List[dict]:
+        # A channel the anomaly detector held back arrives as None: reported as unavailable, not scored
+        readings = np.array([[np.nan if d.get(c) is None else d[c] for c in CHANNELS] for d in sensor_data],
+                            dtype=np.float64)
+        deviation, severity = self.evaluate(species, readings)
+        missing = np.isnan(readings)
+        severity = np.where(missing, 0, severity)
+        idx = self._indices(species)  # Resolved before touching self._ranges, in case this call reloads
+        ranges = self._ranges[idx]
+
+        results = []
+        for n in range(len(species)):
+            notes = []
+            for i, channel in enumerate(CHANNELS):
+                low, high = ranges[n, i]
+                unit = UNITS[channel]
+                value = readings[n, i]
+                ideal = f"ideal {low:g}-{high:g}{unit}"
+                if missing[n, i]:
+                    notes.append(f"{channel.capitalize()} reading unavailable (sensor fault).")
+                elif severity[n, i] == 0:
+                    notes.append(f"{channel.capitalize()} {value:.1f}{unit} is within the {ideal}.")
+                else:
+                    level = "critically" if severity[n, i] == 2 else "slightly"
+                    direction = "low" if deviation[n, i] < 0 else "high"
+                    notes.append(f"{channel.capitalize()} {value:.1f}{unit} is {level} {direction} ({ideal}).")
+            overall = SEVERITIES[int(severity[n].max())]
+            results.append({
+                "sensor_analysis": f"[{overall.upper()}] " + " ".join(notes),
+                "sensor_severity": overall,
+            })
+        return results
+
+    def _indices(self, species: Sequence[str]) -> np.ndarray:
+        if self._species_index is None or self._check.changed():  # Also catches a re-seed by another process
+            self.load()
+        return np.array([self._species_index.get(normalize_species(s), 0) for s in species], dtype=np.intp)
+
+# Global singleton instance
+sensor_rules = SensorRuleEngine()
@@ -0,0 +1,137 @@
+import re
+from typing import List
+
+TERMINALS = ".!?…"
+CLOSERS = "\"')]”’"
+ABBREVIATIONS = {
+    "dr", "mr", "mrs", "ms", "st", "vs", "approx", "e.g", "i.e", "eg", "ie", "fig",
+    "sp", "spp", "var", "cv", "jr", "sr", "prof", "mt",
+}
+_HEADER_START = re.compile(r"(mood|priority|reply)\b", re.I)
+_HEADER_FIELDS = re.compile(r"^\s*(mood:\s*\w+\s*\|?\s*)?(priority:\s*\w+\s*\|?\s*)?", re.I)
+_REPLY_MARKER = "reply:"
+
+class SentenceStreamer:
+    """
+    Incremental splitter for "Mood: x | Priority: y | Reply: ..." LLM streams.
+    Emits {"type": "metadata"} as soon as the header closes, then {"type": "sentence"} events.
+    Only the unfinished tail is kept in memory and every character is scanned once,
+    so long replies cost O(n) instead of re-splitting the whole buffer per chunk.
+    Decimals ("21.5C"), abbreviations ("Dr. Green") and ellipses followed by lowercase
+    ("Hmm... let me think") do not end a sentence.
+    """
+    def __init__(self):
+        self.mood = "neutral"
+        self.priority = "low"
+        self._buf = ""
+        self._scan = 0           # Next index in _buf to inspect
+        self._in_reply = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        if not chunk:
+            return []
+        self._buf += chunk
+        events = []
+        if not self._in_reply:
+            if not self._close_header():
+                return events
+            events.append(self._metadata())
+        events.extend(self._sentences(final=False))
+        return events
+
+    def finish(self) -> List[dict]:
+        """Flushes whatever is left once the stream ends."""
+        events = []
+        if not self._in_reply:
+            # Header never closed - salvage what we can and speak the rest
+            self._parse_header(self._buf)
+            self._buf = _HEADER_FIELDS.sub("", self._buf, count=1)
+            self._scan = 0
+            self._in_reply = True
+            events.append(self._metadata())
+        events.extend(self._sentences(final=True))
+        tail = self._buf.strip()
+        if tail:
+            events.append({"type": "sentence", "text": tail})
+        self._buf, self._scan = "", 0
+        return events
+
+    def _metadata(self) -> dict:
+        return {"type": "metadata", "mood": self.mood, "priority": self.priority}
+
+    def _parse_header(self, header: str):
+        mood_match = re.search(r"Mood:\s*(\w+)", header, re.I)
+        pri_match = re.search(r"Priority:\s*(\w+)", header, re.I)
+        if mood_match: self.mood = mood_match.group(1).lower()
+        if pri_match: self.priority = pri_match.group(1).lower()
+
+    def _close_header(self) -> bool:
+        """Detects the end of the metadata header; scans only text added since the last call."""
+        start = max(0, self._scan - len(_REPLY_MARKER) + 1)
+        idx = self._buf[start:].lower().find(_REPLY_MARKER)
+        if idx == -1:
+            stripped = self._buf.lstrip()
+            if len(stripped) >= 8 and not _HEADER_START.match(stripped):
+                # The model skipped the header entirely - everything is reply text
+                self._in_reply = True
+                self._scan = 0
+                return True
+            self._scan = len(self._buf)
+            return False
+
+        idx += start
+        self._parse_header(self._buf[:idx])
+        self._buf = self._buf[idx + len(_REPLY_MARKER):]
+        self._scan = 0
+        self._in_reply = True
+        return True
+
+    def _sentences(self, final: bool) -> List[dict]:
+        buf, n = self._buf, len(self._buf)
+        events = []
+        start, i = 0, self._scan
+        while i < n:
+            if buf[i] not in TERMINALS:
+                i += 1
+                continue
+
+            j = i + 1
+            while j < n and (buf[j] in TERMINALS or buf[j] in CLOSERS):
+                j += 1
+            if j >= n and not final:
+                break  # Punctuation at the edge - wait for the next chunk
+            if j < n and not buf[j].isspace():
+                i = j  # "21.5C", "e.g.x" - not a boundary
+                continue
+
+            k = j
+            while k < n and buf[k].isspace():
+                k += 1
+            if k >= n and not final:
+                break  # Need the next word to rule out an ellipsis/abbreviation
+            if k < n and self._false_boundary(buf, start, i, j, k):
+                i = k
+                continue
+
+            text = buf[start:j].strip()
+            if text:
+                events.append({"type": "sentence", "text": text})
+            start = i = k
+
+        if start:
+            self._buf = buf[start:]  # Drop emitted text (no copy while a sentence is still open)
+        self._scan = i - start
+        return events
+
+    @staticmethod
+    def _false_boundary(buf: str, start: int, i: int, j: int, k: int) -> bool:
+        punct = buf[i:j]
+        nxt = buf[k]
+        if nxt.islower():
+            return True  # "Hmm... let me think", "approx. twenty"
+        if punct[0] == "." and (len(punct) == 1 or punct[1] in CLOSERS):
+            word_start = buf.rfind(" ", start, i) + 1
+            word = buf[word_start:i].lower().lstrip("(\"'")
+            if word in ABBREVIATIONS:
+                return True  # "Dr. Green"
+        return False
@@ -7,10 +7,12 @@ class AgentState(TypedDict):
     species: str
     user_query: Optional[str]
     sensor_data: dict # latest readings
+    deadline: Optional[float] # time.monotonic() by which an answer must be ready (None = unbounded)
     
     # intermediate results
     intent_tag: Optional[str]
     sensor_analysis: Optional[str]
+    sensor_severity: Optional[str] # ok | warning | critical (from agents/sensor_rules.py)
     plant_knowledge: Optional[str]
     conversation_response: Optional[str]
     
@@ -18,4 +20,5 @@ class AgentState(TypedDict):
     reply_text: str
     mood: str
     priority: str
+    answer_tier: Optional[str] # cache | semantic_cache | llm | partial | template
     audio_path: Optional[str]
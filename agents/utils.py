@@ -1,18 +1,85 @@
+import time
+from functools import lru_cache
+from typing import Dict
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_google_genai import ChatGoogleGenerativeAI
 from config import get_settings
 
-def get_llm():
+class LLMUsageTracker(BaseCallbackHandler):
+    """Per-tier latency and token accounting, attached as a callback to every tiered LLM."""
+    run_inline = True
+
+    def __init__(self):
+        self.tiers: Dict[str, dict] = {}
+        self._started: Dict[str, tuple] = {}
+
+    def _tier_stats(self, tier: str) -> dict:
+        return self.tiers.setdefault(tier, {
+            "calls": 0, "errors": 0, "total_latency_s": 0.0, "max_latency_s": 0.0,
+            "input_tokens": 0, "output_tokens": 0,
+        })
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._started[str(run_id)] = (self._tier_from_tags(tags), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._started[str(run_id)] = (self._tier_from_tags(tags), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tier, started = self._started.pop(str(run_id), ("unknown", None))
+        stats = self._tier_stats(tier)
+        stats["calls"] += 1
+        if started is not None:
+            latency = time.perf_counter() - started
+            stats["total_latency_s"] += latency
+            stats["max_latency_s"] = max(stats["max_latency_s"], latency)
+
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                stats["input_tokens"] += usage.get("input_tokens", 0)
+                stats["output_tokens"] += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        tier, _ = self._started.pop(str(run_id), ("unknown", None))
+        self._tier_stats(tier)["errors"] += 1
+
+    def stats(self) -> dict:
+        out = {}
+        for tier, s in self.tiers.items():
+            out[tier] = dict(s, avg_latency_s=(s["total_latency_s"] / s["calls"]) if s["calls"] else 0.0)
+        return out
+
+    @staticmethod
+    def _tier_from_tags(tags) -> str:
+        for tag in tags or []:
+            if tag.startswith("tier:"):
+                return tag[5:]
+        return "unknown"
+
+llm_usage = LLMUsageTracker()
+
+@lru_cache
+def get_llm(tier: str = "pro"):
     """
-    Returns a Gemini 2.5 Pro LLM as requested by the USER.
+    Returns the Gemini LLM for a latency tier.
+    "pro" (Gemini 2.5 Pro) for health/knowledge/identity, "fast" (Flash) for greetings and jokes.
     """
     settings = get_settings()
-    
-    # Model: Gemini 2.5 Pro
+
+    if tier == "fast":
+        model, temperature = settings.LLM_FAST_MODEL, settings.LLM_FAST_TEMPERATURE
+    else:
+        tier = "pro"
+        model, temperature = settings.LLM_PRO_MODEL, settings.LLM_PRO_TEMPERATURE
+
     llm = ChatGoogleGenerativeAI(
-        google_api_key=settings.GOOGLE_API_KEY, 
-        model="gemini-2.5-pro",
-        temperature=0.7,
-        streaming=True
+        google_api_key=settings.GOOGLE_API_KEY,
+        model=model,
+        temperature=temperature,
+        streaming=True,
+        callbacks=[llm_usage],
+        tags=[f"tier:{tier}"]
     )
-    
+
     return llm
@@ -59,5 +59,8 @@ def seed_plants():
         session.commit()
         print("Seeded rich botanical lore for all species.")
 
+        from agents.sensor_rules import refresh_ideal_ranges
+        print(f"Parsed ideal ranges for {refresh_ideal_ranges(session)} species.")
+
 if __name__ == "__main__":
     seed_plants()
@@ -1,19 +1,42 @@
 import os
 from datetime import datetime, timedelta, UTC
-from typing import Optional
+from typing import List, Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, Header, UploadFile, File, Query, Form, BackgroundTasks, Response
+from fastapi import FastAPI, Depends, HTTPException, Header, UploadFile, File, Query, Form, BackgroundTasks, Response, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
-from sqlmodel import Session, select, or_
-from models import init_db, get_engine, Conversation, Device, SensorReading
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import init_db, get_engine, async_session, Conversation, Device, SensorReading
 from config import get_settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize database on startup
     init_db()
+    import services.rollups  # Registers the flush hook that keeps minute/hour/day rollups current
+    import services.history_cache  # Registers the commit hook that keeps cached history pages current
+    from services.recent_readings import recent_readings
+    print(f"DEBUG: Warm-loaded {recent_readings.warm()} recent readings")
+    from services.anomaly_detector import anomaly_detector
+    print(f"DEBUG: Anomaly baselines learnt from {anomaly_detector.warm()} readings")
+    from services.alert_engine import alert_engine
+    print(f"DEBUG: Alert states replayed from {alert_engine.warm()} readings")
+
+    # Parse species care tips into structured ideal ranges for the Sensor rule engine
+    from agents.sensor_rules import refresh_ideal_ranges
+    with Session(get_engine()) as session:
+        print(f"DEBUG: Loaded ideal ranges for {refresh_ideal_ranges(session)} species")
+
+    # Warm the species knowledge index so the first voice query doesn't pay for it
+    from agents.knowledge_index import knowledge_index
+    print(f"DEBUG: Indexed plant knowledge for {knowledge_index.load()} species")
+    from agents.lore_store import lore_store
+    try:
+        print(f"DEBUG: Lore store ready with {lore_store.build()} passages")
+    except Exception as e:
+        print(f"WARNING: Could not build lore store: {e}")
 
     # Ensure storage paths exist
     settings = get_settings()
@@ -36,6 +59,9 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    from services.proactive_care import proactive_care
+    await proactive_care.stop()
+
 app = FastAPI(title="Smart Plant Pot Backend", lifespan=lifespan)
 
 # CORS Configuration
@@ -51,8 +77,9 @@ app.add_middleware(
 app.mount("/simulator", StaticFiles(directory="simulator"), name="simulator")
 app.mount("/audio", StaticFiles(directory="audio_artifacts"), name="audio")
 
-def get_session():
-    with Session(get_engine()) as session:
+async def get_session():
+    # Async so SQLite/Postgres I/O never blocks the event loop shared by every connected pot
+    async with async_session() as session:
         yield session
 
 
@@ -60,15 +87,14 @@ def get_session():
 def health_check():
     return {"status": "healthy"}
 
-from agents.orchestrator import create_pot_graph
+from agents.orchestrator import pot_graph
 from services.transcription import TranscriptionService
 from services.speech_synthesis import SpeechSynthesisService
 
 async def archive_conversation_task(device_id: str, transcription: str, ai_response: str):
     """Background task to archive conversation and synthesize a full audio file."""
-    from models import get_engine, Conversation
+    from models import async_session, Conversation
     from services.speech_synthesis import SpeechSynthesisService
-    from sqlmodel import Session
     import os
     from datetime import datetime
     from config import get_settings # Import get_settings here for background task scope
@@ -85,7 +111,7 @@ async def archive_conversation_task(device_id: str, transcription: str, ai_respo
         with open(save_path, "wb") as f:
             f.write(full_audio)
 
-        with Session(get_engine()) as session:
+        async with async_session() as session:
             convo = Conversation(
                 device_id=device_id,
                 transcription=transcription,
@@ -93,35 +119,62 @@ async def archive_conversation_task(device_id: str, transcription: str, ai_respo
                 audio_file_path=filename
             )
             session.add(convo)
-            session.commit()
+            await session.commit()
         print(f"DEBUG: Archived conversation for {device_id}")
     except Exception as e:
         print(f"DEBUG: Archiver failed: {e}")
 
 @app.get("/v1/audio/stream/{convo_id}")
-async def stream_audio(convo_id: int, session: Session = Depends(get_session)):
+async def stream_audio(convo_id: int, session: AsyncSession = Depends(get_session)):
     """Synthesizes and delivers the entire audio response with fixed Content-Length."""
-    convo = session.get(Conversation, convo_id)
+    convo = await session.get(Conversation, convo_id)
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     from fastapi import Response
     from services.speech_synthesis import SpeechSynthesisService
-    tts = SpeechSynthesisService()
+    from services.reply_cache import reply_cache
 
     # [MODIFIED] -2.0dB - The "Goldilocks" middle ground between too soft and muffled
-    VOL_GAIN = -2.0
+    settings = get_settings()
+    VOL_GAIN = settings.STREAM_VOLUME_GAIN_DB
+
+    # [PROACTIVE] Alerts pre-synthesized in the background are already on disk - zero wait
+    if convo.audio_file_path:
+        prepared_path = os.path.join(settings.STORAGE_PATH, convo.audio_file_path)
+        if os.path.isfile(prepared_path):
+            with open(prepared_path, "rb") as f:
+                prepared_audio = f.read()
+            if prepared_audio:
+                print(f"DEBUG: [Stream] Pre-synthesized audio for Convo {convo_id} ({len(prepared_audio)} bytes)")
+                return Response(
+                    content=prepared_audio,
+                    media_type="audio/mpeg",
+                    headers={"Content-Length": str(len(prepared_audio))}
+                )
 
     reply_text = convo.ai_response or ""
     if not reply_text.strip():
         print("WARNING: [Stream] Nothing to synthesize.")
         return Response(content=b"", media_type="audio/mpeg")
 
+    # [CACHE] Cached replies keep their synthesized audio - skip TTS entirely
+    cached_audio = reply_cache.get_audio(reply_text)
+    if cached_audio:
+        print(f"DEBUG: [Stream] Cached audio for Convo {convo_id} ({len(cached_audio)} bytes)")
+        return Response(
+            content=cached_audio,
+            media_type="audio/mpeg",
+            headers={"Content-Length": str(len(cached_audio))}
+        )
+
     print(f"DEBUG: [Stream] One-Shot Synthesis for Convo {convo_id}: {reply_text[:50]}...")
 
     try:
+        tts = SpeechSynthesisService()
         # [ONE-SHOT] Synthesize the entire response at once into a buffer.
         audio = await tts.synthesize_stream(reply_text, volume_gain_db=VOL_GAIN)
+        reply_cache.put_audio(reply_text, audio)
 
         if audio:
             print(f"DEBUG: [Stream] Synthesis complete. Delivering {len(audio)} bytes with fixed length.")
@@ -143,6 +196,30 @@ async def stream_audio(convo_id: int, session: Session = Depends(get_session)):
 async def health_check():
     return {"status": "ok", "message": "Smart Plant Pot Backend is reachable"}
 
+@app.get("/v1/cache/stats")
+async def cache_stats():
+    """Hit-rates of the reply and history caches, the semantic similarity distribution and coalesced TTS/STT/LLM calls."""
+    from services.reply_cache import reply_cache
+    from services.semantic_cache import semantic_cache
+    from services.single_flight import single_flight
+    from services.history_cache import history_cache
+    from services.anomaly_detector import anomaly_detector
+    from services.alert_engine import alert_engine
+    return {
+        "reply_cache": reply_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "history_cache": history_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "anomaly_detector": anomaly_detector.stats(),
+        "alert_engine": alert_engine.stats()
+    }
+
+@app.get("/v1/llm/stats")
+async def llm_stats():
+    """Per-tier LLM latency and token accounting."""
+    from agents.utils import llm_usage
+    return llm_usage.stats()
+
 @app.post("/v1/ingest")
 async def ingest_data(
     device_id: str,
@@ -152,16 +229,19 @@ async def ingest_data(
     event: Optional[str] = None,
     user_query: Optional[str] = Query(None),
     audio: Optional[UploadFile] = File(None),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     print(f"\n🚀 [INGEST START] Device: {device_id}, Event: {event}, Text: {user_query}")
+    # [BUDGET] The ESP32 holds this connection open - everything below shares one deadline
+    from agents.fallbacks import start_budget
+    deadline = start_budget(get_settings().RESPONSE_BUDGET_SECONDS)
     # 1. Ensure device exists
-    device = session.get(Device, device_id)
+    device = await session.get(Device, device_id)
     if not device:
         is_sim = (device_id == "pot_simulator_001" or "sim" in device_id.lower())
         device = Device(id=device_id, name=f"Pot {device_id}", species="Basil", is_simulator=is_sim)
         session.add(device)
-        session.commit()
+        await session.commit()
 
     # 0. Handle Sensor Data Prioritization (Physical Pot vs Simulator)
     used_hardware_data = False
@@ -169,22 +249,12 @@ async def ingest_data(
         # We increase the window to 30 minutes to be safe during troubleshooting
         sync_window = datetime.now(UTC).replace(tzinfo=None) - timedelta(minutes=30)
 
-        # Look for the most recent reading from ANY hardware device (is_simulator=False)
-        statement = (
-            select(SensorReading)
-            .join(Device)
-            .where(
-                Device.is_simulator == False,
-                SensorReading.timestamp >= sync_window
-            )
-            .order_by(SensorReading.timestamp.desc())
-            .limit(1)
-        )
-
-        recent_reading = session.exec(statement).first()
-        if recent_reading:
-            hw_device_id = getattr(recent_reading, "device_id", "Unknown")
-            hw_temp = getattr(recent_reading, "temperature", 0.0)
+        # Look for the most recent reading from ANY hardware device (is_simulator=False), straight from memory
+        from services.recent_readings import recent_readings
+        recent_reading = recent_readings.latest_hardware(since=sync_window)
+        if recent_reading and recent_reading["temperature"] is not None:  # None: the probe reading was quarantined
+            hw_device_id = recent_reading["device_id"]
+            hw_temp = recent_reading["temperature"]
             print(f"DEBUG: [OVERRIDE] Found HARDWARE data from {hw_device_id}!")
             print(f"DEBUG: [OVERRIDE] Changing Temperature from {temperature:.1f}C (Slider) to {hw_temp:.1f}C (Hardware)")
 
@@ -212,23 +282,54 @@ async def ingest_data(
     print(f"  ✨ Event:       {event or 'None'}")
     print(f"-----------------------------------\n")
 
+    # [ANOMALY] Screen physical-sensor readings before they reach alerts, rollups, the ring buffers or the agents.
+    # Outlier channels are still stored (tagged), and replaced by their last accepted value everywhere below;
+    # the reading's other channels are used as sent.
+    reading_time = datetime.now(UTC).replace(tzinfo=None)
+    reading_event = event
+    sensor_values = {"temperature": temperature, "moisture": moisture, "light": light}
+    flagged = {}
+    if get_settings().ANOMALY_DETECTION_ENABLED and not getattr(device, "is_simulator", False):
+        from services.anomaly_detector import anomaly_detector
+        from services.reading_store import quarantine_event
+        flagged = anomaly_detector.check(device_id, reading_time, sensor_values)
+        if flagged:
+            reading_event = quarantine_event(flagged, event)
+            accepted = anomaly_detector.last_accepted(device_id)
+            sensor_values = {c: accepted[c] if c in flagged else v for c, v in sensor_values.items()}
+            print(f"WARNING: [Anomaly] Quarantined reading from {device_id}: {reading_event}")
+
+    # [ALERTS] Per-device hysteresis/debounce/cool-down state machine. Only a freshly raised alert is tagged
+    # on the reading, so the poll plays it once instead of on every reading below the threshold.
+    from services.alert_engine import alert_engine
+    from services.reading_store import alert_event
+    moisture_alert = False
+    if "moisture" not in flagged:
+        moisture_alert = alert_engine.observe(device_id, reading_time, sensor_values["moisture"])
+        if moisture_alert:
+            reading_event = alert_event(reading_event)
+
     # 1. Create Sensor Reading Record
+    from services.proactive_care import proactive_care
+    voice_alert = False
+    propagated = []
     try:
-        reading = SensorReading(device_id=device_id, temperature=temperature, moisture=moisture, light=light, event=event)  
+        reading = SensorReading(device_id=device_id, timestamp=reading_time, temperature=temperature,
+                                moisture=moisture, light=light, event=reading_event)
         session.add(reading)
 
         # --- REMOTE TRIGGER: Propagation from Simulator to Physical Pot ---
         if force_notification and getattr(device, "is_simulator", False):
             # Target the specific known hardware ID first
             hw_id = "s3_devkitc_plant_pot"
-            hw_device = session.get(Device, hw_id)
+            hw_device = await session.get(Device, hw_id)
             if not hw_device:
                 # Pre-register if missing (will be populated on first real HW poll)
                 hw_device = Device(id=hw_id, name="Physical Pot", species="Unknown", is_simulator=False)
                 session.add(hw_device)
             
             # Find ALL registered hardware devices (including the one we just ensured)
-            physical_devices = session.exec(select(Device).where(Device.is_simulator == False)).all()
+            physical_devices = (await session.exec(select(Device).where(Device.is_simulator == False))).all()
             
             if not physical_devices:
                 print(f"🔍 [TRACE] No physical devices found to propagate alert to.")
@@ -244,6 +345,7 @@ async def ingest_data(
                         event="remote_simulator_alert"
                     )
                     session.add(new_reading)
+                    propagated.append((pd, new_reading))
                     print(f"✅ [TRACE] Alert propagated to physical device: {pd.id}")
                     
                     # Log for debugging
@@ -253,12 +355,19 @@ async def ingest_data(
                     except:
                         pass
 
-        session.commit()
+        await session.commit()
         print(f"💾 [TRACE] Session Committed successfully.")
+
+        # [PROACTIVE] Freshly raised alert -> pre-generate the voice alert before the next poll (it replaces the chime)
+        if moisture_alert:
+            voice_alert = proactive_care.alert(device_id, device.species, sensor_values, reading.id)
+        for pd, new_reading in propagated:
+            proactive_care.alert(pd.id, pd.species, {"temperature": temperature, "moisture": 5.0, "light": light}, new_reading.id)
     except Exception as e:
         import traceback
         traceback.print_exc()
         print(f"WARNING: Could not log sensor reading: {e}")
+        await session.rollback()
 
     # 3. Handle STT (Only if user_query not provided)
     is_silent_recording = False
@@ -280,17 +389,6 @@ async def ingest_data(
         user_query = settings.WAKE_WORD
         is_silent_recording = False # Override if it's just the wake word
 
-    # 4. Define High-Speed Dispatcher & Knowledge Logic
-    # (Removed duplicated code for brevity, logic remains the same)
-    from agents.orchestrator import fast_find_knowledge
-    keywords_sensors = [
-        "light", "moisture", "water", "temperature", "temp", "hungry", "health",
-        "care", "how are you", "routine", "advice", "habitat", "potting", "fertilizer"
-    ]
-    query_text = (user_query or "").lower()
-    is_sensor_query = any(k in query_text for k in keywords_sensors)
-    local_knowledge = fast_find_knowledge(device.species) if (user_query and len(user_query) > 3) else None
-
     # 5. Handle Response Generation
     # --- [REFINED] EVENT-ONLY INGEST LOGIC ---
     # If this is just a sensor log or an alert event (no voice/text query),
@@ -299,32 +397,29 @@ async def ingest_data(
         reply_text = "..." # Minimalist placeholder
         mood = "neutral"
         priority = "normal"
+        answer_tier = None
     elif is_silent_recording:
         reply_text = "Hi there, I didn't catch what you said. Could you repeat that?"
         mood = "neutral"
         priority = "normal"
+        answer_tier = "template"
     else:
-        # Run Agent IMMEDIATELY for text display
-        from agents.conversation_agent import ConversationAgent
-        agent = ConversationAgent()
-
-        # Always provide sensor data and rich botanical context (including lore)
-        sensor_text = f"Temp: {temperature:.1f}C, Moisture: {moisture:.1f}%, Light: {light:.1f}%"
-        know_text = f"Biology: {local_knowledge.biological_info}\nCare: {local_knowledge.care_tips}\nLore/Identity: {local_knowledge.lore}" if local_knowledge else "No local data found."
-
+        # [GRAPH] Router -> {Sensor, Knowledge} concurrently -> Conversation (agents/orchestrator.py).
+        # Greetings/jokes skip the experts but still get local sensor + botanical context.
+        # The whole graph shares the request deadline; slow experts degrade to local context.
         state = {
             "device_id": device_id,
             "species": device.species,
             "user_query": user_query or "Hello",
-            "sensor_analysis": sensor_text,
-            "plant_knowledge": know_text,
-            "sensor_data": {"temperature": temperature, "moisture": moisture, "light": light}
+            "sensor_data": dict(sensor_values),
+            "deadline": deadline
         }
-
-        result = await agent.run(state)
+        result = await pot_graph().ainvoke(state)
         reply_text = result.get("conversation_response", "")
         mood = result.get("mood", "neutral")
         priority = result.get("priority", "normal")
+        answer_tier = result.get("answer_tier", "llm")
+        print(f"DEBUG: [Ingest] Answered by tier: {answer_tier}")
 
     # 6. Create Conversation Record with full text (SKIP IF SILENT)
     class MockConvo:
@@ -343,10 +438,11 @@ async def ingest_data(
                 mood=mood
             )
             session.add(convo)
-            session.commit()
-            session.refresh(convo)
+            await session.commit()
+            await session.refresh(convo)
         except Exception as e:
             print(f"WARNING: Failed to save conversation to DB: {e}")
+            await session.rollback()
             convo = MockConvo()
     else:
         # It's a silent event, just create a mock object for the response
@@ -358,7 +454,7 @@ async def ingest_data(
     import json
 
     notification_url = None
-    if moisture < 20.0 or force_notification:
+    if (moisture_alert and not voice_alert) or force_notification:
         notification_url = "/v1/audio/notification/low-moisture"
 
     content = {
@@ -375,36 +471,201 @@ async def ingest_data(
             "mood": mood,
             "priority": priority
         },
+        "answer_tier": answer_tier,
         "id": convo.id
     }
     # 8. Flag Physical Device for Audio if this is a simulator query
     # The user wants simulator queries to play on the physical speaker as a backup.
     if device_id == "pot_simulator_001":
         # Target the physical device (s3_devkitc_plant_pot)
-        physical_device = session.get(Device, "s3_devkitc_plant_pot")
+        physical_device = await session.get(Device, "s3_devkitc_plant_pot")
         # ONLY flag if this is a real vocal response (not the silent 9999 ghost ID)
         if physical_device and convo.id != 9999:
             physical_device.pending_audio_id = convo.id
             session.add(physical_device)
-            session.commit()
+            await session.commit()
             print(f"DEBUG: Flagged physical device 's3_devkitc_plant_pot' with pending audio {convo.id}")
 
     return Response(content=json.dumps(content), media_type="application/json", headers={"Connection": "close"})
 
+@app.post("/v1/device/{device_id}/readings")
+async def upload_readings(
+    device_id: str,
+    readings: List[dict] = Body(...),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Bulk upload of buffered readings (e.g. a pot that was offline), stored with one COPY on Postgres.
+    Body: [{"temperature": 22.1, "moisture": 41.0, "light": 55.0, "timestamp": "2024-05-01T10:00:00Z", "event": null}, ...]
+    Backfilled readings are history only - they don't trigger alerts or agent replies. Sensor glitches are
+    stored quarantined, like on /v1/ingest.
+    """
+    import asyncio
+    from services.reading_store import bulk_insert_readings
+
+    device = await session.get(Device, device_id)
+    if not device:
+        is_sim = (device_id == "pot_simulator_001" or "sim" in device_id.lower())
+        device = Device(id=device_id, name=f"Pot {device_id}", species="Basil", is_simulator=is_sim)
+        session.add(device)
+        await session.commit()
+    # Physical sensors glitch; simulator sliders are taken as given
+    screen = get_settings().ANOMALY_DETECTION_ENABLED and not device.is_simulator
+
+    try:
+        count = await asyncio.to_thread(bulk_insert_readings, [dict(r, device_id=device_id) for r in readings],
+                                        screen=screen)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid reading: {e}")
+    print(f"DEBUG: [Readings] Stored {count} buffered readings for {device_id}")
+    return {"status": "stored", "count": count}
+
+@app.get("/v1/device/{device_id}/series")
+async def get_series(
+    device_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Chart data (min/max/mean/last per bucket) served from the minute/hour/day rollups, never raw readings.
+    Defaults to the last 7 days; the resolution is the finest that fits max_points buckets.
+    """
+    from services.rollups import query_series
+
+    # Stored timestamps are naive UTC
+    end = end.astimezone(UTC).replace(tzinfo=None) if end and end.tzinfo else end
+    start = start.astimezone(UTC).replace(tzinfo=None) if start and start.tzinfo else start
+    end = end or datetime.now(UTC).replace(tzinfo=None)
+    start = start or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    return await query_series(session, device_id, start, end, max_points=max_points)
+
+@app.get("/v1/device/{device_id}/readings")
+async def get_readings(
+    device_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[str] = None,
+    agg: Optional[str] = None,
+    channels: Optional[str] = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$"),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None
+):
+    """
+    Sensor history (archived and live). Raw readings by default; with bucket=5m|1h|1d|<seconds> one row per
+    bucket with agg=min,max,mean,first,last,sum,count,std (default min,max,mean) per channel.
+    format=json returns one keyset page and next_cursor; ndjson/csv stream the whole range.
+    """
+    import csv
+    import io
+    import json
+    from models import get_async_engine
+    from services.reading_history import AGGREGATES, check_cursor, output_columns, parse_bucket, parse_choices, read_page
+    from services.reading_store import CHANNELS
+
+    # Stored timestamps are naive UTC
+    end = end.astimezone(UTC).replace(tzinfo=None) if end and end.tzinfo else end
+    start = start.astimezone(UTC).replace(tzinfo=None) if start and start.tzinfo else start
+    end = end or datetime.now(UTC).replace(tzinfo=None)
+    start = start or end - timedelta(days=1)
+    try:
+        width = parse_bucket(bucket)
+        aggregates = parse_choices(agg, AGGREGATES, ("min", "max", "mean"))
+        chosen = parse_choices(channels, CHANNELS, CHANNELS)
+        check_cursor(cursor, width)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+
+    async def page(page_cursor, size):
+        async with get_async_engine().connect() as conn:
+            return await conn.run_sync(read_page, device_id, start, end, width, aggregates, chosen, size, page_cursor)
+
+    if fmt == "json":
+        rows, next_cursor, source = await page(cursor, limit)
+        return {"device_id": device_id, "bucket": width, "source": source, "rows": rows, "next_cursor": next_cursor}
+
+    async def export():
+        # Walks the keyset pages so memory stays flat however long the range is
+        page_cursor = cursor
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, output_columns(width, aggregates, chosen), extrasaction="ignore")
+        if fmt == "csv":
+            writer.writeheader()
+        while True:
+            rows, page_cursor, _ = await page(page_cursor, 5000)
+            if fmt == "ndjson":
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+            else:
+                writer.writerows(rows)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if page_cursor is None:
+                break
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return StreamingResponse(export(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{device_id}_readings.{fmt}"'})
+
+@app.get("/v1/device/{device_id}/recent")
+async def get_recent_readings(
+    device_id: str,
+    minutes: float = Query(60.0, gt=0, le=24 * 60),
+    include_readings: bool = True
+):
+    """Recent readings and window statistics from the in-memory ring buffer (no database I/O)."""
+    from services.recent_readings import recent_readings, to_list, CHANNELS
+
+    stats = recent_readings.stats(device_id, seconds=minutes * 60)
+    content = {"device_id": device_id, "minutes": minutes, "stats": stats}
+    if include_readings:
+        ts, values = recent_readings.window(device_id, seconds=minutes * 60)
+        content["readings"] = {
+            "timestamp": [(datetime(1970, 1, 1) + timedelta(seconds=t)).isoformat() for t in ts.tolist()],
+            **{c: to_list(values[i]) for i, c in enumerate(CHANNELS)}
+        }
+    return content
+
+@app.get("/v1/device/{device_id}/forecast")
+async def get_moisture_forecast(device_id: str, threshold: Optional[float] = Query(None, gt=0, lt=100)):
+    """
+    Predicted time until the pot's moisture reaches the threshold (default PROACTIVE_MOISTURE_THRESHOLD),
+    from a drying-rate fit over its readings since the last watering. forecast is null without enough data.
+    """
+    import asyncio
+    from services.moisture_forecast import moisture_forecast
+    return {"device_id": device_id, "forecast": await asyncio.to_thread(moisture_forecast.get, device_id, threshold)}
+
+@app.get("/v1/forecast/moisture")
+async def get_fleet_moisture_forecast(
+    within_hours: float = Query(24.0, gt=0, le=14 * 24),
+    threshold: Optional[float] = Query(None, gt=0, lt=100)
+):
+    """Every pot expected to need water within the next `within_hours`, soonest first."""
+    import asyncio
+    from services.moisture_forecast import moisture_forecast
+    return {"within_hours": within_hours, "devices": await asyncio.to_thread(moisture_forecast.due_within, within_hours, threshold)}
+
 @app.get("/v1/device/{device_id}/poll")
-async def poll_for_audio(device_id: str, session: Session = Depends(get_session)):
+async def poll_for_audio(device_id: str, session: AsyncSession = Depends(get_session)):
     """Polling endpoint for the ESP32 to check for pending audio streams."""
     print(f"DEBUG: [Poll Request] From Device: {device_id}")
 
-    device = session.get(Device, device_id)
+    device = await session.get(Device, device_id)
     # 0. Register device if it doesn't exist yet
     if not device:
         print(f"  ℹ [Poll] New device identified: {device_id}. Registering...")
         is_sim = (device_id == "pot_simulator_001" or "sim" in device_id.lower())
         device = Device(id=device_id, name=f"Pot {device_id}", species="Basil", is_simulator=is_sim)
         session.add(device)
-        session.commit()
-        session.refresh(device)
+        await session.commit()
+        await session.refresh(device)
 
     convo_id = None
     if device.pending_audio_id is not None:
@@ -413,32 +674,25 @@ async def poll_for_audio(device_id: str, session: Session = Depends(get_session)
         # Clear the flag immediately after serving
         device.pending_audio_id = None
         session.add(device)
-        session.commit()
+        await session.commit()
 
     # 2. Check for Low Moisture Notification
     # [REMOVED TIME CONSTRAINT] to ensure reliability regardless of clock drift.
     # The unique ID check below handles the duplicate suppression.
 
-    # Query only for the most recent alert event
-    statement = (
-        select(SensorReading)
-        .where(
-            SensorReading.device_id == device_id,
-            or_(
-                SensorReading.moisture < 20.0,
-                SensorReading.event.in_(["low_moisture_alert", "remote_simulator_alert"])
-            )
-        )
-        .order_by(SensorReading.timestamp.desc())
-        .limit(1)
-    )
-
-    last_reading = session.exec(statement).first()
+    # Query only for the most recent alert event (partial index ix_sensorreading_alerts). Alerts are raised at
+    # ingest by services/alert_engine.py, so a pot hovering around the threshold yields one alert, one write.
+    from services.reading_store import latest_alert_reading_query
+    last_reading = (await session.exec(latest_alert_reading_query(device_id))).first()
     notification_url = None
     notification_format = None
+    from services.proactive_care import proactive_care
     if last_reading:
         # [NEW] Check if this alert has already been played on this device
-        if device.last_notified_reading_id != last_reading.id:
+        if device.last_notified_reading_id != last_reading.id and proactive_care.holds(last_reading):
+            # Its pre-synthesized voice alert is still being prepared and will be served instead of the chime
+            print(f"  ⏳ [Poll] Holding alert {last_reading.id} for its voice alert on {device_id}")
+        elif device.last_notified_reading_id != last_reading.id:
             print(f"  ⚠ [Poll] NEW ALERT found (ID: {last_reading.id}, Event: {last_reading.event}) for {device_id}")       
             notification_url = "/v1/audio/notification/low-moisture"
 
@@ -454,37 +708,37 @@ async def poll_for_audio(device_id: str, session: Session = Depends(get_session)
             # Consume the alert
             device.last_notified_reading_id = last_reading.id
             session.add(device)
-            session.commit()
+            await session.commit()
         else:
             print(f"  ℹ [Poll] Skipping already played alert (ID: {last_reading.id}) for {device_id}")
 
     # 3. [NEW] For Simulators, provide a "Live Sync" with physical hardware
     latest_sensors = None
     if getattr(device, "is_simulator", False):
-        # Look for the absolute latest reading from ANY hardware device
-        hw_statement = (
-            select(SensorReading)
-            .join(Device)
-            .where(Device.is_simulator == False)
-            .order_by(SensorReading.timestamp.desc())
-            .limit(1)
-        )
-        hw_reading = session.exec(hw_statement).first()
-        if hw_reading:
+        # Look for the absolute latest reading from ANY hardware device (ring buffer, no DB query)
+        from services.recent_readings import recent_readings
+        hw_reading = recent_readings.latest_hardware()
+        if hw_reading and hw_reading["temperature"] is not None:
             latest_sensors = {
-                "temperature": hw_reading.temperature,
-                "timestamp": hw_reading.timestamp.isoformat()
+                "temperature": hw_reading["temperature"],
+                "timestamp": hw_reading["timestamp"].isoformat()
             }
 
     if not convo_id and not notification_url and not latest_sensors:
         print(f"  💤 [Poll] No pending audio/alerts/sync for {device_id}")
 
+    # 4. Time until thirsty (cached fleet-wide drying fit, no DB query; the periodic refit runs off the event loop)
+    import asyncio
+    from services.moisture_forecast import moisture_forecast
+    forecast = await asyncio.to_thread(moisture_forecast.get, device_id)
+
     return {
         "convo_id": convo_id,
         "audio_url": f"/v1/audio/stream/{convo_id}" if convo_id else None,
         "notification_url": notification_url,
         "notification_format": notification_format,
-        "latest_sensors": latest_sensors
+        "latest_sensors": latest_sensors,
+        "moisture_forecast": forecast
     }
 
 def serve_notification_sound(filename_prefix: str, default_priority_exts: list = [".wav", ".mp3"]):
@@ -519,38 +773,83 @@ async def get_low_moisture_notification():
     """Serves the low moisture notification sound (priority: alert.wav)."""
     return serve_notification_sound("alert")
 @app.get("/v1/history")
-async def get_history(device_id: str = "pot_simulator_001", session: Session = Depends(get_session)):
-    statement = select(Conversation).where(Conversation.device_id == device_id).order_by(Conversation.timestamp.desc()).limit(10)
-    results = session.exec(statement).all()
-
-    # Format for frontend
-    history = []
-    for c in results:
-        history.append({
-            "id": c.id,
-            "user_query": c.transcription,
-            "reply_text": c.ai_response,
-            "mood": c.mood,
-            "audio_url": f"/audio/{c.audio_file_path}" if c.audio_file_path else None,
-            "timestamp": c.timestamp.isoformat()
-        })
-    return history
+async def get_history(
+    device_id: str = "pot_simulator_001",
+    before_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Newest-first conversations. Pass the last id you received as before_id for the next page
+    (also sent as X-Next-Before-Id). The latest page is cached in memory and carries an ETag,
+    so polling with If-None-Match costs neither a query nor a body while nothing changed.
+    """
+    from services.history_cache import history_cache, history_row, page_etag
+    from services.reading_store import conversation_history_query
+
+    cached = history_cache.get(device_id, limit) if before_id is None and limit <= history_cache.page_size else None
+    if cached:
+        history, etag = cached
+    else:
+        generation = history_cache.generation(device_id)
+        fetch = history_cache.page_size if before_id is None and limit <= history_cache.page_size else limit
+        results = (await session.exec(conversation_history_query(device_id, limit=fetch, before_id=before_id))).all()
+        # Format for frontend
+        history = [history_row(c) for c in results]
+        if before_id is None and fetch == history_cache.page_size:
+            history_cache.put(device_id, history, generation)
+        history = history[:limit]
+        etag = page_etag(history)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if len(history) == limit:
+        headers["X-Next-Before-Id"] = str(history[-1]["id"])
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=history, headers=headers)
+
+@app.get("/v1/conversations/search")
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=500),
+    device_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000)
+):
+    """
+    Ranked full-text search over what users said and what their plants replied, across all pots
+    unless device_id is given. q takes web-search syntax: fertilizer or "yellow leaves" -spider.
+    """
+    from models import get_async_engine
+    from services import conversation_search
+
+    # Stored timestamps are naive UTC
+    end = end.astimezone(UTC).replace(tzinfo=None) if end and end.tzinfo else end
+    start = start.astimezone(UTC).replace(tzinfo=None) if start and start.tzinfo else start
+    if start and end and start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+
+    async with get_async_engine().connect() as conn:
+        results = await conn.run_sync(conversation_search.search_conversations, q, device_id, start, end, limit, offset)
+    return {"query": q, "results": results, "next_offset": offset + limit if len(results) == limit else None}
 
 @app.post("/v1/device/{device_id}/species")
 async def update_species(
     device_id: str,
     species: str,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """Updates the plant species for a specific device."""
-    device = session.get(Device, device_id)
+    device = await session.get(Device, device_id)
     if not device:
         device = Device(id=device_id, name=f"Pot {device_id}", species=species)
         session.add(device)
     else:
         device.species = species
 
-    session.commit()
+    await session.commit()
     return {"status": "updated", "species": species}
 
 if __name__ == "__main__":
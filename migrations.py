@@ -0,0 +1,166 @@
+"""
+Versioned schema migrations that run on both SQLite and PostgreSQL.
+
+init_db() creates any missing tables from the models, then applies every migration newer than
+the highest version recorded in `schema_migrations`. Each migration runs in its own transaction
+and is written to be safe on a fresh database as well as on an old plant_pot.db that went through
+the ad-hoc debug/ scripts.
+
+Run manually with:  python migrations.py
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+def _columns(conn: Connection, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str):
+    if column not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+def _false(conn: Connection) -> str:
+    return "false" if conn.dialect.name == "postgresql" else "0"
+
+def _baseline(conn: Connection):
+    """Columns older databases gained through debug/migrate_db.py and debug/upgrade_db_last_notified.py."""
+    _add_column(conn, "device", "pending_audio_id", "INTEGER")
+    _add_column(conn, "device", "is_simulator", f"BOOLEAN DEFAULT {_false(conn)}")
+    _add_column(conn, "device", "last_notified_reading_id", "INTEGER")
+    for column in ("temperature", "moisture", "light"):
+        _add_column(conn, "sensorreading", column, "REAL DEFAULT 0.0")
+
+def _reading_history_index(conn: Connection):
+    """Per-device latest-reading and time-range scans (ingest override, poll, history APIs)."""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sensorreading_device_timestamp ON sensorreading (device_id, timestamp)"))
+
+def _hot_query_indexes(conn: Connection):
+    """Indexes for the poll/history/simulator-sync query shapes in services/reading_store.py."""
+    # History: WHERE device_id = ? ORDER BY timestamp DESC LIMIT 10
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conversation_device_timestamp ON conversation (device_id, timestamp)"))
+    # Poll: latest alert row per device - only the (rare) alert rows are indexed (predicate replaced in migration 6)
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sensorreading_alerts ON sensorreading (device_id, timestamp) "
+        "WHERE moisture < 20.0 OR event IN ('low_moisture_alert', 'remote_simulator_alert')"))
+    # Simulator live sync: JOIN device WHERE is_simulator = false
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_device_is_simulator ON device (is_simulator, id)"))
+    # Superseded by the composite index (device_id is its leading column); one less index per insert
+    conn.execute(text("DROP INDEX IF EXISTS ix_sensorreading_device_id"))
+    # Fresh planner statistics so the partial index is costed by its real (small) size
+    conn.execute(text("ANALYZE"))
+
+def _sensor_rollups(conn: Connection):
+    """Backfills SensorRollup (created by create_all) from the raw readings already stored."""
+    from services.rollups import rebuild
+    print(f"DEBUG: [Migrations] Rolled up {rebuild(conn)} existing readings")
+
+def _conversation_search(conn: Connection):
+    """Full-text index over transcription + ai_response, kept in sync by triggers (services/conversation_search.py)."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE conversation ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        # What the user said ranks above what the plant answered
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION conversation_search_vector() RETURNS trigger AS $$ BEGIN "
+            "NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.transcription, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(NEW.ai_response, '')), 'B'); "
+            "RETURN NEW; END $$ LANGUAGE plpgsql"))
+        conn.execute(text("DROP TRIGGER IF EXISTS conversation_search_update ON conversation"))
+        conn.execute(text(
+            "CREATE TRIGGER conversation_search_update BEFORE INSERT OR UPDATE OF transcription, ai_response "
+            "ON conversation FOR EACH ROW EXECUTE FUNCTION conversation_search_vector()"))
+        conn.execute(text("UPDATE conversation SET transcription = transcription"))  # Backfill via the trigger
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_conversation_search ON conversation USING gin (search_vector)"))
+        return
+
+    # SQLite: external-content FTS5 table, so the text isn't stored twice
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS conversation_fts USING fts5("
+        "transcription, ai_response, content='conversation', content_rowid='id', tokenize='porter unicode61')"))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS conversation_fts_insert AFTER INSERT ON conversation BEGIN "
+        "INSERT INTO conversation_fts (rowid, transcription, ai_response) VALUES (new.id, new.transcription, new.ai_response); "
+        "END"))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS conversation_fts_delete AFTER DELETE ON conversation BEGIN "
+        "INSERT INTO conversation_fts (conversation_fts, rowid, transcription, ai_response) "
+        "VALUES ('delete', old.id, old.transcription, old.ai_response); "
+        "END"))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS conversation_fts_update AFTER UPDATE OF transcription, ai_response ON conversation BEGIN "
+        "INSERT INTO conversation_fts (conversation_fts, rowid, transcription, ai_response) "
+        "VALUES ('delete', old.id, old.transcription, old.ai_response); "
+        "INSERT INTO conversation_fts (rowid, transcription, ai_response) VALUES (new.id, new.transcription, new.ai_response); "
+        "END"))
+    conn.execute(text("INSERT INTO conversation_fts (conversation_fts) VALUES ('rebuild')"))
+
+def _alert_engine_index(conn: Connection):
+    """Alerts are now raised by services/alert_engine.py and tagged on the reading, not inferred from moisture."""
+    # Must match services/reading_store.latest_alert_reading_query (tests/test_query_plans.py checks it)
+    conn.execute(text("DROP INDEX IF EXISTS ix_sensorreading_alerts"))
+    conn.execute(text(
+        "CREATE INDEX ix_sensorreading_alerts ON sensorreading (device_id, timestamp) "
+        "WHERE event LIKE 'alert:%' OR event IN ('low_moisture_alert', 'remote_simulator_alert')"))
+    conn.execute(text("ANALYZE"))
+
+def _per_channel_rollups(conn: Connection):
+    """Per-channel rollup counts: a quarantined channel no longer drops the reading's other channels."""
+    for column in ("temperature", "moisture", "light"):
+        _add_column(conn, "sensorrollup", f"{column}_count", "INTEGER DEFAULT 0")
+    from services.rollups import rebuild
+    print(f"DEBUG: [Migrations] Rolled up {rebuild(conn)} existing readings per channel")
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline legacy columns", _baseline),
+    Migration(2, "sensorreading (device_id, timestamp) index", _reading_history_index),
+    Migration(3, "composite and partial indexes for hot queries", _hot_query_indexes),
+    Migration(4, "backfill sensor rollups", _sensor_rollups),
+    Migration(5, "full-text search over conversations", _conversation_search),
+    Migration(6, "partial alert index over alert-engine events", _alert_engine_index),
+    Migration(7, "per-channel rollup counts", _per_channel_rollups),
+]
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_migrations"):
+            return 0
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar() or 0
+
+def run_migrations(engine: Engine, migrations: List[Migration] = None) -> List[int]:
+    """Applies pending migrations in order. Returns the versions applied."""
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)"))
+
+    applied = []
+    for migration in migrations:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Several workers may boot at once - only one migrates, the rest wait and skip
+                conn.execute(text("SELECT pg_advisory_xact_lock(7460)"))
+            done = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": migration.version}).first()
+            if done:
+                continue
+            print(f"DEBUG: [Migrations] Applying {migration.version}: {migration.name}")
+            migration.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": migration.version, "n": migration.name, "t": datetime.utcnow()})
+            applied.append(migration.version)
+    return applied
+
+if __name__ == "__main__":
+    from models import init_db, get_engine
+    init_db()
+    print(f"Schema at version {current_version(get_engine())}")
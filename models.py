@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
+from sqlalchemy import Column, LargeBinary
 from sqlmodel import Field, Relationship, SQLModel, create_engine, Session
 
 class Device(SQLModel, table=True):
@@ -16,7 +17,7 @@ class Device(SQLModel, table=True):
 
 class SensorReading(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    device_id: str = Field(foreign_key="device.id", index=True)
+    device_id: str = Field(foreign_key="device.id")  # Indexed with timestamp (see migrations.py)
     timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     temperature: float
     moisture: float
@@ -25,9 +26,43 @@ class SensorReading(SQLModel, table=True):
     
     device: Device = Relationship(back_populates="readings")
 
+class SensorRollup(SQLModel, table=True):
+    """Per-device minute/hour/day aggregates of SensorReading, kept current at write time (see services/rollups.py)."""
+    device_id: str = Field(foreign_key="device.id", primary_key=True)
+    resolution: int = Field(primary_key=True)  # Bucket width in seconds
+    bucket: datetime = Field(primary_key=True)  # Bucket start (naive UTC)
+    count: int = 0
+    last_timestamp: datetime
+
+    # Per channel: readings where it wasn't quarantined, and their min/max/sum/last (inf/-inf/0/0 while count is 0)
+    temperature_count: int = 0
+    temperature_min: float
+    temperature_max: float
+    temperature_sum: float
+    temperature_last: float
+    moisture_count: int = 0
+    moisture_min: float
+    moisture_max: float
+    moisture_sum: float
+    moisture_last: float
+    light_count: int = 0
+    light_min: float
+    light_max: float
+    light_sum: float
+    light_last: float
+
+class SensorArchive(SQLModel, table=True):
+    """One device-month of archived SensorReading rows as a compressed columnar block (see services/archive.py)."""
+    device_id: str = Field(foreign_key="device.id", primary_key=True)
+    month: datetime = Field(primary_key=True)  # First day of the month (naive UTC)
+    count: int
+    first_timestamp: datetime
+    last_timestamp: datetime
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
 class Conversation(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    device_id: str = Field(foreign_key="device.id")
+    device_id: str = Field(foreign_key="device.id")  # Indexed with timestamp (see migrations.py)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     
     transcription: Optional[str] = None
@@ -44,12 +79,138 @@ class PlantKnowledge(SQLModel, table=True):
     care_tips: str
     lore: str
 
+class PlantIdealRange(SQLModel, table=True):
+    """Structured ideal ranges parsed from PlantKnowledge.care_tips (see agents/sensor_rules.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    species: str = Field(index=True, unique=True)
+    temp_min: float
+    temp_max: float
+    moisture_min: float
+    moisture_max: float
+    light_min: float
+    light_max: float
+
 # Database engine helper
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import get_settings
 
+# One engine (and connection pool) per database URL for the life of the process
+_engines = {}
+
 def get_engine():
     settings = get_settings()
-    return create_engine(settings.DATABASE_URL)
+    url = settings.DATABASE_URL
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines.setdefault(url, create_db_engine(url))
+    return engine
+
+def create_db_engine(url: str):
+    """Builds a pooled engine; SQLite connections get WAL and the tuned pragmas on connect."""
+    settings = get_settings()
+    if not url.startswith("sqlite"):
+        if url.startswith("postgres://"):
+            url = "postgresql://" + url[len("postgres://"):]  # Heroku-style URLs
+        return create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            pool_use_lifo=True,  # Surplus connections go idle and get recycled instead of lingering
+            connect_args={"application_name": settings.DB_APPLICATION_NAME} if url.startswith("postgresql") else {}
+        )
+
+    # FastAPI hands sessions between worker threads, so connections must not be thread-bound
+    connect_args = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # Every new connection would be a fresh empty database - share a single one
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+
+    _apply_sqlite_pragmas(engine)
+    return engine
+
+def _apply_sqlite_pragmas(engine):
+    settings = get_settings()
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")        # Readers (poll) no longer block the writer (ingest)
+        cursor.execute("PRAGMA synchronous=NORMAL")      # Safe with WAL, avoids an fsync per commit
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.close()
+
+# Async engine for request handlers (the sync engine above stays for startup and debug/ scripts)
+_async_engines = {}
+
+def async_database_url(url: str) -> str:
+    """Maps a sync DATABASE_URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg:" + url[len(prefix):]
+    return url
+
+def get_async_engine():
+    settings = get_settings()
+    url = settings.DATABASE_URL
+    engine = _async_engines.get(url)
+    if engine is None:
+        engine = _async_engines.setdefault(url, create_async_db_engine(url))
+    return engine
+
+def create_async_db_engine(url: str):
+    settings = get_settings()
+    async_url = async_database_url(url)
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            async_url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+            connect_args={"server_settings": {"application_name": settings.DB_APPLICATION_NAME}}
+            if async_url.startswith("postgresql+asyncpg") else {}
+        )
+
+    connect_args = {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        engine = create_async_engine(async_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(
+            async_url,
+            connect_args=connect_args,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+    _apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+def async_session() -> AsyncSession:
+    # Objects stay readable after commit - expired attributes can't lazy-load under asyncio
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
 
 def init_db():
-    SQLModel.metadata.create_all(get_engine())
+    """Creates missing tables, then applies pending versioned migrations (see migrations.py)."""
+    from migrations import run_migrations
+    engine = get_engine()
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
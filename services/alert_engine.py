@@ -0,0 +1,103 @@
+"""
+Low-moisture alert state machine, one per device, evaluated incrementally at ingest.
+
+A pot goes from armed to alerting once moisture has stayed below ALERT_ENTER_MOISTURE for
+ALERT_MIN_DURATION_SECONDS, and only re-arms after it recovers above ALERT_EXIT_MOISTURE, so a
+sensor hovering around the threshold raises one alert instead of one per reading. Alerts for the
+same pot are also at least ALERT_COOLDOWN_MINUTES apart: a dry spell that starts during the cool-down
+stays pending and alerts on the first reading after it ends if the soil is still dry.
+An alert that fires is recorded on its reading's event (see reading_store.alert_event), which is
+what the poll endpoint looks for - readings that merely sit below the threshold are not alerts.
+State is in memory per process, replayed from the ring buffers on startup (warm()).
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from config import get_settings
+
+_EPOCH = datetime(1970, 1, 1)
+
+class _AlertState:
+    __slots__ = ("alerting", "low_since", "last_fired", "deferred")
+
+    def __init__(self):
+        self.alerting = self.deferred = False
+        self.low_since = self.last_fired = None
+
+class AlertEngine:
+    def __init__(self):
+        self.settings = get_settings()  # Read on every reading, so thresholds can be tuned at runtime
+        self._states: Dict[str, _AlertState] = {}
+        self._lock = threading.Lock()
+        self.fired = self.suppressed = 0
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self.fired = self.suppressed = 0
+
+    def _step(self, device_id: str, ts: float, moisture: float) -> bool:
+        state = self._states.get(device_id)
+        if state is None:
+            state = self._states[device_id] = _AlertState()
+        if state.alerting:
+            if moisture > self.settings.ALERT_EXIT_MOISTURE:
+                state.alerting = False
+            return False
+        if moisture >= self.settings.ALERT_ENTER_MOISTURE:
+            state.low_since, state.deferred = None, False  # A single dip doesn't start the clock for the next one
+            return False
+        if state.low_since is None:
+            state.low_since = ts
+        if ts - state.low_since < self.settings.ALERT_MIN_DURATION_SECONDS:
+            return False
+        if state.last_fired is not None and ts - state.last_fired < self.settings.ALERT_COOLDOWN_MINUTES * 60:
+            if not state.deferred:  # Counted once per dry spell, however many readings it lasts
+                state.deferred = True
+                self.suppressed += 1
+            return False  # Still pending - fires on the first dry reading after the cool-down
+        state.alerting, state.low_since, state.deferred = True, None, False
+        state.last_fired = ts
+        self.fired += 1
+        return True
+
+    def observe(self, device_id: str, timestamp: datetime, moisture: Optional[float]) -> bool:
+        """Feeds one accepted reading. True when it raises a new alert."""
+        if moisture is None:
+            return False
+        with self._lock:
+            fired = self._step(device_id, (timestamp - _EPOCH).total_seconds(), moisture)
+        if fired:
+            print(f"DEBUG: [Alerts] {device_id} moisture {moisture:.1f}% - raising low-moisture alert")
+        return fired
+
+    def alerting(self, device_id: str) -> bool:
+        with self._lock:
+            state = self._states.get(device_id)
+            return bool(state and state.alerting)
+
+    def warm(self, readings=None) -> int:
+        """Replays the ring buffers (accepted readings only) so a restart doesn't re-alert. Returns readings replayed."""
+        if readings is None:
+            from services.recent_readings import recent_readings as readings
+        from services.recent_readings import CHANNELS
+        self.clear()
+        replayed = 0
+        with self._lock:
+            for device_id in readings.device_ids():
+                ts, values = readings.window(device_id)
+                for t, moisture in zip(ts.tolist(), values[CHANNELS.index("moisture")].tolist()):
+                    if moisture == moisture:  # NaN: moisture was quarantined on that reading
+                        self._step(device_id, t, moisture)
+                replayed += int(ts.size)
+            self.fired = self.suppressed = 0
+        return replayed
+
+    def stats(self) -> dict:
+        with self._lock:
+            alerting = sum(s.alerting for s in self._states.values())
+        return {"devices_tracked": len(self._states), "alerting": alerting,
+                "fired": self.fired, "suppressed_by_cooldown": self.suppressed}
+
+# Global singleton instance
+alert_engine = AlertEngine()
@@ -0,0 +1,155 @@
+"""
+Online per-device, per-channel anomaly detection for ingested readings (O(1) time and memory per reading).
+
+Each channel keeps an exponentially weighted mean and variance of its accepted readings. A new value is an
+outlier when it is
+  - outside the sensor's physical range ("range": e.g. -127 °C from a disconnected DS18B20),
+  - changing faster than the channel can physically change ("rate": e.g. moisture 0 -> 100 in a minute),
+  - too many EWMA standard deviations from the baseline ("zscore"), on the sides where sudden moves are
+    implausible - moisture only downwards, since waterings legitimately jump it up.
+Outliers are stored with a quarantine event naming the flagged channels (see reading_store.quarantine_event);
+those channels - and only those - are kept out of the baseline, alerts, rollups, the ring buffers and the
+agents' sensor context. A rate/z-score outlier that
+persists for ANOMALY_CONFIRM_READINGS readings is a real level shift: the baseline restarts from it, as
+it does after ANOMALY_STALE_MINUTES without accepted readings (a pot that was off tells us nothing about now).
+State is in memory per process, re-learnt from the ring buffers on startup (warm()).
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional
+from config import get_settings
+from services.reading_store import quarantine_event
+
+CHANNELS = ("temperature", "moisture", "light")
+_EPOCH = datetime(1970, 1, 1)
+
+class ChannelRule(NamedTuple):
+    low: float
+    high: float
+    max_rate_per_minute: Optional[float]  # None: no rate limit
+    z_side: Optional[str]  # "both", "low" or None (no z-score test)
+    z_floor: float  # Minimum standard deviation, so a very steady channel doesn't flag every wobble
+
+RULES = {
+    "temperature": ChannelRule(-40.0, 85.0, 5.0, "both", 0.5),
+    "moisture": ChannelRule(0.0, 100.0, 60.0, "low", 2.0),
+    "light": ChannelRule(0.0, 100.0, None, None, 5.0),  # Lamps switch on and off - only the range is checked
+}
+
+class _ChannelState:
+    __slots__ = ("mean", "var", "count", "last_value", "last_ts", "outliers")
+
+    def __init__(self):
+        self.mean = self.var = 0.0
+        self.count = self.outliers = 0
+        self.last_value = self.last_ts = None
+
+    def accept(self, value: float, ts: float, alpha: float):
+        if self.count:
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.var = (1 - alpha) * (self.var + diff * increment)
+        else:
+            self.mean, self.var = value, 0.0
+        self.count += 1
+        self.outliers = 0
+        if self.last_ts is None or ts >= self.last_ts:  # Backfilled history doesn't move the latest value back
+            self.last_value, self.last_ts = value, ts
+
+class AnomalyDetector:
+    def __init__(self, alpha: Optional[float] = None, z_threshold: Optional[float] = None,
+                 warmup: Optional[int] = None, confirm: Optional[int] = None, stale_minutes: Optional[float] = None):
+        settings = get_settings()
+        self.alpha = alpha if alpha is not None else settings.ANOMALY_EWMA_ALPHA
+        self.z_threshold = z_threshold if z_threshold is not None else settings.ANOMALY_Z_THRESHOLD
+        self.warmup = warmup if warmup is not None else settings.ANOMALY_WARMUP_READINGS
+        self.confirm = confirm if confirm is not None else settings.ANOMALY_CONFIRM_READINGS
+        self.stale_seconds = (stale_minutes if stale_minutes is not None else settings.ANOMALY_STALE_MINUTES) * 60
+        self._states: Dict[tuple, _ChannelState] = {}
+        self._lock = threading.Lock()
+        self.flagged = 0
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self.flagged = 0
+
+    def _reason(self, rule: ChannelRule, state: _ChannelState, value: Optional[float], ts: float) -> Optional[str]:
+        if value is None or math.isnan(value) or not rule.low <= value <= rule.high:
+            return "range"
+        if state.count and rule.max_rate_per_minute is not None:
+            minutes = max(abs(ts - state.last_ts) / 60, 1.0)  # Back-to-back readings count as a minute apart
+            if abs(value - state.last_value) / minutes > rule.max_rate_per_minute:
+                return "rate"
+        if state.count >= self.warmup and rule.z_side:
+            z = (value - state.mean) / math.sqrt(state.var + rule.z_floor ** 2)
+            if z < -self.z_threshold or (rule.z_side == "both" and z > self.z_threshold):
+                return "zscore"
+        return None
+
+    def check(self, device_id: str, timestamp: datetime, values: dict) -> Dict[str, str]:
+        """Screens one reading and learns from it. Returns {channel: reason} for outlier channels ({} if clean)."""
+        ts = (timestamp - _EPOCH).total_seconds()
+        reasons = {}
+        with self._lock:
+            for channel in CHANNELS:
+                state = self._states.get((device_id, channel))
+                if state is None:
+                    state = self._states[(device_id, channel)] = _ChannelState()
+                elif state.count and abs(ts - state.last_ts) > self.stale_seconds:
+                    state.count = state.outliers = 0
+                value = values.get(channel)
+                reason = self._reason(RULES[channel], state, value, ts)
+                if reason is None:
+                    state.accept(value, ts, self.alpha)
+                    continue
+                state.outliers += 1
+                if reason != "range" and state.outliers >= self.confirm:
+                    print(f"DEBUG: [Anomaly] {device_id} {channel} settled at {value:g} - accepting the new level")
+                    state.count = 0
+                    state.accept(value, ts, self.alpha)
+                    continue
+                reasons[channel] = reason
+            if reasons:
+                self.flagged += 1
+        return reasons
+
+    def screen(self, readings: Iterable[dict]) -> int:
+        """Checks reading dicts (device_id, timestamp, channels, event) in timestamp order, quarantining outliers in place."""
+        flagged = 0
+        for reading in sorted(readings, key=lambda r: r["timestamp"]):
+            reasons = self.check(reading["device_id"], reading["timestamp"], reading)
+            if reasons:
+                reading["event"] = quarantine_event(reasons, reading.get("event"))
+                flagged += 1
+        return flagged
+
+    def last_accepted(self, device_id: str) -> dict:
+        """Most recent accepted value per channel (None where there is none yet)."""
+        with self._lock:
+            return {c: getattr(self._states.get((device_id, c)), "last_value", None) for c in CHANNELS}
+
+    def warm(self, readings=None) -> int:
+        """Re-learns baselines from the ring buffers (which only hold accepted readings). Returns readings replayed."""
+        if readings is None:
+            from services.recent_readings import recent_readings as readings
+        self.clear()
+        replayed = 0
+        with self._lock:
+            for device_id in readings.device_ids():
+                ts, values = readings.window(device_id)
+                for i, channel in enumerate(CHANNELS):
+                    state = self._states[(device_id, channel)] = _ChannelState()
+                    for t, value in zip(ts.tolist(), values[i].tolist()):
+                        if value == value:  # NaN: this channel was quarantined on that reading
+                            state.accept(value, t, self.alpha)
+                replayed += int(ts.size)
+        return replayed
+
+    def stats(self) -> dict:
+        return {"channels_tracked": len(self._states), "flagged": self.flagged}
+
+# Global singleton instance
+anomaly_detector = AnomalyDetector()
@@ -0,0 +1,294 @@
+"""
+Long-term archive of raw sensor history.
+
+Readings older than ARCHIVE_RETENTION_DAYS are moved out of sensorreading into one SensorArchive
+block per device and month. A block is columnar and Gorilla-compressed:
+  - timestamps (integer microseconds) as delta-of-delta with variable-width buckets,
+  - temperature / moisture / light as XOR of consecutive float64 bit patterns,
+  - the (sparse) event strings as JSON.
+Rollups are left untouched, so charts are unaffected; reading_store.readings_between() merges
+archived blocks with the raw rows for range queries.
+
+Run from cron with:  python -m services.archive [retention_days]
+"""
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from config import get_settings
+from models import get_engine, SensorArchive, SensorReading
+
+CHANNELS = ("temperature", "moisture", "light")
+MAGIC = b"GOR1"
+_HEADER = struct.Struct("<4sI5I")  # magic, count, byte length of each stream (ts, 3 channels, events)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Delta-of-delta buckets: (prefix bits, prefix length, value bits). 0 is a single '0' bit.
+_DOD_BUCKETS = ((0b10, 2, 12), (0b110, 3, 20), (0b1110, 4, 32), (0b1111, 4, 64))
+
+class _BitWriter:
+    def __init__(self):
+        self._out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._bits += nbits
+        while self._bits >= 8:
+            self._bits -= 8
+            self._out.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            return bytes(self._out) + bytes([(self._acc << (8 - self._bits)) & 0xFF])
+        return bytes(self._out)
+
+class _BitReader:
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, nbits: int) -> int:
+        # Only touches the bytes spanned by the field, so reads stay O(1) however long the block is
+        start, end = self._pos >> 3, (self._pos + nbits + 7) >> 3
+        shift = (end << 3) - self._pos - nbits
+        self._pos += nbits
+        return (int.from_bytes(self._data[start:end], "big") >> shift) & ((1 << nbits) - 1)
+
+def _signed(value: int, nbits: int) -> int:
+    return value - (1 << nbits) if value >= 1 << (nbits - 1) else value
+
+def encode_timestamps(micros: np.ndarray) -> bytes:
+    out = _BitWriter()
+    if not len(micros):
+        return out.getvalue()
+    out.write(int(micros[0]), 64)
+    deltas = np.diff(micros.astype(np.int64))
+    dods = np.diff(deltas, prepend=0).tolist()
+    for dod in dods:
+        if dod == 0:
+            out.write(0, 1)
+            continue
+        for prefix, prefix_bits, nbits in _DOD_BUCKETS:
+            if -(1 << (nbits - 1)) <= dod < (1 << (nbits - 1)):
+                out.write(prefix, prefix_bits)
+                out.write(dod, nbits)
+                break
+    return out.getvalue()
+
+def decode_timestamps(data: bytes, count: int) -> np.ndarray:
+    result = np.empty(count, dtype=np.int64)
+    if not count:
+        return result
+    bits = _BitReader(data)
+    ts = bits.read(64)
+    result[0] = ts = _signed(ts, 64)
+    delta = 0
+    for i in range(1, count):
+        if bits.read(1):
+            if not bits.read(1):
+                nbits = 12
+            elif not bits.read(1):
+                nbits = 20
+            else:
+                nbits = 64 if bits.read(1) else 32
+            delta += _signed(bits.read(nbits), nbits)
+        ts += delta
+        result[i] = ts
+    return result
+
+def encode_floats(values: np.ndarray) -> bytes:
+    out = _BitWriter()
+    if not len(values):
+        return out.getvalue()
+    patterns = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    out.write(int(patterns[0]), 64)
+    lead, trail = -1, -1  # No window yet
+    for xor in (patterns[1:] ^ patterns[:-1]).tolist():
+        if xor == 0:
+            out.write(0, 1)
+            continue
+        new_lead = min(64 - xor.bit_length(), 31)
+        new_trail = (xor & -xor).bit_length() - 1
+        if lead >= 0 and new_lead >= lead and new_trail >= trail:
+            # Meaningful bits fit inside the previous window
+            out.write(0b10, 2)
+            out.write(xor >> trail, 64 - lead - trail)
+        else:
+            lead, trail = new_lead, new_trail
+            length = 64 - lead - trail
+            out.write(0b11, 2)
+            out.write(lead, 5)
+            out.write(length & 0x3F, 6)  # 64 wraps to 0
+            out.write(xor >> trail, length)
+    return out.getvalue()
+
+def decode_floats(data: bytes, count: int) -> np.ndarray:
+    result = np.empty(count, dtype=np.uint64)
+    if not count:
+        return result.view(np.float64)
+    bits = _BitReader(data)
+    value = bits.read(64)
+    result[0] = value
+    lead = trail = 0
+    for i in range(1, count):
+        if bits.read(1):
+            if bits.read(1):
+                lead = bits.read(5)
+                length = bits.read(6) or 64
+                trail = 64 - lead - length
+            value ^= bits.read(64 - lead - trail) << trail
+        result[i] = value
+    return result.view(np.float64)
+
+def encode_block(micros: np.ndarray, values: np.ndarray, events: Dict[int, str]) -> bytes:
+    """micros: int64 timestamps (sorted), values: channel x n float64, events: {row index: event}."""
+    streams = [encode_timestamps(micros)] + [encode_floats(values[i]) for i in range(len(CHANNELS))]
+    streams.append(json.dumps(sorted(events.items())).encode() if events else b"")
+    return _HEADER.pack(MAGIC, len(micros), *(len(s) for s in streams)) + b"".join(streams)
+
+def decode_block(data: bytes, channels=CHANNELS) -> Tuple[np.ndarray, Dict[str, np.ndarray], Dict[int, str]]:
+    """Returns (timestamps in microseconds, {channel: values}, {row index: event}). Unrequested channels are skipped."""
+    magic, count, *lengths = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an archive block")
+    offsets = np.cumsum([_HEADER.size] + lengths).tolist()
+    stream = lambda i: bytes(data[offsets[i]:offsets[i + 1]])
+    micros = decode_timestamps(stream(0), count)
+    values = {c: decode_floats(stream(1 + CHANNELS.index(c)), count) for c in channels}
+    events = {int(i): e for i, e in json.loads(stream(4))} if lengths[4] else {}
+    return micros, values, events
+
+def to_micros(ts: datetime) -> int:
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+def from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+def month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _block_rows(block: bytes) -> List[tuple]:
+    micros, values, events = decode_block(block)
+    columns = [values[c].tolist() for c in CHANNELS]
+    return [(t, *(col[i] for col in columns), events.get(i)) for i, t in enumerate(micros.tolist())]
+
+def _upsert_block(conn: Connection, row: dict):
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(SensorArchive.__table__).values(row)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["device_id", "month"],
+        set_={k: stmt.excluded[k] for k in ("count", "first_timestamp", "last_timestamp", "data")}))
+
+def archive_month(conn: Connection, device_id: str, month: datetime, before: datetime) -> int:
+    """Moves one device-month of raw readings (older than `before`) into its block. Returns rows moved."""
+    reading = SensorReading.__table__.c
+    window = (reading.device_id == device_id, reading.timestamp >= month,
+              reading.timestamp < min(_next_month(month), before))
+    raw = conn.execute(
+        select(reading.timestamp, reading.temperature, reading.moisture, reading.light, reading.event)
+        .where(*window).order_by(reading.timestamp)
+    ).all()
+    if not raw:
+        return 0
+
+    rows = [(to_micros(r[0]), r[1], r[2], r[3], r[4]) for r in raw]
+    existing = conn.execute(
+        select(SensorArchive.__table__.c.data)
+        .where(SensorArchive.device_id == device_id, SensorArchive.month == month)
+    ).scalar()
+    if existing is not None:
+        # A previous run archived the start of this month - merge and re-encode
+        rows = sorted(_block_rows(bytes(existing)) + rows, key=lambda r: r[0])
+
+    micros = np.array([r[0] for r in rows], dtype=np.int64)
+    values = np.array([[r[1 + i] for r in rows] for i in range(len(CHANNELS))], dtype=np.float64)
+    events = {i: r[4] for i, r in enumerate(rows) if r[4] is not None}
+    _upsert_block(conn, {
+        "device_id": device_id,
+        "month": month,
+        "count": len(rows),
+        "first_timestamp": from_micros(micros[0]),
+        "last_timestamp": from_micros(micros[-1]),
+        "data": encode_block(micros, values, events),
+    })
+    conn.execute(delete(SensorReading.__table__).where(*window))
+    return len(raw)
+
+def archive_readings(retention_days: Optional[int] = None, engine: Optional[Engine] = None,
+                     now: Optional[datetime] = None) -> int:
+    """Archives every reading older than the retention window, one transaction per device-month."""
+    retention_days = get_settings().ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    before = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    engine = engine or get_engine()
+    reading = SensorReading.__table__.c
+
+    with engine.connect() as conn:
+        oldest = conn.execute(
+            select(reading.device_id, func.min(reading.timestamp))
+            .where(reading.timestamp < before)
+            .group_by(reading.device_id)
+        ).all()
+
+    moved = 0
+    for device_id, first in oldest:
+        month = month_start(first)
+        while month < before:
+            with engine.begin() as conn:
+                count = archive_month(conn, device_id, month, before)
+            if count:
+                print(f"DEBUG: [Archive] {device_id} {month:%Y-%m}: archived {count} readings")
+            moved += count
+            month = _next_month(month)
+    return moved
+
+def load_archived(conn: Connection, device_id: str, start: datetime, end: datetime, channels=CHANNELS,
+                  limit: Optional[int] = None):
+    """
+    Archived readings in [start, end): (timestamps in microseconds, {channel: values}, events list).
+    With `limit` only the oldest N are returned, and blocks after the one that fills them are neither
+    fetched nor decoded - a paged export costs one page of blocks per page, not the whole remaining range.
+    """
+    blocks = conn.execute(
+        select(SensorArchive.__table__.c.data)
+        .where(SensorArchive.device_id == device_id,
+               SensorArchive.last_timestamp >= start, SensorArchive.first_timestamp < end)
+        .order_by(SensorArchive.month)  # Monthly blocks don't overlap, so this is time order
+    ).scalars()
+
+    lo, hi = to_micros(start), to_micros(end)
+    parts_ts, parts_values, events = [], {c: [] for c in channels}, []
+    collected = 0
+    for block in blocks:
+        if limit is not None and collected >= limit:
+            break
+        micros, values, block_events = decode_block(bytes(block), channels)
+        kept = np.flatnonzero((micros >= lo) & (micros < hi))
+        if limit is not None:
+            kept = kept[:limit - collected]
+        collected += kept.size
+        parts_ts.append(micros[kept])
+        for c in channels:
+            parts_values[c].append(values[c][kept])
+        events.extend(block_events.get(i) for i in kept.tolist())
+    blocks.close()
+    if not parts_ts:
+        return np.empty(0, dtype=np.int64), {c: np.empty(0) for c in channels}, []
+    return np.concatenate(parts_ts), {c: np.concatenate(v) for c, v in parts_values.items()}, events
+
+if __name__ == "__main__":
+    import sys
+    from models import init_db
+    init_db()
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"Archived {archive_readings(days)} readings")
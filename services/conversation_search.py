@@ -0,0 +1,105 @@
+"""
+Ranked full-text search over conversation transcripts (migration 5 builds the index).
+
+SQLite uses the FTS5 table conversation_fts (bm25, transcription weighted 2:1 over the reply);
+PostgreSQL uses the weighted conversation.search_vector with a GIN index (ts_rank_cd).
+Both accept the same web-search style query: words are ANDed, "quoted phrases", `or`, and -excluded.
+"""
+import re
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import DateTime, bindparam, text
+
+_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+")
+
+def fts5_query(query: str) -> str:
+    """Translates a web-search style query into FTS5 syntax with every term quoted (no syntax injection)."""
+    groups: List[List[str]] = [[]]  # OR of ANDed terms
+    excluded: List[str] = []
+    for phrase, word in _TOKEN.findall(query or ""):
+        if word and word.lower() == "or":
+            if groups[-1]:
+                groups.append([])
+            continue
+        negate = bool(word) and word.startswith("-")
+        words = _WORD.findall(phrase if phrase else word)
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        (excluded if negate else groups[-1]).append(term)
+
+    groups = [g for g in groups if g]
+    if not groups:
+        return ""
+    match = " OR ".join("(" + " AND ".join(g) + ")" for g in groups)
+    if excluded:
+        # FTS5's NOT is binary - it needs a left-hand side, which `match` provides
+        match = f"({match}) NOT ({' OR '.join(excluded)})"
+    return match
+
+def search_conversations(conn, query: str, device_id: Optional[str] = None, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Best matches first. Takes a sync Connection (use AsyncConnection.run_sync from handlers)."""
+    filters, params = [], {"limit": limit, "offset": offset}
+    if device_id:
+        filters.append("c.device_id = :device_id")
+        params["device_id"] = device_id
+    if start:
+        filters.append("c.timestamp >= :start")
+        params["start"] = start
+    if end:
+        filters.append("c.timestamp < :end")
+        params["end"] = end
+    where = "".join(f" AND {f}" for f in filters)
+
+    if conn.dialect.name == "postgresql":
+        params["query"] = query
+        sql = (
+            "SELECT c.id, c.device_id, c.timestamp, c.transcription, c.ai_response, c.mood, m.score, "
+            "ts_headline('english', coalesce(c.transcription, '') || ' | ' || coalesce(c.ai_response, ''), m.q, "
+            "'StartSel=[, StopSel=], MaxWords=20, MinWords=8') AS snippet "
+            "FROM ("
+            "  SELECT c.id, ts_rank_cd(c.search_vector, q) AS score, q FROM conversation c, "
+            "  websearch_to_tsquery('english', :query) q "
+            f"  WHERE c.search_vector @@ q{where} "
+            "  ORDER BY score DESC, c.id DESC LIMIT :limit OFFSET :offset"
+            ") m JOIN conversation c ON c.id = m.id "
+            "ORDER BY m.score DESC, c.id DESC"
+        )
+    else:
+        params["query"] = fts5_query(query)
+        if not params["query"]:
+            return []
+        # Rank first and build snippets for the page only; the filters join conversation just when needed.
+        # CROSS JOIN pins the join order so the outer MATCH is a rowid lookup, not a second full scan.
+        ranked = (
+            "SELECT conversation_fts.rowid AS id, bm25(conversation_fts, 2.0, 1.0) AS rank FROM conversation_fts "
+            + ("JOIN conversation c ON c.id = conversation_fts.rowid " if where else "")
+            + f"WHERE conversation_fts MATCH :query{where} "
+            "ORDER BY rank, conversation_fts.rowid DESC LIMIT :limit OFFSET :offset"
+        )
+        sql = (
+            "SELECT c.id, c.device_id, c.timestamp, c.transcription, c.ai_response, c.mood, -m.rank AS score, "
+            "snippet(conversation_fts, -1, '[', ']', '…', 12) AS snippet "
+            f"FROM ({ranked}) m CROSS JOIN conversation_fts CROSS JOIN conversation c "
+            "ON conversation_fts.rowid = m.id AND c.id = m.id "
+            "WHERE conversation_fts MATCH :query ORDER BY m.rank, m.id DESC"
+        )
+
+    # Typed so SQLite compares and returns timestamps in the ORM's storage format
+    stmt = text(sql).columns(timestamp=DateTime)
+    stmt = stmt.bindparams(*(bindparam(k, type_=DateTime) for k in ("start", "end") if k in params))
+    results = []
+    for row in conn.execute(stmt, params).mappings():
+        results.append({
+            "id": row["id"],
+            "device_id": row["device_id"],
+            "timestamp": row["timestamp"].isoformat(),
+            "user_query": row["transcription"],
+            "reply_text": row["ai_response"],
+            "mood": row["mood"],
+            "score": round(float(row["score"]), 4),
+            "snippet": row["snippet"],
+        })
+    return results
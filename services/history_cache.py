@@ -0,0 +1,133 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from config import get_settings
+from models import Conversation
+
+def history_row(convo: Conversation) -> dict:
+    """The /v1/history JSON shape of one conversation."""
+    return {
+        "id": convo.id,
+        "user_query": convo.transcription,
+        "reply_text": convo.ai_response,
+        "mood": convo.mood,
+        "audio_url": f"/audio/{convo.audio_file_path}" if convo.audio_file_path else None,
+        "timestamp": convo.timestamp.isoformat()
+    }
+
+def page_etag(rows: List[dict]) -> str:
+    """Content hash, so every worker hands out the same ETag for the same page."""
+    digest = hashlib.sha1(json.dumps(rows, sort_keys=True).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+class _Page:
+    __slots__ = ("created_at", "rows", "etags")
+
+    def __init__(self, rows: List[dict]):
+        self.created_at = time.monotonic()
+        self.rows = rows
+        self.etags: Dict[int, str] = {}  # Per requested limit, computed on first use
+
+class HistoryCache:
+    """
+    Latest /v1/history page per device (up to `page_size` rows, newest first).
+    Conversations committed in this process are prepended as they're inserted (see the ORM hooks
+    below); the TTL bounds how stale a page can get from inserts made by other workers.
+    """
+    def __init__(self, page_size: Optional[int] = None, ttl_seconds: Optional[float] = None, max_devices: Optional[int] = None):
+        settings = get_settings()
+        self.page_size = page_size or settings.HISTORY_CACHE_PAGE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.HISTORY_CACHE_TTL_SECONDS
+        self.max_devices = max_devices or settings.HISTORY_CACHE_MAX_DEVICES
+        self._pages: "OrderedDict[str, _Page]" = OrderedDict()
+        # Bumped on every change, so a page read from the DB before a concurrent insert isn't cached
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, device_id: str) -> int:
+        return self._generations.get(device_id, 0)
+
+    def get(self, device_id: str, limit: int):
+        """(rows, etag) for the newest `limit` conversations, or None on a miss."""
+        page = self._pages.get(device_id)
+        if page is None or time.monotonic() - page.created_at > self.ttl_seconds:
+            self._pages.pop(device_id, None)
+            self.misses += 1
+            return None
+        self._pages.move_to_end(device_id)
+        self.hits += 1
+        rows = page.rows[:limit]
+        etag = page.etags.get(limit)
+        if etag is None:
+            etag = page.etags[limit] = page_etag(rows)
+        return rows, etag
+
+    def put(self, device_id: str, rows: List[dict], generation: int):
+        """Caches a freshly queried page unless the device changed since `generation` was read."""
+        if generation != self.generation(device_id):
+            return
+        self._pages[device_id] = _Page(rows[:self.page_size])
+        self._pages.move_to_end(device_id)
+        while len(self._pages) > self.max_devices:
+            self._pages.popitem(last=False)
+
+    def add(self, device_id: str, row: dict):
+        """A conversation was committed: prepend it to the device's page (or drop the page if it doesn't fit on top)."""
+        self._generations[device_id] = self.generation(device_id) + 1
+        page = self._pages.get(device_id)
+        if page is None:
+            return
+        newest = page.rows[0] if page.rows else None
+        if newest is None or (row["timestamp"], row["id"]) > (newest["timestamp"], newest["id"]):
+            fresh = _Page([row] + page.rows[:self.page_size - 1])
+            fresh.created_at = page.created_at
+            self._pages[device_id] = fresh
+        else:
+            del self._pages[device_id]
+
+    def invalidate(self, device_id: str):
+        self._generations[device_id] = self.generation(device_id) + 1
+        self._pages.pop(device_id, None)
+
+    def clear(self):
+        for device_id in list(self._pages):
+            self.invalidate(device_id)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "devices": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+# Global singleton instance
+history_cache = HistoryCache()
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_conversation_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Conversation):
+            # Snapshot now - ids are assigned, and nothing needs reloading after commit
+            session.info.setdefault("history_new", []).append((obj.device_id, history_row(obj)))
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, Conversation):
+            session.info.setdefault("history_changed", set()).add(obj.device_id)
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_on_commit(session):
+    for device_id in session.info.pop("history_changed", ()):
+        history_cache.invalidate(device_id)
+    for device_id, row in session.info.pop("history_new", ()):
+        history_cache.add(device_id, row)
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("history_new", None)
+    session.info.pop("history_changed", None)
@@ -0,0 +1,151 @@
+"""
+"Time until thirsty": per-device soil drying forecasts, fitted for the whole fleet in one NumPy batch.
+
+Between waterings soil moisture decays roughly exponentially, m(t) = m0 * exp(-k * t), so
+log(moisture) is a straight line whose slope is the drying rate k. Each device's recent moisture
+(from the ring buffers in services/recent_readings.py) is cut at its last watering - a rise of
+FORECAST_WATERING_JUMP points or more - and fitted by least squares; every device is one row of the
+same padded matrix, so a refit is a handful of array reductions however large the fleet is.
+The time to reach a threshold is then (log(m_now) - log(threshold)) / k.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import get_settings
+from services.recent_readings import recent_readings, RecentReadings
+
+_EPOCH = datetime(1970, 1, 1)
+_MIN_RATE = 1e-6  # Per hour - flatter than this is "not drying"
+
+def fit_drying(ts: np.ndarray, moisture: np.ndarray, watering_jump: float, min_samples: int,
+               min_span_seconds: float) -> Dict[str, np.ndarray]:
+    """
+    Fits every row of (devices x n) NaN-padded, right-aligned matrices at once. Returns per-row arrays:
+    ok, rate (k, per hour), log_now (fitted log-moisture at the newest reading), last_ts, samples, r2.
+    """
+    devices, width = moisture.shape
+    if not width:
+        empty = np.zeros(devices)
+        return {"ok": empty.astype(bool), "rate": empty, "log_now": empty, "last_ts": empty,
+                "samples": empty.astype(int), "r2": empty}
+    columns = np.arange(width)
+
+    # Drying segment: everything after the last watering jump
+    jumped = np.zeros((devices, width), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        jumped[:, 1:] = np.diff(moisture, axis=1) >= watering_jump
+        valid = moisture > 0  # NaN padding compares False; log() needs positive values
+    last_jump = width - 1 - np.argmax(jumped[:, ::-1], axis=1)
+    segment_start = np.where(jumped.any(axis=1), last_jump, 0)
+    use = valid & (columns >= segment_start[:, None])
+
+    # Ordinary least squares of log(moisture) on hours before the newest reading, row by row
+    last_ts = ts[:, -1]
+    x = (ts - last_ts[:, None]) / 3600
+    x[~use] = 0.0
+    y = np.log(moisture, out=np.zeros_like(moisture), where=use)
+    n = use.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy, syy = (np.einsum("ij,ij->i", a, b) for a, b in ((x, x), (x, y), (y, y)))
+    denom = n * sxx - sx * sx
+    ok = (n >= max(min_samples, 2)) & (denom > 0)
+    count = np.maximum(n, 1)
+    slope = np.where(ok, (n * sxy - sx * sy) / np.where(ok, denom, 1.0), 0.0)
+    intercept = np.where(ok, (sy - slope * sx) / count, 0.0)
+    ok &= -x.min(axis=1) * 3600 >= min_span_seconds
+
+    # Goodness of fit from the same sums (no residual matrix)
+    ss_tot = syy - sy * sy / count
+    ss_res = syy - intercept * sy - slope * sxy
+    r2 = np.where(ss_tot > 1e-12, 1 - ss_res / np.where(ss_tot > 1e-12, ss_tot, 1.0), 1.0)
+
+    return {"ok": ok, "rate": -slope, "log_now": intercept, "last_ts": last_ts, "samples": n, "r2": r2}
+
+def hours_to_threshold(rate: np.ndarray, log_now: np.ndarray, threshold: float) -> np.ndarray:
+    """Hours after the newest reading until the fitted curve reaches `threshold` (0 if already below, inf if not drying)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hours = (log_now - np.log(threshold)) / rate
+    hours = np.where(rate > _MIN_RATE, hours, np.inf)
+    return np.where(log_now <= np.log(threshold), 0.0, hours)
+
+class MoistureForecaster:
+    """Caches the latest fleet-wide fit; refits everything at most every FORECAST_REFIT_SECONDS."""
+    def __init__(self, readings: RecentReadings = recent_readings):
+        self.settings = get_settings()
+        self._readings = readings
+        # (device index, fit arrays) - replaced as one object so concurrent readers never mix two fits
+        self._state: Optional[Tuple[Dict[str, int], Dict[str, np.ndarray]]] = None
+        self._fitted_at: Optional[float] = None
+        self._refit_lock = threading.Lock()  # Handlers call in from worker threads
+
+    def clear(self):
+        self._state, self._fitted_at = None, None
+
+    def refit(self, now: Optional[datetime] = None) -> int:
+        """Refits every device with readings in the window. Returns the number of devices fitted."""
+        s = self.settings
+        device_ids, ts, moisture = self._readings.batch(
+            "moisture", seconds=s.FORECAST_WINDOW_HOURS * 3600, max_samples=s.FORECAST_MAX_SAMPLES, now=now)
+        fit = fit_drying(ts, moisture, s.FORECAST_WATERING_JUMP, s.FORECAST_MIN_SAMPLES,
+                         s.FORECAST_MIN_SPAN_MINUTES * 60)
+        self._state = ({device_id: i for i, device_id in enumerate(device_ids)}, fit)
+        self._fitted_at = time.monotonic()
+        return int(fit["ok"].sum())
+
+    def _current(self, now: Optional[datetime]):
+        """The latest fit, refitting when stale. Only one caller refits; the rest keep using the previous fit."""
+        if self._fitted_at is None or time.monotonic() - self._fitted_at > self.settings.FORECAST_REFIT_SECONDS:
+            if self._refit_lock.acquire(blocking=self._state is None):
+                try:
+                    self.refit(now)
+                finally:
+                    self._refit_lock.release()
+        return self._state
+
+    def _forecast(self, fit: Dict[str, np.ndarray], i: int, threshold: float, now: datetime) -> Optional[dict]:
+        if not fit["ok"][i]:
+            return None
+        rate, log_now = fit["rate"][i], fit["log_now"][i]
+        hours = float(hours_to_threshold(np.array([rate]), np.array([log_now]), threshold)[0])
+        last = _EPOCH + timedelta(seconds=float(fit["last_ts"][i]))
+        eta = last + timedelta(hours=hours) if hours <= self.settings.FORECAST_HORIZON_HOURS else None
+        return {
+            "threshold": threshold,
+            "moisture_now": round(float(np.exp(log_now)), 2),
+            "drying_rate_per_hour": round(float(rate), 5),  # Fraction of the current moisture lost per hour
+            "hours_to_threshold": round(max((eta - now).total_seconds() / 3600, 0.0), 2) if eta else None,
+            "eta": eta.isoformat() if eta else None,
+            "fit_r2": round(float(fit["r2"][i]), 3),
+            "samples": int(fit["samples"][i]),
+        }
+
+    def get(self, device_id: str, threshold: Optional[float] = None, now: Optional[datetime] = None) -> Optional[dict]:
+        """The device's forecast, or None without a usable drying segment."""
+        index, fit = self._current(now)
+        i = index.get(device_id)
+        if i is None:
+            return None
+        threshold = threshold if threshold is not None else self.settings.PROACTIVE_MOISTURE_THRESHOLD
+        return self._forecast(fit, i, threshold, now or datetime.utcnow())
+
+    def due_within(self, hours: float, threshold: Optional[float] = None, now: Optional[datetime] = None) -> List[dict]:
+        """Devices expected to reach the threshold within `hours`, soonest first."""
+        index, fit = self._current(now)
+        threshold = threshold if threshold is not None else self.settings.PROACTIVE_MOISTURE_THRESHOLD
+        now = now or datetime.utcnow()
+        # Vectorized pre-filter on the fit, then exact per-device forecasts for the few that qualify
+        elapsed = (now - _EPOCH).total_seconds() - fit["last_ts"]
+        remaining = hours_to_threshold(fit["rate"], fit["log_now"], threshold) - elapsed / 3600
+        soon = np.flatnonzero(fit["ok"] & (remaining <= hours))
+        device_ids = list(index)
+        results = []
+        for i in soon[np.argsort(remaining[soon], kind="stable")].tolist():
+            forecast = self._forecast(fit, i, threshold, now)
+            if forecast and forecast["eta"]:
+                results.append({"device_id": device_ids[i], **forecast})
+        return results
+
+# Global singleton instance
+moisture_forecast = MoistureForecaster()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+from datetime import datetime, UTC
+from typing import Optional, Set
+from config import get_settings
+from models import async_session, Conversation, Device, SensorReading
+from services.reading_store import ALERT_PREFIX
+
+# Stands in for the user's question when the plant speaks up on its own
+PROACTIVE_QUERY = (
+    "(Nobody asked you anything - you just noticed your soil is drying out. "
+    "Tell your owner how you feel and what you need.)"
+)
+
+class ProactiveCareWorker:
+    """
+    Pre-generates a species-voiced "I'm parched!" reply when the alert engine raises a low-moisture
+    alert (services/alert_engine.py - so the same hysteresis and cool-down apply). The reply is written
+    by the Conversation Agent, synthesized and saved to disk in the background, then queued on the
+    device so its next poll plays finished audio instead of waiting on LLM + TTS.
+    The queued reply stands in for the generic notification chime: it marks the alert as notified,
+    and the poll holds the chime back for PROACTIVE_ALERT_HOLD_SECONDS while it is being prepared.
+    """
+    def __init__(self, session_factory=async_session, tts_factory=None):
+        self.settings = get_settings()
+        self._session_factory = session_factory
+        self._tts_factory = tts_factory
+        self._tts = None
+        self._pending: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def alert(self, device_id: str, species: str, sensor_data: dict, reading_id: Optional[int] = None) -> bool:
+        """Starts the voice alert for a freshly raised alert (its reading's id). True when a job was queued."""
+        if not self.settings.PROACTIVE_CARE_ENABLED:
+            return False
+        self._ensure_worker()
+        if device_id in self._pending:
+            return False
+        self._pending.add(device_id)
+        self._queue.put_nowait((device_id, species, dict(sensor_data), reading_id))
+        print(f"DEBUG: [ProactiveCare] Low-moisture alert on {device_id}, preparing voice alert")
+        return True
+
+    def holds(self, reading: SensorReading) -> bool:
+        """True while a voice alert for this alert reading may still be on its way (the poll keeps the chime back)."""
+        if not self.settings.PROACTIVE_CARE_ENABLED:
+            return False
+        if not (reading.event or "").startswith(ALERT_PREFIX) and reading.event != "remote_simulator_alert":
+            return False  # Not an alert proactive care was started for
+        age = (datetime.now(UTC).replace(tzinfo=None) - reading.timestamp).total_seconds()
+        return age < self.settings.PROACTIVE_ALERT_HOLD_SECONDS
+
+    async def prepare(self, device_id: str, species: str, sensor_data: dict,
+                      reading_id: Optional[int] = None) -> Optional[int]:
+        """Generates, synthesizes and queues one alert. Returns the Conversation id."""
+        reply = await self._generate(device_id, species, sensor_data)
+        text = reply["conversation_response"]
+
+        audio = await self._get_tts().synthesize_stream(text, volume_gain_db=self.settings.STREAM_VOLUME_GAIN_DB)
+        if not audio:
+            raise RuntimeError("TTS returned no audio")
+
+        # Relative to STORAGE_PATH, so /audio/<path> (history) and the stream endpoint can both serve it
+        filename = f"proactive/{device_id}_{int(datetime.now().timestamp() * 1000)}.mp3"
+        save_path = os.path.join(self.settings.STORAGE_PATH, filename)
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        with open(save_path, "wb") as f:
+            f.write(audio)
+
+        async with self._session_factory() as session:
+            convo = Conversation(
+                device_id=device_id,
+                transcription=None,
+                ai_response=text,
+                mood=reply.get("mood", "thirsty"),
+                audio_file_path=filename
+            )
+            session.add(convo)
+            await session.commit()
+            await session.refresh(convo)
+
+            device = await session.get(Device, device_id)
+            if device and device.pending_audio_id is None:
+                device.pending_audio_id = convo.id
+                if reading_id is not None and (device.last_notified_reading_id or 0) < reading_id:
+                    device.last_notified_reading_id = reading_id  # This reply is the alert - no chime on top of it
+                session.add(device)
+                await session.commit()
+                print(f"DEBUG: [ProactiveCare] Queued pre-synthesized alert {convo.id} for {device_id} ({len(audio)} bytes)")
+            else:
+                # Never clobber a reply the user is still waiting to hear (the poll plays the chime instead)
+                print(f"DEBUG: [ProactiveCare] {device_id} already has pending audio, alert {convo.id} kept in history only")
+            return convo.id
+
+    async def drain(self):
+        """Waits until every queued job has finished."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = self._queue = self._loop = None
+        self._pending.clear()
+
+    async def _generate(self, device_id: str, species: str, sensor_data: dict) -> dict:
+        from agents.conversation_agent import ConversationAgent
+        from agents.orchestrator import local_knowledge_context
+        from agents.sensor_rules import sensor_rules
+        from agents.fallbacks import start_budget, templated_reply
+
+        from services.recent_readings import recent_readings
+
+        sensor_text = sensor_rules.analyze(species, sensor_data)["sensor_analysis"]
+        trend = recent_readings.trend_text(device_id)
+        state = {
+            "device_id": device_id,
+            "species": species,
+            "user_query": PROACTIVE_QUERY,
+            "intent_tag": "HEALTH",
+            "sensor_analysis": f"{sensor_text} {trend}" if trend else sensor_text,
+            "plant_knowledge": local_knowledge_context(species, PROACTIVE_QUERY),
+            "sensor_data": sensor_data,
+            "deadline": start_budget(self.settings.PROACTIVE_BUDGET_SECONDS)
+        }
+        try:
+            return await ConversationAgent().run(state)
+        except Exception as e:
+            print(f"WARNING: [ProactiveCare] LLM failed ({e}), using templated alert")
+            return templated_reply(state)
+
+    def _get_tts(self):
+        if self._tts is None:
+            if self._tts_factory is None:
+                from services.speech_synthesis import SpeechSynthesisService
+                self._tts_factory = SpeechSynthesisService
+            self._tts = self._tts_factory()
+        return self._tts
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._pending.clear()
+            self._loop = loop
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            device_id, species, sensor_data, reading_id = await self._queue.get()
+            try:
+                await self.prepare(device_id, species, sensor_data, reading_id)
+            except Exception as e:
+                print(f"WARNING: [ProactiveCare] Failed to prepare alert for {device_id}: {e}")
+            finally:
+                self._pending.discard(device_id)
+                self._queue.task_done()
+
+# Global singleton instance
+proactive_care = ProactiveCareWorker()
@@ -0,0 +1,196 @@
+"""
+Sensor history queries behind GET /v1/device/{id}/readings.
+
+Raw pages come from reading_store.readings_between (archive blocks + raw rows). Bucketed pages are
+aggregated with NumPy reduceat - over the minute/hour/day rollups when the bucket width and the
+requested aggregates allow it, otherwise over the fetched raw columns. Either way channels the anomaly
+detector quarantined are left out of that channel's aggregates (null for a bucket where every reading was
+quarantined); raw pages still return them as sent, with their event.
+Pages are keyset-paginated with opaque cursors, so exports never use OFFSET.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from models import SensorRollup
+from services.reading_store import quarantined_channels, readings_between
+from services.rollups import RESOLUTIONS
+
+AGGREGATES = ("min", "max", "mean", "first", "last", "sum", "count", "std")
+ROLLUP_AGGREGATES = {"min", "max", "mean", "last", "sum", "count"}  # What the rollup columns can answer
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _micros(ts: datetime) -> int:
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+def _iso(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=int(micros))).isoformat()
+
+def parse_bucket(value: Optional[str]) -> Optional[int]:
+    """'300', '5m', '1h', '1d' -> seconds (None for raw readings)."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    unit = _UNITS.get(value[-1])
+    seconds = int(value[:-1]) * unit if unit else int(value)
+    if seconds <= 0:
+        raise ValueError("bucket must be positive")
+    return seconds
+
+def parse_choices(value: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> Tuple[str, ...]:
+    if not value:
+        return tuple(default)
+    chosen = tuple(dict.fromkeys(v.strip() for v in value.split(",") if v.strip()))
+    unknown = [v for v in chosen if v not in allowed]
+    if unknown:
+        raise ValueError(f"unknown {', '.join(unknown)} (expected {', '.join(allowed)})")
+    return chosen
+
+def check_cursor(cursor: Optional[str], bucket: Optional[int]):
+    """Raises ValueError for a cursor that read_page could not have produced for this kind of query."""
+    if cursor:
+        parts = [int(p) for p in cursor.split(":")]
+        if len(parts) != (2 if bucket is None else 1) or min(parts) < 0:
+            raise ValueError("malformed cursor")
+
+def output_columns(bucket: Optional[int], aggregates: Sequence[str], channels: Sequence[str]) -> List[str]:
+    """Row keys read_page produces, in order (CSV header)."""
+    if bucket is None:
+        return ["t", *channels, "event"]
+    return ["t", "count"] + [f"{c}_{a}" for c in channels for a in aggregates if a != "count"]
+
+def aggregate_buckets(micros: np.ndarray, values: Dict[str, np.ndarray], width: int, aggregates: Sequence[str]) -> dict:
+    """Groups time-ordered raw columns into epoch-aligned buckets of `width` seconds. NaN values are skipped."""
+    width_us = width * 1_000_000
+    ids = micros // width_us
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if ids.size else np.empty(0, dtype=np.intp)
+    ends = np.r_[starts[1:], ids.size] - 1
+    counts = ends - starts + 1
+    columns = {"t": ids[starts] * width_us, "count": counts}
+    positions = np.arange(ids.size)
+    for channel, v in values.items():
+        if not starts.size:
+            break
+        seen = ~np.isnan(v)
+        filled = np.where(seen, v, 0.0)
+        n = np.add.reduceat(seen.astype(np.int64), starts)
+        first = np.minimum.reduceat(np.where(seen, positions, ids.size - 1), starts)
+        last = np.maximum.reduceat(np.where(seen, positions, 0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sums = np.where(n > 0, np.add.reduceat(filled, starts), np.nan)
+            found = {
+                "min": lambda: np.fmin.reduceat(v, starts),
+                "max": lambda: np.fmax.reduceat(v, starts),
+                "sum": lambda: sums,
+                "mean": lambda: sums / n,
+                "first": lambda: np.where(n > 0, v[first], np.nan),
+                "last": lambda: np.where(n > 0, v[last], np.nan),
+                "std": lambda: np.sqrt(np.maximum(np.add.reduceat(filled * filled, starts) / n - (sums / n) ** 2, 0.0)),
+            }
+            for agg in aggregates:
+                if agg != "count":
+                    columns[f"{channel}_{agg}"] = found[agg]()
+    return columns
+
+def rollup_resolution(width: int, aggregates: Sequence[str]) -> Optional[int]:
+    """Coarsest rollup that tiles the bucket width exactly and can answer every requested aggregate."""
+    if not set(aggregates) <= ROLLUP_AGGREGATES:
+        return None
+    fitting = [seconds for seconds in RESOLUTIONS.values() if width % seconds == 0]
+    return max(fitting) if fitting else None
+
+def aggregate_rollups(conn, device_id: str, start: datetime, end: datetime, width: int, resolution: int,
+                      aggregates: Sequence[str], channels: Sequence[str]) -> dict:
+    """Same output as aggregate_buckets, regrouped from rollup rows (whole rollup buckets only)."""
+    rollup = SensorRollup.__table__.c
+    parts = ("count", "min", "max", "sum", "last")
+    wanted = [rollup.bucket, rollup.count] + [rollup[f"{c}_{k}"] for c in channels for k in parts]
+    rows = conn.execute(
+        select(*wanted)
+        .where(rollup.device_id == device_id, rollup.resolution == resolution,
+               rollup.bucket >= start, rollup.bucket < end)
+        .order_by(rollup.bucket)
+    ).all()
+    if not rows:
+        return {"t": np.empty(0, dtype=np.int64), "count": np.empty(0, dtype=np.int64)}
+
+    table = list(zip(*rows))
+    micros = np.array([_micros(t) for t in table[0]], dtype=np.int64)
+    counts = np.array(table[1], dtype=np.int64)
+    width_us = width * 1_000_000
+    ids = micros // width_us
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], ids.size] - 1
+    bucket_counts = np.add.reduceat(counts, starts)
+    columns = {"t": ids[starts] * width_us, "count": bucket_counts}
+    positions = np.arange(ids.size)
+    for i, channel in enumerate(channels):
+        ns = np.array(table[2 + len(parts) * i], dtype=np.int64)
+        mins, maxes, sums, lasts = (np.array(table[3 + len(parts) * i + k], dtype=np.float64) for k in range(4))
+        n = np.add.reduceat(ns, starts)
+        last = np.maximum.reduceat(np.where(ns > 0, positions, 0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Rollup rows with no accepted value hold inf/-inf/0 - harmless to min/max/sum, nulled when the whole bucket is empty
+            found = {
+                "min": lambda: np.where(n > 0, np.minimum.reduceat(mins, starts), np.nan),
+                "max": lambda: np.where(n > 0, np.maximum.reduceat(maxes, starts), np.nan),
+                "sum": lambda: np.where(n > 0, np.add.reduceat(sums, starts), np.nan),
+                "mean": lambda: np.add.reduceat(sums, starts) / n,
+                "last": lambda: np.where(n > 0, lasts[last], np.nan),
+            }
+            for agg in aggregates:
+                if agg != "count":
+                    columns[f"{channel}_{agg}"] = found[agg]()
+    return columns
+
+def _column_rows(columns: dict) -> List[dict]:
+    names = list(columns)
+    lists = [columns[n].tolist() if isinstance(columns[n], np.ndarray) else columns[n] for n in names]
+    rows = []
+    for row in zip(*lists):
+        record = {name: None if value != value else value for name, value in zip(names, row)}  # NaN -> null
+        record["t"] = _iso(record["t"])
+        rows.append(record)
+    return rows
+
+def read_page(conn, device_id: str, start: datetime, end: datetime, bucket: Optional[int],
+              aggregates: Sequence[str], channels: Sequence[str], limit: int,
+              cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str], str]:
+    """
+    One page of history. Returns (rows, next_cursor, source) where source is "raw" or "rollups".
+    Raw cursors are "<timestamp µs>:<rows already returned at that timestamp>", bucket cursors "<bucket µs>".
+    Takes a sync Connection (use AsyncConnection.run_sync from handlers).
+    """
+    if bucket is None:
+        after, skip = (int(p) for p in cursor.split(":")) if cursor else (_micros(start), 0)
+        page_start = _EPOCH + timedelta(microseconds=after)
+        data = readings_between(conn, device_id, page_start, end, channels, limit=limit + skip)
+        columns = {"t": data["timestamp"], **{c: data[c] for c in channels}, "event": data["event"]}
+        columns = {k: v[skip:] for k, v in columns.items()}
+        rows = _column_rows(columns)
+        next_cursor = None
+        if len(rows) == limit:
+            last = int(columns["t"][-1])
+            same = int(np.count_nonzero(columns["t"] == last))
+            next_cursor = f"{last}:{same + (skip if last == after else 0)}"
+        return rows, next_cursor, "raw"
+
+    width_us = bucket * 1_000_000
+    page_start_us = int(cursor) if cursor else (_micros(start) // width_us) * width_us  # Epoch-aligned buckets
+    page_end_us = min(_micros(end), page_start_us + limit * width_us)
+    page_start = _EPOCH + timedelta(microseconds=page_start_us)
+    page_end = _EPOCH + timedelta(microseconds=page_end_us)
+
+    resolution = rollup_resolution(bucket, aggregates)
+    if resolution is not None:
+        columns, source = aggregate_rollups(conn, device_id, page_start, page_end, bucket, resolution, aggregates, channels), "rollups"
+    else:
+        data = readings_between(conn, device_id, page_start, page_end, channels)
+        flagged = [quarantined_channels(e) for e in data["event"]]  # Same values as the rollups
+        values = {c: np.where(np.array([c in f for f in flagged], dtype=bool), np.nan, data[c]) for c in channels}
+        columns = aggregate_buckets(data["timestamp"], values, bucket, aggregates)
+        source = "raw"
+    next_cursor = str(page_end_us) if page_end_us < _micros(end) else None
+    return _column_rows(columns), next_cursor, source
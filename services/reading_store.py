@@ -0,0 +1,168 @@
+import csv
+import io
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import and_, insert, literal, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+from models import get_engine, Conversation, Device, SensorReading
+
+COLUMNS = ["device_id", "timestamp", "temperature", "moisture", "light", "event"]
+CHANNELS = ("temperature", "moisture", "light")
+
+# Readings the poll endpoint treats as alerts: the ones the alert engine (services/alert_engine.py) raised
+# an alert on, tagged "alert:moisture_low" (or "alert:moisture_low|<device event>"), plus the explicit
+# simulator events. Migration 6 (migrations.py) indexes exactly this predicate as ix_sensorreading_alerts -
+# change both together (tests/test_query_plans.py will notice).
+ALERT_PREFIX = "alert:"
+ALERT_EVENTS = ("low_moisture_alert", "remote_simulator_alert")
+
+# Readings the anomaly detector (services/anomaly_detector.py) flagged carry this event tag naming the
+# outlier channels, e.g. "anomaly:temperature_range" or "anomaly:moisture_rate|wake_word" (after the alert
+# tag if one fired: "alert:moisture_low|anomaly:temperature_range"). They stay in history as sent; only the
+# flagged channels are kept out of alerts, rollups, the ring buffers and agent context - a dead temperature
+# probe doesn't blind the moisture alerts.
+QUARANTINE_PREFIX = "anomaly:"
+
+def quarantine_event(reasons: Dict[str, str], event: Optional[str] = None) -> str:
+    flagged = QUARANTINE_PREFIX + ",".join(f"{channel}_{reason}" for channel, reason in reasons.items())
+    return f"{flagged}|{event}" if event else flagged
+
+def alert_event(event: Optional[str] = None) -> str:
+    flagged = f"{ALERT_PREFIX}moisture_low"
+    return f"{flagged}|{event}" if event else flagged
+
+def quarantined_channels(event: Optional[str]) -> Tuple[str, ...]:
+    """Channels the anomaly detector flagged on a reading's event (() for a clean reading)."""
+    for tag in (event or "").split("|"):
+        if tag.startswith(QUARANTINE_PREFIX):
+            return tuple(flag.rsplit("_", 1)[0] for flag in tag[len(QUARANTINE_PREFIX):].split(","))
+    return ()
+
+def is_quarantined(event: Optional[str]) -> bool:
+    return bool(quarantined_channels(event))
+
+def accepted_values(reading: dict, channels=CHANNELS) -> Tuple[Optional[float], ...]:
+    """The reading's channel values, None for the ones the anomaly detector flagged."""
+    flagged = quarantined_channels(reading.get("event"))
+    return tuple(None if c in flagged else reading.get(c) for c in channels)
+
+def latest_alert_reading_query(device_id: str):
+    """Most recent alert-worthy reading for a device (served by ix_sensorreading_alerts)."""
+    # Rendered as literals, not bind parameters, so Postgres can match the partial index predicate
+    # even for server-side prepared statements (asyncpg)
+    is_alert = or_(
+        SensorReading.event.like(literal(f"{ALERT_PREFIX}%", literal_execute=True)),
+        SensorReading.event.in_([literal(e, literal_execute=True) for e in ALERT_EVENTS])
+    )
+    return (
+        select(SensorReading)
+        .where(SensorReading.device_id == device_id, is_alert)
+        .order_by(SensorReading.timestamp.desc())
+        .limit(1)
+    )
+
+def latest_hardware_reading_query(since: Optional[datetime] = None):
+    """Most recent reading from any physical (non-simulator) pot, optionally within a window."""
+    statement = select(SensorReading).join(Device).where(Device.is_simulator == False)
+    if since is not None:
+        statement = statement.where(SensorReading.timestamp >= since)
+    return statement.order_by(SensorReading.timestamp.desc()).limit(1)
+
+def conversation_history_query(device_id: str, limit: int = 10, before_id: Optional[int] = None):
+    """Newest-first history page; `before_id` continues after that conversation (keyset on timestamp, id)."""
+    statement = select(Conversation).where(Conversation.device_id == device_id)
+    if before_id is not None:
+        cursor_ts = select(Conversation.timestamp).where(Conversation.id == before_id).scalar_subquery()
+        statement = statement.where(or_(
+            Conversation.timestamp < cursor_ts,
+            and_(Conversation.timestamp == cursor_ts, Conversation.id < before_id)
+        ))
+    return statement.order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(limit)
+
+def readings_between(conn, device_id: str, start: datetime, end: datetime, channels=CHANNELS,
+                     limit: Optional[int] = None) -> dict:
+    """
+    Columnar readings for one device in [start, end), oldest first: archived blocks (services/archive.py)
+    merged with the raw rows. {"timestamp": int64 microseconds, <channel>: float64 arrays, "event": list}.
+    `limit` keeps only the oldest N. Takes a sync Connection - from async code use AsyncConnection.run_sync.
+    """
+    from services.archive import load_archived, to_micros
+
+    archived_ts, archived, archived_events = load_archived(conn, device_id, start, end, channels, limit=limit)
+    columns = [getattr(SensorReading, c) for c in channels]
+    raw = conn.execute(
+        select(SensorReading.timestamp, SensorReading.event, *columns)
+        .where(SensorReading.device_id == device_id, SensorReading.timestamp >= start, SensorReading.timestamp < end)
+        .order_by(SensorReading.timestamp, SensorReading.id)  # Deterministic ties for keyset paging
+        .limit(limit)
+    ).all()
+
+    raw_ts = np.array([to_micros(r[0]) for r in raw], dtype=np.int64)
+    ts = np.concatenate([archived_ts, raw_ts])
+    order = np.argsort(ts, kind="stable")[:limit]  # Archive and raw only overlap if an archive run was interrupted
+    result = {"timestamp": ts[order]}
+    for i, c in enumerate(channels):
+        raw_values = np.array([r[2 + i] for r in raw], dtype=np.float64)
+        result[c] = np.concatenate([archived[c], raw_values])[order]
+    events = archived_events + [r[1] for r in raw]
+    result["event"] = [events[i] for i in order.tolist()]
+    return result
+
+def _rows(readings: Iterable[dict]) -> List[dict]:
+    now = datetime.utcnow()
+    rows = []
+    for r in readings:
+        ts = r.get("timestamp") or now
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        if ts.tzinfo is not None:
+            ts = (ts - ts.utcoffset()).replace(tzinfo=None)  # Stored naive UTC like datetime.utcnow
+        rows.append({
+            "device_id": r["device_id"],
+            "timestamp": ts,
+            # Missing channels raise (KeyError/TypeError) rather than being stored as a fake 0.0 reading
+            "temperature": float(r["temperature"]),
+            "moisture": float(r["moisture"]),
+            "light": float(r["light"]),
+            "event": r.get("event"),
+        })
+    return rows
+
+def bulk_insert_readings(readings: Iterable[dict], engine: Optional[Engine] = None, screen: bool = False) -> int:
+    """
+    Inserts many SensorReading rows in one round trip.
+    PostgreSQL (psycopg2) streams them through COPY; other backends use a single executemany.
+    Their minute/hour/day rollups are updated in the same transaction.
+    Timestamps may be datetimes or ISO strings (UTC when an offset is given); missing ones default to now.
+    Every reading needs all three channels - a missing one raises KeyError/TypeError.
+    With screen=True the anomaly detector quarantines outliers first (see QUARANTINE_PREFIX).
+    """
+    rows = _rows(readings)
+    if not rows:
+        return 0
+    if screen:
+        from services.anomaly_detector import anomaly_detector
+        anomaly_detector.screen(rows)
+    engine = engine or get_engine()
+
+    from services.rollups import fold_readings
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                # Empty unquoted field = NULL in COPY's CSV format
+                writer.writerow([row[c] if row[c] is not None else "" for c in COLUMNS])
+            buf.seek(0)
+            # COPY on the driver connection underneath, so it shares the transaction with the rollups
+            with conn.connection.driver_connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY sensorreading ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+        else:
+            conn.execute(insert(SensorReading.__table__), rows)
+        fold_readings(conn, rows)
+
+    from services.recent_readings import recent_readings
+    recent_readings.extend(rows)
+    return len(rows)
@@ -0,0 +1,269 @@
+"""
+In-memory columnar ring buffers of each device's recent readings.
+
+Simulator sync, agent trend context and the recent-history endpoint read from here instead of
+querying sensorreading. Committed ORM writes and bulk_insert_readings feed the buffers, and
+warm() reloads the last RECENT_READINGS_HOURS from the database at startup. Channels the anomaly
+detector flagged are stored as NaN (the reading's other channels are kept) and skipped by every reader.
+Buffers are per process: with several workers each one sees its own writes plus the warm load.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from config import get_settings
+from models import get_engine, Device, SensorReading
+from services.reading_store import accepted_values
+
+CHANNELS = ("temperature", "moisture", "light")
+UNITS = {"temperature": "°C", "moisture": "%", "light": "%"}
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _seconds(ts: datetime) -> float:
+    return (ts - _EPOCH).total_seconds()
+
+def _datetime(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=float(seconds))
+
+def to_list(values: np.ndarray) -> list:
+    """Channel values as a JSON-safe list (NaN, i.e. a quarantined channel, becomes None)."""
+    return [None if v != v else v for v in values.tolist()]
+
+class DeviceRing:
+    """Fixed-capacity, time-ordered buffer: one float64 column for timestamps, one row per channel."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((len(CHANNELS), capacity), dtype=np.float64)
+        self.size = 0
+        self._next = 0
+
+    def append(self, ts: float, values: Tuple[float, float, float]) -> bool:
+        """Adds one reading, overwriting the oldest when full. Older-than-newest readings are skipped."""
+        if self.size and ts < self.ts[self._next - 1]:
+            return False
+        self.ts[self._next] = ts
+        self.values[:, self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and (channel x n) values, oldest first. Views unless the buffer has wrapped."""
+        if self.size < self.capacity:
+            return self.ts[:self.size], self.values[:, :self.size]
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self.ts[order], self.values[:, order]
+
+    def window(self, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings at or after `since`, oldest first, copying only that tail (views if it doesn't wrap)."""
+        if self.size < self.capacity:
+            start = int(np.searchsorted(self.ts[:self.size], since, side="left"))
+            return self.ts[start:self.size], self.values[:, start:self.size]
+        # A full ring is two sorted runs: [_next, capacity) is older than [0, _next)
+        start = self._next + int(np.searchsorted(self.ts[self._next:], since, side="left"))
+        if start == self.capacity:
+            start = int(np.searchsorted(self.ts[:self._next], since, side="left"))
+            return self.ts[start:self._next], self.values[:, start:self._next]
+        return (np.concatenate((self.ts[start:], self.ts[:self._next])),
+                np.concatenate((self.values[:, start:], self.values[:, :self._next]), axis=1))
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        if not self.size:
+            return None
+        i = self._next - 1
+        return self.ts[i], self.values[:, i]
+
+class RecentReadings:
+    def __init__(self, capacity: Optional[int] = None, hours: Optional[float] = None):
+        self.settings = get_settings()
+        self.capacity = capacity or self.settings.RECENT_READINGS_CAPACITY
+        self.hours = hours or self.settings.RECENT_READINGS_HOURS
+        self._rings: Dict[str, DeviceRing] = {}
+        self._simulators: Set[str] = set()
+        self._lock = threading.Lock()  # bulk_insert_readings records from a worker thread
+
+    def clear(self):
+        with self._lock:
+            self._rings.clear()
+            self._simulators.clear()
+
+    def set_simulator(self, device_id: str, is_simulator: bool):
+        with self._lock:
+            (self._simulators.add if is_simulator else self._simulators.discard)(device_id)
+
+    def record(self, device_id: str, timestamp: datetime, temperature: Optional[float], moisture: Optional[float],
+               light: Optional[float]) -> bool:
+        """Adds one reading; a None channel (missing or quarantined) is stored as NaN."""
+        values = tuple(np.nan if v is None else v for v in (temperature, moisture, light))
+        with self._lock:
+            ring = self._rings.get(device_id)
+            if ring is None:
+                ring = self._rings[device_id] = DeviceRing(self.capacity)
+            return ring.append(_seconds(timestamp), values)
+
+    def extend(self, readings: Iterable[dict]) -> int:
+        """Records reading dicts (device_id, timestamp, channels, event) in timestamp order, minus quarantined channels."""
+        recorded = 0
+        for r in sorted(readings, key=lambda r: r["timestamp"]):
+            values = accepted_values(r, CHANNELS)
+            if any(v is not None for v in values):
+                recorded += self.record(r["device_id"], r["timestamp"], *values)
+        return recorded
+
+    def device_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._rings)
+
+    def latest(self, device_id: str) -> Optional[dict]:
+        with self._lock:
+            ring = self._rings.get(device_id)
+            last = ring.latest() if ring else None
+            if last is None:
+                return None
+            return {"device_id": device_id, "timestamp": _datetime(last[0]), **dict(zip(CHANNELS, to_list(last[1])))}
+
+    def latest_hardware(self, since: Optional[datetime] = None) -> Optional[dict]:
+        """Most recent reading (at or after `since`) from any physical (non-simulator) pot."""
+        cutoff = _seconds(since) if since else float("-inf")
+        with self._lock:
+            best = None
+            for device_id, ring in self._rings.items():
+                last = ring.latest()
+                if device_id in self._simulators or last is None or last[0] < cutoff:
+                    continue
+                if best is None or last[0] > best[1]:
+                    best = (device_id, last[0], last[1].copy())
+        if best is None:
+            return None
+        return {"device_id": best[0], "timestamp": _datetime(best[1]), **dict(zip(CHANNELS, to_list(best[2])))}
+
+    def window(self, device_id: str, seconds: Optional[float] = None, now: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of (timestamps, channel x n values) from the last `seconds` (default RECENT_READINGS_HOURS)."""
+        seconds = seconds if seconds is not None else self.hours * 3600
+        since = _seconds(now or datetime.utcnow()) - seconds
+        with self._lock:
+            ring = self._rings.get(device_id)
+            if ring is None:
+                return np.empty(0), np.empty((len(CHANNELS), 0))
+            ts, values = ring.window(since)
+            return ts.copy(), values.copy()
+
+    def batch(self, channel: str, seconds: Optional[float] = None, max_samples: Optional[int] = None,
+              now: Optional[datetime] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        One channel for every device as (device_ids, ts, values) - two (devices x n) matrices, right-aligned
+        so column -1 is each device's newest reading of that channel and shorter histories are NaN-padded
+        on the left. Readings where the channel was quarantined are left out.
+        """
+        seconds = seconds if seconds is not None else self.hours * 3600
+        since = _seconds(now or datetime.utcnow()) - seconds
+        row = CHANNELS.index(channel)
+        keep = slice(-max_samples, None) if max_samples else slice(None)
+        with self._lock:
+            windows = []
+            for device_id, ring in self._rings.items():
+                ts, values = ring.window(since)
+                seen = ~np.isnan(values[row])
+                if seen.any():
+                    windows.append((device_id, ts[seen][keep], values[row, seen][keep]))
+            width = max((ts.size for _, ts, _ in windows), default=0)
+            ts_matrix = np.full((len(windows), width), np.nan)
+            values_matrix = np.full((len(windows), width), np.nan)
+            for i, (_, ts, values) in enumerate(windows):
+                ts_matrix[i, width - ts.size:] = ts
+                values_matrix[i, width - ts.size:] = values
+        return [d for d, _, _ in windows], ts_matrix, values_matrix
+
+    def stats(self, device_id: str, seconds: Optional[float] = None, now: Optional[datetime] = None) -> dict:
+        """
+        Vectorized min/max/mean/std/last and least-squares slope (per hour) for every channel over a window,
+        each over the readings where that channel wasn't quarantined (all None if it was on every one).
+        """
+        ts, values = self.window(device_id, seconds, now)
+        result = {"count": int(ts.size)}
+        if not ts.size:
+            return result
+        seen = ~np.isnan(values)
+        n = seen.sum(axis=1)
+        count = np.maximum(n, 1)
+        filled = np.where(seen, values, 0.0)
+        means = filled.sum(axis=1) / count
+        deviations = np.where(seen, values - means[:, None], 0.0)
+        centered = np.where(seen, ts - (seen * ts).sum(axis=1, keepdims=True) / count[:, None], 0.0)
+        spread = (centered * centered).sum(axis=1)
+        slopes = np.where(spread > 0, (centered * filled).sum(axis=1) / np.where(spread > 0, spread, 1.0) * 3600, 0.0)
+        last = np.where(seen, np.arange(ts.size), 0).max(axis=1)
+        summary = np.stack([np.where(seen, values, np.inf).min(axis=1), np.where(seen, values, -np.inf).max(axis=1),
+                            means, np.sqrt((deviations * deviations).sum(axis=1) / count),
+                            values[np.arange(len(CHANNELS)), last], slopes])
+        result["from"] = _datetime(ts[0]).isoformat()
+        result["to"] = _datetime(ts[-1]).isoformat()
+        names = ("min", "max", "mean", "std", "last", "slope_per_hour")
+        for i, channel in enumerate(CHANNELS):
+            result[channel] = dict(zip(names, summary[:, i].round(3).tolist() if n[i] else [None] * len(names)))
+        return result
+
+    def trend_text(self, device_id: str) -> str:
+        """One sentence of recent trends for the agents' sensor context ("" without enough history)."""
+        stats = self.stats(device_id)
+        if stats["count"] < 2:
+            return ""
+        ts, values = self.window(device_id)
+        hours = (ts[-1] - ts[0]) / 3600
+        if hours < 1 / 60:
+            return ""
+        parts = []
+        for i, channel in enumerate(CHANNELS):
+            seen = values[i][~np.isnan(values[i])]
+            if seen.size < 2:
+                continue  # Quarantined all along, e.g. a disconnected probe
+            unit = UNITS[channel]
+            parts.append(f"{channel} {seen[0]:.1f}{unit} -> {seen[-1]:.1f}{unit} "
+                         f"({stats[channel]['slope_per_hour']:+.1f}{unit}/h)")
+        if not parts:
+            return ""
+        return f"Trend over the last {hours:.1f}h: " + ", ".join(parts) + "."
+
+    def warm(self, engine=None) -> int:
+        """Reloads the buffers from the database (last RECENT_READINGS_HOURS). Returns readings loaded."""
+        since = datetime.utcnow() - timedelta(hours=self.hours)
+        with Session(engine or get_engine()) as session:
+            devices = session.exec(select(Device.id, Device.is_simulator)).all()
+            rows = session.exec(
+                select(SensorReading.device_id, SensorReading.timestamp, SensorReading.temperature,
+                       SensorReading.moisture, SensorReading.light, SensorReading.event)
+                .where(SensorReading.timestamp >= since)
+                .order_by(SensorReading.timestamp)
+            ).all()
+        self.clear()
+        for device_id, is_simulator in devices:
+            self.set_simulator(device_id, bool(is_simulator))
+        return self.extend(row._asdict() for row in rows)
+
+# Global singleton instance
+recent_readings = RecentReadings()
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_new_readings(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, SensorReading):
+            session.info.setdefault("recent_readings", []).append(
+                {c: getattr(obj, c) for c in ("device_id", "timestamp", *CHANNELS, "event")})
+        elif isinstance(obj, Device):
+            session.info.setdefault("recent_devices", []).append((obj.id, bool(obj.is_simulator)))
+
+@event.listens_for(OrmSession, "after_commit")
+def _record_on_commit(session):
+    for device_id, is_simulator in session.info.pop("recent_devices", ()):
+        recent_readings.set_simulator(device_id, is_simulator)
+    recent_readings.extend(session.info.pop("recent_readings", ()))
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("recent_readings", None)
+    session.info.pop("recent_devices", None)
@@ -0,0 +1,146 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from config import get_settings
+
+CacheKey = Tuple[str, str, int, int, int]
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace ("Hey, Plant!" -> "hey plant")."""
+    text = re.sub(r"[^\w\s]", " ", (query or "").lower())
+    return " ".join(text.split())
+
+class _Entry:
+    __slots__ = ("created_at", "variants", "cursor")
+
+    def __init__(self, created_at: float):
+        self.created_at = created_at
+        self.variants: List[dict] = []
+        self.cursor = 0
+
+class ReplyCache:
+    """
+    TTL + LRU cache for ConversationAgent replies.
+    Keyed on (species, normalized query, quantized temperature/moisture/light bands).
+    Each key collects up to `variants` distinct replies before it starts serving them
+    round-robin, so repeated "hey plant" wake words don't always get the same line.
+    The synthesized TTS audio of cached replies is kept alongside them for instant playback.
+    """
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        variants: Optional[int] = None,
+        temp_band: Optional[float] = None,
+        moisture_band: Optional[float] = None,
+        light_band: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.REPLY_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.REPLY_CACHE_MAX_ENTRIES
+        self.variants = max(1, variants if variants is not None else settings.REPLY_CACHE_VARIANTS)
+        self.temp_band = temp_band or settings.REPLY_CACHE_TEMP_BAND
+        self.moisture_band = moisture_band or settings.REPLY_CACHE_MOISTURE_BAND
+        self.light_band = light_band or settings.REPLY_CACHE_LIGHT_BAND
+
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        # Maps reply text -> synthesized MP3 bytes (only for replies still held in _entries)
+        self._audio: Dict[str, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, species: str, query: str, sensor_data: Optional[dict]) -> CacheKey:
+        sensors = sensor_data or {}
+        return (
+            (species or "").strip().lower(),
+            normalize_query(query),
+            int((sensors.get("temperature") or 0.0) // self.temp_band),
+            int((sensors.get("moisture") or 0.0) // self.moisture_band),
+            int((sensors.get("light") or 0.0) // self.light_band),
+        )
+
+    def get(self, key: CacheKey) -> Optional[dict]:
+        """Returns a cached reply, or None if the key is missing, expired, or still collecting variants."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if time.monotonic() - entry.created_at > self.ttl_seconds:
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        if len(entry.variants) < self.variants:
+            # Still building variety for this key - let the LLM write another one
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        reply = entry.variants[entry.cursor % len(entry.variants)]
+        entry.cursor += 1
+        self.hits += 1
+        return dict(reply)
+
+    def put(self, key: CacheKey, reply: dict):
+        """Stores a freshly generated reply as one of the variants for this key."""
+        text = reply.get("conversation_response") or ""
+        if not text.strip() or text == "...":
+            return
+
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.created_at > self.ttl_seconds:
+            if entry is not None:
+                self._drop(key)
+            entry = _Entry(time.monotonic())
+            self._entries[key] = entry
+
+        if len(entry.variants) < self.variants and all(v["conversation_response"] != text for v in entry.variants):
+            entry.variants.append({
+                "conversation_response": text,
+                "mood": reply.get("mood", "neutral"),
+                "priority": reply.get("priority", "low"),
+            })
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+
+    def get_audio(self, reply_text: str) -> Optional[bytes]:
+        return self._audio.get(reply_text)
+
+    def put_audio(self, reply_text: str, audio: bytes):
+        """Keeps synthesized audio, but only for replies that are currently cached."""
+        if audio and self._is_cached_text(reply_text):
+            self._audio[reply_text] = audio
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "audio_clips": len(self._audio),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self._audio.clear()
+
+    def _is_cached_text(self, reply_text: str) -> bool:
+        return any(v["conversation_response"] == reply_text for e in self._entries.values() for v in e.variants)
+
+    def _drop(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for v in entry.variants:
+            text = v["conversation_response"]
+            if not self._is_cached_text(text):
+                self._audio.pop(text, None)
+
+# Global singleton instance
+reply_cache = ReplyCache()
@@ -0,0 +1,199 @@
+"""
+Incremental minute/hour/day rollups of sensor readings.
+
+Every SensorReading written through the ORM (ingest, simulator propagation) is folded into its
+SensorRollup buckets in the same flush, and bulk_insert_readings does the same for batch uploads,
+so charts read a few hundred pre-aggregated rows instead of scanning raw 1 Hz history.
+Channels the anomaly detector quarantined are left out of their bucket (each channel keeps its own
+count), so a glitch can't skew a chart's min/max and a dead probe doesn't blank the other channels.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+import numpy as np
+from sqlalchemy import and_, case, delete, event, or_, select as core_select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import select
+from models import SensorReading, SensorRollup
+from services.reading_store import accepted_values
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}  # Finest first
+CHANNELS = ("temperature", "moisture", "light")
+DEFAULT_MAX_POINTS = 500
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    width = timedelta(seconds=seconds)
+    return _EPOCH + ((ts - _EPOCH) // width) * width
+
+def _merge(into: dict, other: dict):
+    """Combines two aggregates of the same bucket (order-independent)."""
+    into["count"] += other["count"]
+    newer = other["last_timestamp"] >= into["last_timestamp"]
+    for c in CHANNELS:
+        into[f"{c}_min"] = min(into[f"{c}_min"], other[f"{c}_min"])
+        into[f"{c}_max"] = max(into[f"{c}_max"], other[f"{c}_max"])
+        into[f"{c}_sum"] += other[f"{c}_sum"]
+        if other[f"{c}_count"] and (newer or not into[f"{c}_count"]):
+            into[f"{c}_last"] = other[f"{c}_last"]
+        into[f"{c}_count"] += other[f"{c}_count"]
+    if newer:
+        into["last_timestamp"] = other["last_timestamp"]
+
+def aggregate(readings: Iterable[dict]) -> List[dict]:
+    """
+    Folds raw readings (dicts with device_id/timestamp/temperature/moisture/light/event) into rollup rows.
+    Quarantined (or missing) channels count towards the bucket but not towards that channel's aggregates.
+    """
+    readings = list(readings)
+    if not readings:
+        return []
+    devices, codes = np.unique(np.array([r["device_id"] for r in readings], dtype=object), return_inverse=True)
+    micros = np.array([(r["timestamp"] - _EPOCH) // _MICROSECOND for r in readings], dtype=np.int64)
+    accepted = [accepted_values(r, CHANNELS) for r in readings]
+    values = np.array([[np.nan if a[i] is None else float(a[i]) for a in accepted] for i in range(len(CHANNELS))])
+    positions = np.arange(len(readings))
+
+    rows = []
+    for seconds in RESOLUTIONS.values():
+        width = seconds * 1_000_000
+        buckets = micros // width
+        # Group by (device, bucket), time-ordered inside each group so the group's last row is its latest reading
+        order = np.lexsort((micros, buckets, codes))
+        g_codes, g_buckets, g_micros, g_values = codes[order], buckets[order], micros[order], values[:, order]
+        starts = np.flatnonzero(np.r_[True, (g_codes[1:] != g_codes[:-1]) | (g_buckets[1:] != g_buckets[:-1])])
+        ends = np.r_[starts[1:], len(order)] - 1
+
+        columns = {
+            "device_id": devices[g_codes[starts]].tolist(),
+            "bucket": [_EPOCH + b * _MICROSECOND for b in (g_buckets[starts] * width).tolist()],
+            "count": (ends - starts + 1).tolist(),
+            "last_timestamp": [_EPOCH + t * _MICROSECOND for t in g_micros[ends].tolist()],
+        }
+        for i, c in enumerate(CHANNELS):
+            v = g_values[i]
+            seen = ~np.isnan(v)
+            last = np.maximum.reduceat(np.where(seen, positions, -1), starts)  # -1: nothing accepted in the bucket
+            columns[f"{c}_count"] = np.add.reduceat(seen.astype(np.int64), starts).tolist()
+            columns[f"{c}_min"] = np.minimum.reduceat(np.where(seen, v, np.inf), starts).tolist()
+            columns[f"{c}_max"] = np.maximum.reduceat(np.where(seen, v, -np.inf), starts).tolist()
+            columns[f"{c}_sum"] = np.add.reduceat(np.where(seen, v, 0.0), starts).tolist()
+            columns[f"{c}_last"] = np.where(last >= 0, v[last], 0.0).tolist()
+        names = list(columns)
+        rows.extend(
+            dict(zip(names, row), resolution=seconds)
+            for row in zip(*columns.values())
+        )
+    return rows
+
+def upsert_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE that merges a row into its existing bucket (SQLite and PostgreSQL)."""
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = SensorRollup.__table__
+    stmt = insert(table)
+    new, old = stmt.excluded, table.c
+    newer = new.last_timestamp >= old.last_timestamp
+    changes = {
+        "count": old.count + new.count,
+        "last_timestamp": case((newer, new.last_timestamp), else_=old.last_timestamp),
+    }
+    for c in CHANNELS:
+        counts = (old[f"{c}_count"], new[f"{c}_count"])
+        changes[f"{c}_count"] = counts[0] + counts[1]
+        changes[f"{c}_min"] = case((new[f"{c}_min"] < old[f"{c}_min"], new[f"{c}_min"]), else_=old[f"{c}_min"])
+        changes[f"{c}_max"] = case((new[f"{c}_max"] > old[f"{c}_max"], new[f"{c}_max"]), else_=old[f"{c}_max"])
+        changes[f"{c}_sum"] = old[f"{c}_sum"] + new[f"{c}_sum"]
+        changes[f"{c}_last"] = case((and_(counts[1] > 0, or_(newer, counts[0] == 0)), new[f"{c}_last"]),
+                                    else_=old[f"{c}_last"])
+    return stmt.on_conflict_do_update(index_elements=["device_id", "resolution", "bucket"], set_=changes)
+
+def fold_readings(conn: Connection, readings: Iterable[dict]) -> int:
+    """Adds readings to their rollup buckets on an open connection (i.e. inside the caller's transaction)."""
+    rows = aggregate(readings)
+    if rows:
+        # One cached statement, executemany'd - buckets are unique per call, so no row is hit twice
+        conn.execute(upsert_statement(conn.dialect.name), rows)
+    return len(rows)
+
+def rebuild(conn: Connection, chunk_size: int = 10000) -> int:
+    """Recomputes every rollup from raw readings (backfill after upgrading an existing database)."""
+    conn.execute(delete(SensorRollup.__table__))
+    reading = SensorReading.__table__.c
+    result = conn.execute(
+        core_select(reading.device_id, reading.timestamp, reading.temperature, reading.moisture, reading.light,
+                    reading.event)
+        .where(reading.timestamp.is_not(None))
+        .execution_options(stream_results=True)  # Server-side cursor on Postgres
+    )
+    total = 0
+    # Folding chunk by chunk is safe because merging buckets is order-independent
+    for chunk in result.mappings().partitions(chunk_size):
+        fold_readings(conn, [dict(r) for r in chunk])
+        total += len(chunk)
+    return total
+
+def choose_resolution(start: datetime, end: datetime, max_points: int) -> Tuple[str, int]:
+    """Finest rollup that still fits the range into max_points buckets (falls back to day)."""
+    span = max((end - start).total_seconds(), 1.0)
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return name, seconds
+    return "day", RESOLUTIONS["day"]
+
+def _point(row: dict) -> dict:
+    point = {"t": row["bucket"].isoformat(), "count": row["count"]}
+    for c in CHANNELS:
+        count = row[f"{c}_count"]
+        point[c] = {
+            "min": row[f"{c}_min"] if count else None,
+            "max": row[f"{c}_max"] if count else None,
+            "mean": row[f"{c}_sum"] / count if count else None,
+            "last": row[f"{c}_last"] if count else None,
+        }
+    return point
+
+async def query_series(session, device_id: str, start: datetime, end: datetime,
+                       max_points: int = DEFAULT_MAX_POINTS) -> dict:
+    """
+    Chart data for one device between start and end, read from rollups only (never raw readings).
+    Returns at most max_points buckets; ranges too long even for daily buckets are merged into N-day buckets.
+    """
+    max_points = max(1, max_points)
+    name, seconds = choose_resolution(start, end, max_points)
+    result = await session.exec(
+        select(SensorRollup)
+        .where(
+            SensorRollup.device_id == device_id,
+            SensorRollup.resolution == seconds,
+            SensorRollup.bucket >= bucket_start(start, seconds),
+            SensorRollup.bucket <= end,
+        )
+        .order_by(SensorRollup.bucket)
+    )
+    rows = [r.model_dump() for r in result.all()]
+
+    if len(rows) > max_points:
+        factor = math.ceil(len(rows) / max_points)
+        merged = []
+        for i in range(0, len(rows), factor):
+            group = dict(rows[i])
+            for other in rows[i + 1:i + factor]:
+                _merge(group, other)
+            merged.append(group)
+        rows, name, seconds = merged, f"{factor}d", seconds * factor
+
+    return {"device_id": device_id, "resolution": name, "bucket_seconds": seconds, "points": [_point(r) for r in rows]}
+
+@event.listens_for(OrmSession, "after_flush")
+def _fold_new_readings(session, flush_context):
+    # Same transaction as the readings themselves, so rollups can't drift from raw data
+    readings = [
+        {c: getattr(obj, c) for c in ("device_id", "timestamp", *CHANNELS, "event")}
+        for obj in session.new if isinstance(obj, SensorReading)
+    ]
+    if readings:
+        fold_readings(session.connection(), readings)
@@ -0,0 +1,258 @@
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import get_settings
+from services.reply_cache import normalize_query
+
+# Comparatives and negations ("more", "less", "too", "not") are kept: they flip the meaning of a question
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "do", "does", "you", "your", "i", "me", "my",
+    "to", "of", "it", "be", "any", "some", "can", "could", "would", "please", "right",
+    "plant", "today", "there", "so", "what", "get", "getting", "enough",
+}
+
+# Stem prefixes mapped to a shared "concept" feature so paraphrases land near each other
+# ("do you need water" vs "are you thirsty" only share the water_low concept). Opposite
+# directions are separate concepts, so "too dry" and "too wet" never share one, and
+# "right now" (current reading) is kept apart from "ideal" (target range).
+CONCEPTS = {
+    "water_low": ("water", "thirst", "drink", "dry", "parch", "hydrat"),
+    "water_high": ("moist", "soggy", "wet", "overwater", "drown", "damp"),
+    "light": ("light", "lamp"),
+    "light_high": ("sun", "bright"),
+    "light_low": ("dark", "shade", "dim"),
+    "temperature": ("temp",),
+    "temp_high": ("hot", "warm", "heat"),
+    "temp_low": ("cold", "chill", "freez", "cool"),
+    "more": ("more", "extra", "increas"),
+    "less": ("less", "fewer", "reduc", "decreas"),
+    "current": ("now", "current", "present", "moment"),
+    "ideal": ("ideal", "optimal", "best", "range", "recommend", "prefer"),
+    "like": ("like", "love", "enjoy", "fond"),
+    "dislike": ("hate", "dislike", "detest"),
+    "negation": ("not", "no", "never", "dont", "isnt", "arent"),
+    "greeting": ("hello", "hi", "hey", "morning", "evening", "greet", "howdy"),
+    "wellbeing": ("feel", "doing", "health", "ok", "okay", "alright", "well"),
+    "joke": ("joke", "funny", "laugh", "pun"),
+    "identity": ("who", "name", "yourself", "origin", "species", "kind"),
+    "food": ("fertili", "food", "hungry", "feed", "nutrient"),
+}
+CONCEPT_WEIGHT = 4.0
+# Stance concepts decide which answer applies ("temperature now" vs "ideal temperature"), so they outweigh the topic
+CONCEPT_WEIGHTS = {"current": 8.0, "ideal": 8.0, "like": 8.0, "dislike": 8.0}
+# "too much water" is the opposite of "need water": under an excess phrase, amounts flip to their high concept
+EXCESS_PHRASES = ("too much", "too many", "excess", "overly")
+EXCESS_OF = {"water_low": "water_high", "light": "light_high"}
+# Concepts (and their negations) get dedicated dimensions ahead of the hashed ones
+CONCEPT_SLOTS = {f"c:{prefix}{name}": i for i, (prefix, name) in enumerate(
+    (prefix, name) for prefix in ("", "not_") for name in CONCEPTS)}
+
+def _concept(word: str) -> Optional[str]:
+    for concept, stems in CONCEPTS.items():
+        for stem in stems:
+            if word == stem or (len(stem) > 2 and word.startswith(stem)):
+                return concept
+    return None
+
+class HashingTfidfVectorizer:
+    """
+    Offline text vectorizer: hashed word, bigram and in-word char-trigram features plus
+    concept features in dedicated slots, with sublinear TF. IDF is learned online from
+    the documents added to an index.
+    """
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.concept_dims = len(CONCEPT_SLOTS)
+
+    def features(self, text: str) -> List[Tuple[str, float]]:
+        words = normalize_query(text).split()
+        content = [w for w in words if w not in STOPWORDS] or words
+        feats: List[Tuple[str, float]] = []
+        negated = False
+        excess = any(p in " ".join(words) for p in EXCESS_PHRASES)
+        for w in content:
+            feats.append((f"w:{w}", 1.0))
+            concept = _concept(w)
+            if concept:
+                if excess:
+                    concept = EXCESS_OF.get(concept, concept)
+                # "not cold" gets its own concept instead of sharing "cold"
+                weight = CONCEPT_WEIGHTS.get(concept, CONCEPT_WEIGHT)
+                feats.append((f"c:not_{concept}" if negated else f"c:{concept}", weight))
+                negated = concept == "negation"
+            padded = f"<{w}>"
+            for i in range(len(padded) - 2):
+                feats.append((f"g:{padded[i:i + 3]}", 0.3))
+        for a, b in zip(content, content[1:]):
+            feats.append((f"b:{a} {b}", 1.0))
+        return feats
+
+    def transform(self, text: str) -> np.ndarray:
+        """Returns the raw (un-normalized, un-IDF-weighted) sublinear TF vector."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        hashed = self.dim - self.concept_dims
+        for feat, weight in self.features(text):
+            slot = CONCEPT_SLOTS.get(feat)
+            if slot is None:
+                slot = self.concept_dims + zlib.crc32(feat.encode("utf-8")) % hashed
+            vec[slot] += weight
+        np.log1p(vec, out=vec)
+        return vec
+
+class SemanticCache:
+    """
+    Paraphrase-tolerant reply cache.
+    Keeps TF vectors of previously answered queries in a preallocated NumPy matrix and
+    serves the best cosine match above `threshold` for the same species, routed intent and
+    sensor bands (the bands come from the ReplyCache key, so stale health advice is never
+    served). Exact repeats are left to ReplyCache so its variant rotation still applies.
+    """
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        dim: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.SEMANTIC_CACHE_TTL_SECONDS
+        self.vectorizer = HashingTfidfVectorizer(dim or settings.SEMANTIC_CACHE_DIM)
+
+        # Fixed-size slots: inserts write one row in place instead of copying the matrix
+        self._tf = np.zeros((self.max_entries, self.vectorizer.dim), dtype=np.float32)
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._created = np.zeros(self.max_entries, dtype=np.float64)
+        self._df = np.zeros(self.vectorizer.dim, dtype=np.float32)  # Document frequency over valid rows
+        self._scopes: List[Optional[tuple]] = [None] * self.max_entries  # (species, intent, temp, moisture, light bands)
+        self._queries: List[Optional[str]] = [None] * self.max_entries   # normalized query text
+        self._replies: List[Optional[dict]] = [None] * self.max_entries
+        self._by_scope: Dict[tuple, Dict[str, int]] = {}                 # scope -> query -> slot
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self._best_scores: List[float] = []
+
+    def lookup(self, cache_key: tuple, intent: Optional[str] = None) -> Optional[dict]:
+        """
+        cache_key is a ReplyCache key: (species, normalized query, temp band, moisture band, light band).
+        intent is the routed intent tag; replies are only shared between questions with the same intent.
+        """
+        query = cache_key[1]
+        scope = self._scope(cache_key, intent)
+        self._expire()
+
+        candidates = [slot for q, slot in self._by_scope.get(scope, {}).items() if q != query]
+        if not candidates:
+            self.misses += 1
+            return None
+
+        idf = self._idf()
+        rows = self._tf[candidates] * idf
+        rows /= np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-9)
+        q = self.vectorizer.transform(query) * idf
+        q /= max(float(np.linalg.norm(q)), 1e-9)
+        scores = rows @ q
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        self._record(best_score)
+
+        if best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        slot = candidates[best]
+        print(f"DEBUG: [SemanticCache] HIT '{query}' ~ '{self._queries[slot]}' (sim={best_score:.2f})")
+        return dict(self._replies[slot])
+
+    def add(self, cache_key: tuple, reply: dict, intent: Optional[str] = None):
+        text = reply.get("conversation_response") or ""
+        if not text.strip() or text == "...":
+            return
+        query = cache_key[1]
+        scope = self._scope(cache_key, intent)
+        if query in self._by_scope.get(scope, {}):
+            return
+
+        # First free slot, otherwise overwrite the oldest entry
+        free = np.flatnonzero(~self._valid)
+        slot = int(free[0]) if free.size else int(np.argmin(self._created))
+        if self._valid[slot]:
+            self._evict(slot)
+
+        row = self.vectorizer.transform(query)
+        self._tf[slot] = row
+        self._df += row > 0
+        self._valid[slot] = True
+        self._created[slot] = time.monotonic()
+        self._scopes[slot] = scope
+        self._queries[slot] = query
+        self._replies[slot] = {
+            "conversation_response": text,
+            "mood": reply.get("mood", "neutral"),
+            "priority": reply.get("priority", "low"),
+        }
+        self._by_scope.setdefault(scope, {})[query] = slot
+
+    def stats(self) -> dict:
+        """Hit-rate and best-similarity distribution of past lookups (for threshold tuning)."""
+        total = self.hits + self.misses
+        scores = np.asarray(self._best_scores, dtype=np.float32)
+        counts, edges = np.histogram(scores, bins=10, range=(0.0, 1.0))
+        return {
+            "entries": int(np.count_nonzero(self._valid)),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "similarity": {
+                "samples": int(scores.size),
+                "p50": float(np.percentile(scores, 50)) if scores.size else None,
+                "p90": float(np.percentile(scores, 90)) if scores.size else None,
+                "histogram": {f"{edges[i]:.1f}-{edges[i + 1]:.1f}": int(c) for i, c in enumerate(counts)},
+            },
+        }
+
+    def clear(self):
+        for slot in np.flatnonzero(self._valid):
+            self._evict(int(slot))
+
+    @staticmethod
+    def _scope(cache_key: tuple, intent: Optional[str]) -> tuple:
+        return (cache_key[0], intent or "AMBIGUOUS") + tuple(cache_key[2:])
+
+    def _record(self, score: float):
+        self._best_scores.append(score)
+        if len(self._best_scores) > 5000:
+            del self._best_scores[:1000]
+
+    def _idf(self) -> np.ndarray:
+        n = float(np.count_nonzero(self._valid))
+        idf = np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+        # Concepts carry the meaning, not the wording: a cache full of watering questions
+        # must not water down "thirsty" ~ "need water", so they always weigh as a rare term
+        idf[:self.vectorizer.concept_dims] = np.log((1.0 + n) / 2.0) + 1.0
+        return idf
+
+    def _expire(self):
+        stale = np.flatnonzero(self._valid & (time.monotonic() - self._created > self.ttl_seconds))
+        for slot in stale:
+            self._evict(int(slot))
+
+    def _evict(self, slot: int):
+        self._df -= self._tf[slot] > 0
+        self._valid[slot] = False
+        scope, query = self._scopes[slot], self._queries[slot]
+        entries = self._by_scope.get(scope)
+        if entries is not None:
+            entries.pop(query, None)
+            if not entries:
+                del self._by_scope[scope]
+        self._scopes[slot] = self._queries[slot] = self._replies[slot] = None
+
+# Global singleton instance
+semantic_cache = SemanticCache()
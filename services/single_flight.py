@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Tuple
+
+def fingerprint(*parts) -> str:
+    """Stable request fingerprint for coalescing (text, bytes or numbers)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a (namespace, key) runs the work,
+    everyone arriving while it is in flight awaits the same future.
+    Waiters are shielded, so one caller timing out never cancels the shared call.
+    """
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats: Dict[str, dict] = {}
+
+    async def do(self, namespace: str, key: str, factory: Callable[[], Awaitable]):
+        stats = self._stats.setdefault(namespace, {"calls": 0, "executed": 0, "coalesced": 0})
+        stats["calls"] += 1
+
+        flight_key = (namespace, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            stats["executed"] += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda t: self._done(flight_key, t))
+        else:
+            stats["coalesced"] += 1
+            print(f"DEBUG: [SingleFlight] Coalesced duplicate {namespace} call")
+
+        return await asyncio.shield(task)
+
+    def in_flight(self, namespace: str = None) -> int:
+        return sum(1 for ns, _ in self._inflight if namespace is None or ns == namespace)
+
+    def stats(self) -> dict:
+        return {ns: dict(s) for ns, s in self._stats.items()}
+
+    def _done(self, flight_key, task: asyncio.Future):
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter gave up
+
+# Global singleton instance
+single_flight = SingleFlight()
@@ -1,7 +1,9 @@
 import os
+import asyncio
 from google.cloud import texttospeech
 from google.api_core.client_options import ClientOptions
 from config import get_settings
+from services.single_flight import single_flight, fingerprint
 
 class SpeechSynthesisService:
     def __init__(self):
@@ -11,39 +13,19 @@ class SpeechSynthesisService:
         self.client = texttospeech.TextToSpeechClient(client_options=options)
 
     async def synthesize(
-        self, 
-        text: str, 
-        output_path: str, 
+        self,
+        text: str,
+        output_path: str,
         volume_gain_db: float = 0.0,
         speaking_rate: float = 0.95,
         pitch: float = 0.0
     ):
         """Synthesizes text to an MP3 file using Google Cloud TTS as plain text."""
-        synthesis_input = texttospeech.SynthesisInput(text=text)
-
-        # Build the voice request - Neural2 is crisp and clear for hardware
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            name="en-US-Neural2-H"
-        )
-
-        # Select the type of audio file you want returned
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
-            volume_gain_db=volume_gain_db, 
-            speaking_rate=speaking_rate,
-            pitch=pitch,
-            sample_rate_hertz=16000,
-            effects_profile_id=["small-bluetooth-speaker-class-device"]
-        )
-
         # Perform the text-to-speech request
         print(f"DEBUG: [TTS] Requesting synthesis for: {text[:30]}...")
-        response = self.client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
-        )
+        audio_content = await self._synthesize_coalesced(text, volume_gain_db, speaking_rate, pitch)
 
-        if not response.audio_content:
+        if not audio_content:
             print("ERROR: [TTS] Synthesis returned empty content.")
             raise Exception("Empty audio content from Google TTS")
 
@@ -51,26 +33,45 @@ class SpeechSynthesisService:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
         with open(output_path, "wb") as out:
-            out.write(response.audio_content)
-            
+            out.write(audio_content)
+
         return output_path
 
     async def synthesize_stream(
-        self, 
-        text: str, 
+        self,
+        text: str,
         volume_gain_db: float = 0.0,
         speaking_rate: float = 0.95,
         pitch: float = 0.0
     ) -> bytes:
         """Synthesizes text and returns raw audio bytes (MP3) as plain text."""
         print(f"DEBUG: [TTS] Synthesizing plain text: {text[:50]}...")
+        audio_content = await self._synthesize_coalesced(text, volume_gain_db, speaking_rate, pitch)
+
+        if not audio_content:
+            print("ERROR: [TTS] synthesize_stream returned empty content.")
+            return b""
+
+        return audio_content
+
+    async def _synthesize_coalesced(self, text: str, volume_gain_db: float, speaking_rate: float, pitch: float) -> bytes:
+        """Identical concurrent requests (e.g. browser + pot fetching the same reply) share one TTS call."""
+        key = fingerprint(text, volume_gain_db, speaking_rate, pitch)
+        return await single_flight.do(
+            "tts", key,
+            lambda: asyncio.to_thread(self._synthesize_bytes, text, volume_gain_db, speaking_rate, pitch)
+        )
+
+    def _synthesize_bytes(self, text: str, volume_gain_db: float, speaking_rate: float, pitch: float) -> bytes:
         synthesis_input = texttospeech.SynthesisInput(text=text)
-        
+
+        # Build the voice request - Neural2 is crisp and clear for hardware
         voice = texttospeech.VoiceSelectionParams(
             language_code="en-US",
             name="en-US-Neural2-H"
         )
-        
+
+        # Select the type of audio file you want returned
         audio_config = texttospeech.AudioConfig(
             audio_encoding=texttospeech.AudioEncoding.MP3,
             volume_gain_db=volume_gain_db,
@@ -79,13 +80,8 @@ class SpeechSynthesisService:
             sample_rate_hertz=16000,
             effects_profile_id=["small-bluetooth-speaker-class-device"]
         )
-        
+
         response = self.client.synthesize_speech(
             input=synthesis_input, voice=voice, audio_config=audio_config
         )
-        
-        if not response.audio_content:
-            print("ERROR: [TTS] synthesize_stream returned empty content.")
-            return b""
-
         return response.audio_content
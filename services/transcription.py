@@ -1,9 +1,11 @@
 import os
 import io
 import wave
+import asyncio
 from google.cloud import speech
 from google.api_core.client_options import ClientOptions
 from config import get_settings
+from services.single_flight import single_flight, fingerprint
 
 class TranscriptionService:
     def __init__(self):
@@ -19,6 +21,10 @@ class TranscriptionService:
         with io.open(audio_path, "rb") as audio_file:
             content = audio_file.read()
 
+        # Retried uploads of the same recording share one recognition call
+        return await single_flight.do("stt", fingerprint(content), lambda: asyncio.to_thread(self._recognize, content))
+
+    def _recognize(self, content: bytes) -> str:
         # [NEW] Robust Format Detection
         is_webm = b"webm" in content[:2000] or content.startswith(b"\x1a\x45\xdf\xa3")
         is_wav = b"RIFF" in content[:100] and b"WAVE" in content[:100]
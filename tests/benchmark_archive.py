@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text
+from sqlmodel import SQLModel, Session
+from models import Device, SensorReading, create_db_engine
+from migrations import run_migrations
+from services.archive import archive_readings, decode_block, encode_block
+from services.reading_store import CHANNELS, readings_between
+
+START = datetime(2024, 5, 1)
+
+def synthetic_month(interval_seconds: int, seed: int = 0):
+    """One device-month: server-stamped heartbeats (with jitter) and 0.1-resolution sensor values."""
+    rng = np.random.default_rng(seed)
+    n = 30 * 86400 // interval_seconds
+    micros = (np.arange(n, dtype=np.int64) * interval_seconds * 1_000_000
+              + rng.integers(0, 50_000, n) + int((START - datetime(1970, 1, 1)).total_seconds() * 1_000_000))
+    hours = np.arange(n) * interval_seconds / 3600
+    temperature = np.round(21 + 3 * np.sin(hours / 24 * 2 * np.pi) + rng.normal(0, 0.1, n), 1)
+    moisture = np.round(np.maximum(10, 70 - (hours % 72) * 0.7) + rng.normal(0, 0.2, n), 1)
+    light = np.round(np.clip(80 * np.sin(hours / 24 * 2 * np.pi), 0, None), 0)
+    return micros, np.stack([temperature, moisture, light])
+
+def db_bytes(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+
+if __name__ == "__main__":
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    micros, values = synthetic_month(interval)
+    n = micros.size
+
+    start = time.perf_counter()
+    block = encode_block(micros, values, {0: "boot"})
+    encode_s = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded_ts, decoded, _ = decode_block(block)
+    decode_s = time.perf_counter() - start
+    assert decoded_ts.tolist() == micros.tolist() and decoded["moisture"].tolist() == values[1].tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        run_migrations(engine)
+        with Session(engine) as session:
+            session.add(Device(id="bench_pot", name="Bench", species="Basil"))
+            session.commit()
+        empty = db_bytes(engine)
+        epoch = datetime(1970, 1, 1)
+        # Plain INSERT, so the size below is rows + indexes only (rollups are kept when archiving anyway)
+        with engine.begin() as conn:
+            conn.execute(insert(SensorReading.__table__), [
+                {"device_id": "bench_pot", "timestamp": epoch + timedelta(microseconds=int(t)), "event": None,
+                 **{c: float(values[i, j]) for i, c in enumerate(CHANNELS)}}
+                for j, t in enumerate(micros.tolist())
+            ])
+        raw_bytes = db_bytes(engine) - empty
+
+        window = (START - timedelta(days=1), START + timedelta(days=31))
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            assert readings_between(conn, "bench_pot", *window)["timestamp"].size == n
+            raw_scan_s = time.perf_counter() - start
+
+        archive_readings(retention_days=0, engine=engine, now=START + timedelta(days=40))
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            assert readings_between(conn, "bench_pot", *window)["timestamp"].size == n
+            archived_scan_s = time.perf_counter() - start
+            archived_moisture_s = time.perf_counter()
+            readings_between(conn, "bench_pot", *window, channels=("moisture",))
+            archived_moisture_s = time.perf_counter() - archived_moisture_s
+        engine.dispose()
+
+    print(f"{n} readings (one device-month every {interval}s)")
+    print(f"  columnar float64/int64 : {32 * n / 1e6:7.2f} MB  (32.0 B/reading)")
+    print(f"  SQLite rows + indexes  : {raw_bytes / 1e6:7.2f} MB  ({raw_bytes / n:5.1f} B/reading)")
+    print(f"  Gorilla block          : {len(block) / 1e6:7.2f} MB  ({len(block) / n:5.1f} B/reading) "
+          f"-> {raw_bytes / len(block):4.1f}x smaller than SQLite, {32 * n / len(block):4.1f}x than plain columns")
+    print(f"  encode {n / encode_s:10.0f} readings/s | decode {n / decode_s:10.0f} readings/s")
+    print(f"  range scan: raw rows {n / raw_scan_s:10.0f} readings/s | archive {n / archived_scan_s:10.0f} readings/s "
+          f"| archive, moisture only {n / archived_moisture_s:10.0f} readings/s")
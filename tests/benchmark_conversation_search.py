@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text
+from sqlmodel import SQLModel, Session
+from models import Conversation, Device, create_db_engine
+from migrations import run_migrations
+from services.conversation_search import search_conversations
+
+START = datetime(2024, 1, 1)
+DEVICES = 500
+
+QUESTIONS = [
+    "how are you feeling today", "do you need water", "is it too sunny for you", "good morning little plant",
+    "should I add fertilizer", "your leaves are turning yellow", "why are your leaves drooping",
+    "tell me a joke", "is it too cold by the window", "do you like the new pot", "what do you want for dinner",
+    "there are brown spots on your leaves", "how much light do you need", "are you thirsty",
+]
+REPLIES = [
+    "I feel great, thanks for asking", "a little water would be lovely", "the sun is just right",
+    "go easy on the fertilizer please", "yellow leaves mean you are overwatering me", "my roots are soggy",
+    "why did the tomato blush? it saw the salad dressing", "brrr, move me somewhere warmer",
+    "the new pot is roomy", "some compost in spring would help", "I could use more light",
+    "spider mites are bothering me", "I am thriving", "please check my soil moisture",
+]
+
+def synthetic_conversations(n: int, seed: int = 0):
+    """n chats spread over a year and DEVICES pots, each a question/reply pair plus a random filler word."""
+    rng = np.random.default_rng(seed)
+    q = rng.integers(0, len(QUESTIONS), n).tolist()
+    r = rng.integers(0, len(REPLIES), n).tolist()
+    filler = rng.integers(0, 5000, n).tolist()  # Gives the index a realistic long tail of terms
+    devices = rng.integers(0, DEVICES, n).tolist()
+    seconds = np.sort(rng.integers(0, 365 * 86400, n)).tolist()
+    for i in range(n):
+        yield {
+            "device_id": f"pot_{devices[i]:03d}",
+            "timestamp": START + timedelta(seconds=seconds[i]),
+            "transcription": f"{QUESTIONS[q[i]]} w{filler[i]}",
+            "ai_response": REPLIES[r[i]],
+            "mood": "happy",
+        }
+
+def percentile_ms(samples, p):
+    return float(np.percentile(samples, p)) * 1000
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = 10_000
+    queries = [
+        ("fertilizer", {}),
+        ('"yellow leaves"', {}),
+        ('fertilizer or "yellow leaves"', {}),
+        ("leaves -brown", {}),
+        ("fertilizer", {"device_id": "pot_042"}),
+        ("water", {"start": START + timedelta(days=100), "end": START + timedelta(days=107)}),
+        ("w4242", {}),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        run_migrations(engine)
+        with Session(engine) as session:
+            session.add_all(Device(id=f"pot_{i:03d}", name=f"Pot {i}", species="Basil") for i in range(DEVICES))
+            session.commit()
+
+        rows = list(synthetic_conversations(n))
+        stmt = insert(Conversation.__table__)
+        start = time.perf_counter()
+        for i in range(0, n, batch):
+            with engine.begin() as conn:  # FTS triggers fire on every row
+                conn.execute(stmt, rows[i:i + batch])
+        insert_s = time.perf_counter() - start
+        del rows
+
+        with engine.connect() as conn:
+            size = conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+            print(f"{n} conversations: inserted at {n / insert_s:,.0f}/s with FTS triggers, database {size / 1e6:.0f} MB")
+
+            for query, filters in queries:
+                samples = []
+                for _ in range(20):
+                    t = time.perf_counter()
+                    found = search_conversations(conn, query, limit=20, **filters)
+                    samples.append(time.perf_counter() - t)
+                label = query + "".join(f" {k}={v:%m-%d}" if isinstance(v, datetime) else f" {k}={v}" for k, v in filters.items())
+                print(f"  {label:45s} {len(found):3d} hits  p50 {percentile_ms(samples, 50):7.2f} ms  p95 {percentile_ms(samples, 95):7.2f} ms")
+
+            # What the same questions cost without the index: a full scan, and still no ranking
+            for term in ("w4242", "fertilizer"):
+                t = time.perf_counter()
+                hits = conn.execute(text(
+                    "SELECT count(*) FROM conversation WHERE transcription LIKE :p OR ai_response LIKE :p"),
+                    {"p": f"%{term}%"}).scalar()
+                label = f"LIKE '%{term}%' scan (unranked)"
+                print(f"  {label:45s} {hits:7d} rows   {(time.perf_counter() - t) * 1000:7.2f} ms")
+        engine.dispose()
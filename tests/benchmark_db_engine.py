@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session, create_engine, select, or_
+from models import Device, SensorReading, create_db_engine
+
+DEVICES = [f"bench_pot_{i}" for i in range(8)]
+
+def ingest(engine_for, i):
+    """The DB work of /v1/ingest for a sensor-only request."""
+    device_id = DEVICES[i % len(DEVICES)]
+    with Session(engine_for()) as session:
+        session.get(Device, device_id)
+        session.add(SensorReading(device_id=device_id, temperature=22.0, moisture=float(i % 60), light=50.0))
+        session.commit()
+
+def poll(engine_for, i):
+    """The DB work of /v1/device/{id}/poll."""
+    device_id = DEVICES[i % len(DEVICES)]
+    with Session(engine_for()) as session:
+        device = session.get(Device, device_id)
+        reading = session.exec(
+            select(SensorReading)
+            .where(SensorReading.device_id == device_id, or_(SensorReading.moisture < 20.0, SensorReading.event == "low_moisture_alert"))
+            .order_by(SensorReading.timestamp.desc())
+            .limit(1)
+        ).first()
+        if reading and device.last_notified_reading_id != reading.id:
+            device.last_notified_reading_id = reading.id
+            session.add(device)
+            session.commit()
+
+def run(engine_for, requests, workers):
+    errors = 0
+    def one(i):
+        nonlocal errors
+        try:
+            (ingest if i % 2 == 0 else poll)(engine_for, i)
+        except Exception:
+            errors += 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, range(requests)))
+    return requests / (time.perf_counter() - start), errors
+
+def fresh_db(path):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Device(id=d, name=d, species="Basil") for d in DEVICES])
+        session.commit()
+    engine.dispose()
+    return url
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 8, 32):
+            url = fresh_db(os.path.join(tmp, f"legacy_{workers}.db"))
+            # Previous behaviour: a brand-new engine (and pool) for every request, default journal mode
+            legacy, legacy_errors = run(lambda: create_engine(url), requests, workers)
+
+            url = fresh_db(os.path.join(tmp, f"pooled_{workers}.db"))
+            engine = create_db_engine(url)
+            pooled, pooled_errors = run(lambda: engine, requests, workers)
+            engine.dispose()
+
+            print(f"{workers:>3} workers x {requests} ingest+poll: "
+                  f"per-request engine {legacy:7.0f} req/s ({legacy_errors} errors) | "
+                  f"pooled + WAL {pooled:7.0f} req/s ({pooled_errors} errors) | {pooled / legacy:4.1f}x")
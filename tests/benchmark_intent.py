@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.intent import IntentEngine
+
+# Held-out queries (not in agents/intent.TRAINING_DATA)
+EVAL_SET = [
+    ("hey plant who are you", "IDENTITY"), ("what should i call you", "IDENTITY"),
+    ("tell me who you are", "IDENTITY"), ("what type of plant is this", "IDENTITY"),
+    ("hey plant how are you feeling", "HEALTH"), ("do you want some water", "HEALTH"),
+    ("is it too dark in here for you", "HEALTH"), ("are you too hot right now", "HEALTH"),
+    ("how's your soil", "HEALTH"), ("are you doing okay", "HEALTH"),
+    ("what's the best fertilizer for basil", "KNOWLEDGE"), ("how often do cactus need water", "KNOWLEDGE"),
+    ("where is lavender native to", "KNOWLEDGE"), ("how big do you grow", "KNOWLEDGE"),
+    ("hi there", "GREETING"), ("good morning sunshine", "GREETING"), ("hello plant", "GREETING"),
+    ("hey", "GREETING"),
+    ("tell me something funny", "JOKE"), ("know any good jokes", "JOKE"), ("make me laugh plant", "JOKE"),
+    ("do you have a pun for me", "JOKE"),
+    ("umm", "AMBIGUOUS"), ("purple", "AMBIGUOUS"), ("turn on the tv", "AMBIGUOUS"), ("what day is it", "AMBIGUOUS"),
+]
+
+def run_benchmark(engine=None, iterations=2000):
+    engine = engine or IntentEngine()
+
+    start = time.perf_counter()
+    engine.train()
+    train_ms = (time.perf_counter() - start) * 1000
+
+    correct = 0
+    for query, expected in EVAL_SET:
+        tag, confidence = engine.predict(query)
+        correct += (tag == expected)
+        if tag != expected:
+            print(f"  MISS: '{query}' -> {tag} ({confidence:.2f}), expected {expected}")
+    accuracy = correct / len(EVAL_SET)
+
+    queries = [q for q, _ in EVAL_SET]
+    start = time.perf_counter()
+    for i in range(iterations):
+        engine.predict(queries[i % len(queries)])
+    per_query_us = (time.perf_counter() - start) / iterations * 1e6
+
+    print(f"Training: {train_ms:.1f} ms on built-in corpus")
+    print(f"Accuracy: {accuracy:.1%} ({correct}/{len(EVAL_SET)}) on held-out set")
+    print(f"Latency:  {per_query_us:.1f} us/query (vs. one LLM round trip of ~1-3 s)")
+    return accuracy, per_query_us
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_settings
+from services.moisture_forecast import MoistureForecaster, fit_drying
+from services.recent_readings import DeviceRing, RecentReadings
+
+NOW = datetime(2024, 5, 2)
+
+def synthetic_fleet(devices: int, samples: int, step_seconds: int = 300, seed: int = 0) -> RecentReadings:
+    """Ring buffers for a fleet drying at different rates, each watered once at a random point."""
+    rng = np.random.default_rng(seed)
+    readings = RecentReadings(capacity=samples, hours=24)
+    ts = (NOW - datetime(1970, 1, 1)).total_seconds() - step_seconds * np.arange(samples)[::-1]
+    hours = (ts - ts[0]) / 3600
+    rates = rng.uniform(0.005, 0.1, devices)
+    watered = rng.integers(0, samples // 2, devices)
+    for i in range(devices):
+        since = np.maximum(hours - hours[watered[i]], 0)
+        moisture = np.where(np.arange(samples) < watered[i], 15.0, 80 * np.exp(-rates[i] * since))
+        ring = DeviceRing(samples)  # Filled directly - recording millions of readings one by one isn't what's measured
+        ring.ts[:] = ts
+        ring.values[0], ring.values[1], ring.values[2] = 21.0, moisture + rng.normal(0, 0.3, samples), 50.0
+        ring.size = samples
+        readings._rings[f"pot_{i:05d}"] = ring
+    return readings
+
+def loop_fit(device_ids, ts, moisture, watering_jump, min_samples):
+    """The obvious per-device version, for comparison."""
+    rates = {}
+    for i, device_id in enumerate(device_ids):
+        jumps = np.flatnonzero(np.diff(moisture[i]) >= watering_jump)
+        start = jumps[-1] + 1 if jumps.size else 0
+        t, m = ts[i, start:], moisture[i, start:]
+        if t.size >= min_samples:
+            rates[device_id] = -np.polyfit((t - t[-1]) / 3600, np.log(m), 1)[0]
+    return rates
+
+if __name__ == "__main__":
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 288  # 24h of 5-minute readings
+    settings = get_settings()
+    readings = synthetic_fleet(devices, samples)
+    forecaster = MoistureForecaster(readings)
+
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        device_ids, ts, moisture = readings.batch("moisture", seconds=settings.FORECAST_WINDOW_HOURS * 3600,
+                                                  max_samples=settings.FORECAST_MAX_SAMPLES, now=NOW)
+        gathered = time.perf_counter()
+        fit = fit_drying(ts, moisture, settings.FORECAST_WATERING_JUMP, settings.FORECAST_MIN_SAMPLES,
+                         settings.FORECAST_MIN_SPAN_MINUTES * 60)
+        runs.append((gathered - start, time.perf_counter() - gathered))
+    gather_s, fit_s = np.median(runs, axis=0)
+
+    start = time.perf_counter()
+    forecaster.refit(NOW)
+    refit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    due = forecaster.due_within(24, now=NOW)
+    due_s = time.perf_counter() - start
+
+    subset = min(devices, 2000)
+    start = time.perf_counter()
+    rates = loop_fit(device_ids[:subset], ts[:subset], moisture[:subset], settings.FORECAST_WATERING_JUMP,
+                     settings.FORECAST_MIN_SAMPLES)
+    loop_s = (time.perf_counter() - start) * devices / subset
+    assert np.allclose([rates[d] for d in device_ids[:subset]], fit["rate"][:subset])
+
+    print(f"{devices} devices x {samples} readings")
+    print(f"  gather from ring buffers : {gather_s * 1000:8.1f} ms")
+    print(f"  batched fit              : {fit_s * 1000:8.1f} ms  ({fit_s / devices * 1e6:.2f} µs/device)")
+    print(f"  refit() end to end       : {refit_s * 1000:8.1f} ms")
+    print(f"  per-device polyfit loop  : {loop_s * 1000:8.1f} ms  (extrapolated from {subset}) -> "
+          f"{loop_s / fit_s:.0f}x slower than the batched fit")
+    print(f"  due_within(24h)          : {due_s * 1000:8.1f} ms  ({len(due)} devices)")
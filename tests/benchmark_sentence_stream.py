@@ -0,0 +1,58 @@
+import os
+import re
+import sys
+import time
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.sentence_stream import SentenceStreamer
+
+def legacy_split(chunks):
+    """The previous stream_run logic: re-split the whole buffer on every chunk."""
+    buffer, meta_captured, out = "", False, []
+    for content in chunks:
+        buffer += content
+        if not meta_captured and "Reply:" in buffer:
+            buffer = buffer.split("Reply:")[1]
+            meta_captured = True
+        if meta_captured:
+            sentences = re.split(r'(?<=[.!?])\s+', buffer)
+            if len(sentences) > 1:
+                out.extend(s.strip() for s in sentences[:-1] if s.strip())
+                buffer = sentences[-1]
+    if buffer.strip():
+        out.append(buffer.strip())
+    return out
+
+def incremental_split(chunks):
+    streamer = SentenceStreamer()
+    out = []
+    for content in chunks:
+        out.extend(e for e in streamer.feed(content) if e["type"] == "sentence")
+    out.extend(e for e in streamer.finish() if e["type"] == "sentence")
+    return out
+
+def make_stream(sentence_count, sentence_words, chunk_size=4):
+    # Long run-on sentences are the worst case for re-splitting the buffer
+    sentence = " ".join(["leaf"] * sentence_words) + " at 21.5C."
+    text = "Mood: happy | Priority: low | Reply: " + " ".join([sentence] * sentence_count)
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+def timed(fn, chunks, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    for count, words in [(20, 15), (20, 400), (5, 3000)]:
+        chunks = make_stream(count, words)
+        legacy = timed(legacy_split, chunks)
+        incremental = timed(incremental_split, chunks)
+        chars = sum(len(c) for c in chunks)
+        print(f"{chars:>7} chars ({count} sentences x {words} words): "
+              f"legacy {legacy * 1000:8.2f} ms | incremental {incremental * 1000:7.2f} ms | "
+              f"{legacy / incremental:5.1f}x")
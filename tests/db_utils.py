@@ -0,0 +1,14 @@
+import os
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+def database_url_for_tests(tmp_dir: str) -> str:
+    """TEST_DATABASE_URL (set by tests/run_postgres_suite.py) or a throwaway SQLite file."""
+    return os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(tmp_dir, 'pot.db')}"
+
+def reset_database(engine):
+    """Drops every table (and the migration history) so each test starts from an empty schema."""
+    SQLModel.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+        conn.execute(text("DROP TABLE IF EXISTS conversation_fts"))  # SQLite full-text index (migration 5)
@@ -0,0 +1,44 @@
+"""
+Runs the test suite against a real, throwaway PostgreSQL - no Docker needed.
+
+Uses the Postgres binaries shipped in the `pgserver` wheel (pip install pgserver), or an
+existing server when TEST_DATABASE_URL is already set. Database-backed tests pick the URL
+up through tests/db_utils.py; everything else runs exactly as it does on SQLite.
+
+    python tests/run_postgres_suite.py [pytest args...]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def main(pytest_args):
+    if os.environ.get("TEST_DATABASE_URL"):
+        return run_pytest(os.environ["TEST_DATABASE_URL"], pytest_args)
+
+    try:
+        import pgserver
+    except ImportError:
+        print("pgserver is not installed (pip install pgserver), and TEST_DATABASE_URL is not set.")
+        return 2
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = pgserver.get_server(data_dir, cleanup_mode="stop")
+        try:
+            server.psql("CREATE DATABASE plant_pot_test;")
+            # postgresql://postgres:@/postgres?host=/tmp/... -> same socket, test database
+            base, _, query = server.get_uri().partition("?")
+            url = base.rsplit("/", 1)[0] + "/plant_pot_test" + (f"?{query}" if query else "")
+            return run_pytest(url, pytest_args)
+        finally:
+            server.cleanup()
+
+def run_pytest(url, pytest_args):
+    print(f"Running tests against {url}")
+    env = dict(os.environ, TEST_DATABASE_URL=url)
+    return subprocess.call([sys.executable, "-m", "pytest", *(pytest_args or ["tests/"])], cwd=ROOT, env=env)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
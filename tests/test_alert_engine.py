@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_settings
+from services.alert_engine import AlertEngine
+from services.reading_store import alert_event
+from services.recent_readings import RecentReadings
+
+START = datetime(2024, 5, 1, 10, 0)
+
+class TestAlertEngine(unittest.TestCase):
+    def setUp(self):
+        settings = get_settings()
+        for name, value in [("ALERT_ENTER_MOISTURE", 20.0), ("ALERT_EXIT_MOISTURE", 25.0),
+                            ("ALERT_MIN_DURATION_SECONDS", 120.0), ("ALERT_COOLDOWN_MINUTES", 30.0)]:
+            p = patch.object(settings, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        self.engine = AlertEngine()
+
+    def feed(self, series, device_id="pot", start_minute=0):
+        """Moisture readings one minute apart. Returns the minutes at which an alert fired."""
+        return [start_minute + i for i, m in enumerate(series)
+                if self.engine.observe(device_id, START + timedelta(minutes=start_minute + i), m)]
+
+    def test_noise_around_threshold_alerts_once(self):
+        noisy = [21.0, 19.5, 20.5, 19.0, 19.8, 18.9, 21.5, 19.2, 22.0, 19.9, 18.5]
+        self.assertEqual(self.feed(noisy), [5])  # First reading that has been low for two minutes straight
+        self.assertTrue(self.engine.alerting("pot"))
+        self.assertEqual(self.feed([24.0, 19.0, 25.0], start_minute=11), [])  # 25 isn't *above* the exit threshold
+
+    def test_brief_dip_is_debounced(self):
+        self.assertEqual(self.feed([30.0, 15.0, 15.0, 30.0, 15.0, 30.0]), [])
+        self.assertFalse(self.engine.alerting("pot"))
+
+    def test_cooldown_suppresses_second_alert(self):
+        self.assertEqual(self.feed([15.0] * 3), [2])
+        self.assertEqual(self.feed([40.0] + [15.0] * 3, start_minute=3), [])  # Watered, dry again 5 min later
+        self.assertEqual(self.engine.stats()["suppressed_by_cooldown"], 1)
+        self.assertEqual(self.feed([40.0] + [15.0] * 3, start_minute=60), [63])
+        self.assertEqual(self.feed([15.0] * 3, device_id="other"), [2])  # Per device
+        self.assertFalse(self.engine.observe("pot", START + timedelta(hours=2), None))
+
+    def test_dry_spell_during_cooldown_alerts_when_it_ends(self):
+        self.assertEqual(self.feed([15.0] * 3), [2])
+        self.assertEqual(self.feed([26.0], start_minute=3), [])  # Brief recovery re-arms...
+        self.assertEqual(self.feed([8.0] * 28, start_minute=4), [])  # ...but the next dry spell is inside the cool-down
+        self.assertEqual(self.feed([8.0] * 3, start_minute=32), [32])  # 2 + 30 minutes: fires, still dry
+        self.assertEqual(self.feed([8.0] * 200, start_minute=35), [])  # Once per dry spell
+        self.assertEqual(self.engine.stats()["suppressed_by_cooldown"], 1)
+
+    def test_warm_replay_does_not_realert(self):
+        readings = RecentReadings(capacity=64, hours=24)
+        now = datetime.utcnow()
+        for minute in range(5):
+            readings.record("pot", now - timedelta(minutes=5 - minute), 21.0, 12.0, 50.0)
+        self.assertEqual(self.engine.warm(readings), 5)
+        self.assertTrue(self.engine.alerting("pot"))
+        self.assertFalse(self.engine.observe("pot", now, 11.0))
+        self.assertEqual(self.engine.stats()["fired"], 0)
+
+    def test_alert_event_format(self):
+        self.assertEqual(alert_event(), "alert:moisture_low")
+        self.assertEqual(alert_event("wake_word"), "alert:moisture_low|wake_word")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.anomaly_detector import AnomalyDetector
+from services.reading_store import alert_event, is_quarantined, quarantine_event, quarantined_channels
+from services.recent_readings import RecentReadings
+
+START = datetime(2024, 5, 1, 10, 0)
+
+def reading(minute, temperature=21.0, moisture=50.0, light=60.0):
+    return START + timedelta(minutes=minute), {"temperature": temperature, "moisture": moisture, "light": light}
+
+class TestAnomalyDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = AnomalyDetector(alpha=0.1, z_threshold=6.0, warmup=10, confirm=3, stale_minutes=60)
+
+    def feed(self, device_id="pot", minutes=range(20), **channels):
+        for minute in minutes:
+            self.assertEqual(self.detector.check(device_id, *reading(minute, **channels)), {})
+
+    def test_out_of_range_value_is_flagged(self):
+        self.feed()
+        # DS18B20 reports -127 when its data line is disconnected
+        self.assertEqual(self.detector.check("pot", *reading(20, temperature=-127.0)), {"temperature": "range"})
+        self.assertEqual(self.detector.last_accepted("pot")["temperature"], 21.0)
+        self.assertEqual(self.detector.check("pot", *reading(21, moisture=None)), {"moisture": "range"})
+
+    def test_impossible_rate_is_flagged_even_before_warmup(self):
+        self.feed(minutes=range(2), moisture=0.0)
+        self.assertEqual(self.detector.check("pot", *reading(2, moisture=100.0)), {"moisture": "rate"})
+        self.assertEqual(self.detector.check("pot", *reading(60, moisture=30.0)), {})  # 30 points in ~an hour is fine
+
+    def test_zscore_only_on_implausible_side(self):
+        self.feed(moisture=60.0)
+        self.assertEqual(self.detector.check("pot", *reading(20, moisture=20.0)), {"moisture": "zscore"})
+        self.assertEqual(self.detector.check("new", *reading(0)), {})
+        self.feed("wet", moisture=40.0)
+        self.assertEqual(self.detector.check("wet", *reading(25, moisture=90.0)), {})  # Watering jumps moisture up
+        self.feed("warm", temperature=21.0)
+        self.assertEqual(self.detector.check("warm", *reading(20, temperature=26.0)), {"temperature": "zscore"})
+        self.assertEqual(self.detector.check("lamp", *reading(0, light=0.0)), {})
+        self.assertEqual(self.detector.check("lamp", *reading(1, light=100.0)), {})
+
+    def test_persistent_shift_becomes_the_new_baseline(self):
+        self.feed(temperature=21.0)
+        self.assertEqual(self.detector.check("pot", *reading(20, temperature=25.0)), {"temperature": "zscore"})
+        self.assertEqual(self.detector.check("pot", *reading(21, temperature=25.0)), {"temperature": "zscore"})
+        self.assertEqual(self.detector.check("pot", *reading(22, temperature=25.0)), {})  # Moved to a warmer room
+        self.assertEqual(self.detector.last_accepted("pot")["temperature"], 25.0)
+        self.assertEqual(self.detector.check("pot", *reading(23, temperature=25.2)), {})
+
+    def test_stale_baseline_restarts(self):
+        self.feed(moisture=60.0)
+        self.assertEqual(self.detector.check("pot", *reading(24 * 60, moisture=15.0)), {})
+
+    def test_screen_tags_events_in_place(self):
+        self.feed()
+        rows = [{"device_id": "pot", "timestamp": ts, **values, "event": event}
+                for ts, values, event in [(*reading(21, temperature=-127.0), "wake_word"), (*reading(20), None)]]
+        self.assertEqual(self.detector.screen(rows), 1)
+        self.assertEqual(rows[0]["event"], "anomaly:temperature_range|wake_word")
+        self.assertIsNone(rows[1]["event"])
+        self.assertTrue(is_quarantined(rows[0]["event"]))
+        self.assertEqual(quarantine_event({"moisture": "rate", "light": "range"}), "anomaly:moisture_rate,light_range")
+        self.assertEqual(quarantined_channels(alert_event(rows[0]["event"])), ("temperature",))  # Still found after an alert tag
+        self.assertEqual(quarantined_channels("wake_word"), ())
+
+    def test_warm_relearns_from_ring_buffers(self):
+        readings = RecentReadings(capacity=64, hours=24)
+        now = datetime.utcnow()
+        for minute in range(20):
+            readings.record("pot", now - timedelta(minutes=20 - minute), 21.0, 50.0, 60.0)
+        self.assertEqual(self.detector.warm(readings), 20)
+        self.assertEqual(self.detector.check("pot", now, {"temperature": 25.0, "moisture": 50.0, "light": 60.0}),
+                         {"temperature": "zscore"})  # Warmed up: the z-score test applies straight away
+        self.assertEqual(self.detector.last_accepted("pot")["temperature"], 21.0)
+        self.assertEqual(self.detector.stats()["channels_tracked"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
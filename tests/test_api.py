@@ -0,0 +1,310 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+import models
+from models import get_settings, get_engine, init_db
+from tests.db_utils import database_url_for_tests, reset_database
+
+class ApiTestCase(unittest.TestCase):
+    """Runs the FastAPI app against a throwaway database."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.url = database_url_for_tests(self.tmp.name)
+        settings = get_settings()
+        # Test readings arrive milliseconds apart, so alerts don't wait for a minimum duration
+        for name, value in [("DATABASE_URL", self.url), ("PROACTIVE_CARE_ENABLED", False),
+                            ("ALERT_MIN_DURATION_SECONDS", 0.0)]:
+            p = patch.object(settings, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        reset_database(get_engine())
+        init_db()
+        from services.history_cache import history_cache
+        history_cache.clear()  # Pages cached against the previous test's database
+        from services.moisture_forecast import moisture_forecast
+        moisture_forecast.clear()
+
+        import main
+        # Entering the client keeps one event loop for the whole test, so pooled async
+        # connections (asyncpg in particular) stay bound to a live loop
+        self.client = TestClient(main.app)
+        self.client.__enter__()
+        self.addCleanup(self._shutdown)
+
+    def _shutdown(self):
+        engine = models._async_engines.pop(self.url, None)
+        if engine is not None:
+            self.client.portal.call(engine.dispose)
+        self.client.__exit__(None, None, None)
+        models._engines.pop(self.url).dispose()
+
+    def ingest(self, device_id="pot_1", moisture=50.0, **params):
+        params = {"device_id": device_id, "temperature": 22.0, "moisture": moisture, "light": 50.0, **params}
+        response = self.client.post("/v1/ingest", params=params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+class TestAsyncEndpoints(ApiTestCase):
+    def test_low_moisture_alert_fires_once_per_reading(self):
+        self.ingest(moisture=10.0)
+        first = self.client.get("/v1/device/pot_1/poll").json()
+        self.assertEqual(first["notification_url"], "/v1/audio/notification/low-moisture")
+        second = self.client.get("/v1/device/pot_1/poll").json()
+        self.assertIsNone(second["notification_url"])
+
+    def test_voice_query_runs_through_agent_graph(self):
+        from tests import test_orchestrator
+        from agents import orchestrator
+        from services.reply_cache import reply_cache
+        from services.semantic_cache import semantic_cache
+        reply_cache.clear()
+        semantic_cache.clear()
+        with patch("agents.router_agent.get_llm", test_orchestrator.fake_llm("HEALTH")), \
+             patch("agents.conversation_agent.get_llm", test_orchestrator.fake_llm("Mood: thirsty | Priority: high | Reply: Water me!")), \
+             patch.object(orchestrator, "_pot_graph", None), \
+             patch.object(orchestrator, "create_pot_graph", wraps=orchestrator.create_pot_graph) as build:
+            reply = self.ingest(moisture=8.0, user_query="Do you need water?")
+            self.ingest(moisture=8.0, user_query="Are you thirsty today?")
+        self.assertEqual(build.call_count, 1)  # Compiled once, shared by requests
+        self.assertEqual(reply["reply_text"], "Water me!")
+        self.assertEqual(reply["display"]["mood"], "thirsty")
+
+    def test_alerts_use_hysteresis_and_cooldown(self):
+        fired = [self.ingest(moisture=m)["notification_url"] is not None for m in (19.0, 21.0, 18.0, 24.0, 19.5)]
+        self.assertEqual(fired, [True, False, False, False, False])  # Never recovered above the exit threshold
+        self.assertIsNotNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+        self.assertIsNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+
+        self.ingest(moisture=40.0)  # Watered
+        self.assertIsNone(self.ingest(moisture=15.0)["notification_url"])  # Dry again, but within the cool-down
+        self.assertIsNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+        self.assertEqual(self.client.get("/v1/cache/stats").json()["alert_engine"]["suppressed_by_cooldown"], 1)
+
+    def test_sensor_glitch_is_quarantined(self):
+        for _ in range(12):
+            self.ingest("pot_1", moisture=55.0)
+        self.client.get("/v1/device/pot_1/poll")
+        glitch = self.ingest("pot_1", moisture=0.0, event="wake_word")  # Probe lost contact with the soil
+        self.assertIsNone(glitch["notification_url"])
+        self.assertIsNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+
+        recent = self.client.get("/v1/device/pot_1/recent", params={"minutes": 5}).json()
+        self.assertEqual(recent["stats"]["count"], 13)  # Its temperature and light were fine
+        self.assertEqual(recent["stats"]["moisture"]["min"], 55.0)
+        self.assertIsNone(recent["readings"]["moisture"][-1])
+        series = self.client.get("/v1/device/pot_1/series").json()
+        self.assertEqual(sum(p["count"] for p in series["points"]), 13)
+        self.assertEqual(min(p["moisture"]["min"] for p in series["points"]), 55.0)
+        raw = self.client.get("/v1/device/pot_1/readings", params={"channels": "moisture"}).json()["rows"]
+        self.assertEqual(raw[-1]["event"], "anomaly:moisture_zscore|wake_word")  # Kept in history, tagged
+
+    def test_voice_alert_replaces_the_chime(self):
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from services.proactive_care import proactive_care
+        from tests.test_proactive_care import FakeTTS, REPLY
+        llm = FakeListChatModel(responses=[REPLY])
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        settings = get_settings()
+        with patch.object(settings, "PROACTIVE_CARE_ENABLED", True), patch.object(settings, "STORAGE_PATH", storage.name), \
+             patch.object(proactive_care, "_tts", FakeTTS()), patch("agents.conversation_agent.get_llm", lambda tier="pro": llm):
+            self.assertIsNone(self.ingest(moisture=40.0)["notification_url"])
+            self.assertIsNone(self.ingest(moisture=12.0)["notification_url"])  # Alert raised, voice alert on its way
+            self.client.portal.call(proactive_care.drain)
+
+            poll = self.client.get("/v1/device/pot_1/poll").json()
+            self.assertIsNotNone(poll["convo_id"])
+            self.assertIsNone(poll["notification_url"])
+            self.assertIsNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+            self.assertIsNone(self.ingest(moisture=11.0)["notification_url"])  # Still dry: no new alert, no new job
+            self.client.portal.call(proactive_care.drain)
+            self.assertIsNone(self.client.get("/v1/device/pot_1/poll").json()["convo_id"])
+
+    def test_dead_temperature_probe_keeps_moisture_alerts(self):
+        for moisture in (30.0, 22.0):
+            self.assertIsNone(self.ingest(moisture=moisture, temperature=-127.0)["notification_url"])
+        alert = self.ingest(moisture=14.0, temperature=-127.0)  # Disconnected DS18B20 on every reading
+        self.assertIsNotNone(alert["notification_url"])
+        self.assertIsNotNone(self.client.get("/v1/device/pot_1/poll").json()["notification_url"])
+
+        recent = self.client.get("/v1/device/pot_1/recent", params={"minutes": 5}).json()
+        self.assertEqual(recent["stats"]["moisture"]["last"], 14.0)
+        self.assertIsNone(recent["stats"]["temperature"]["min"])
+        point = self.client.get("/v1/device/pot_1/series").json()["points"][-1]
+        self.assertEqual((point["moisture"]["min"], point["temperature"]["min"]), (14.0, None))
+        bucket = self.client.get("/v1/device/pot_1/readings", params={"bucket": "1d", "aggregates": "min,first"}).json()["rows"]
+        self.assertEqual((bucket[0]["moisture_min"], bucket[0]["temperature_min"]), (14.0, None))
+        raw = self.client.get("/v1/device/pot_1/readings").json()["rows"]
+        self.assertEqual(raw[-1]["event"], "alert:moisture_low|anomaly:temperature_range")
+
+    def test_simulator_live_sync_and_recent_readings_from_memory(self):
+        self.client.post("/v1/ingest", params=dict(device_id="hw_pot", temperature=18.5, moisture=30.0, light=40.0))
+        self.ingest("pot_simulator_001", moisture=45.0)
+
+        sync = self.client.get("/v1/device/pot_simulator_001/poll").json()
+        self.assertEqual(sync["latest_sensors"]["temperature"], 18.5)
+
+        recent = self.client.get("/v1/device/pot_simulator_001/recent", params={"minutes": 5}).json()
+        self.assertEqual(recent["stats"]["count"], 1)
+        self.assertEqual(recent["readings"]["temperature"], [18.5])  # Slider temperature overridden by hardware
+        self.assertEqual(recent["readings"]["moisture"], [45.0])
+
+    def test_species_update_and_history(self):
+        response = self.client.post("/v1/device/pot_1/species", params={"species": "Cactus"})
+        self.assertEqual(response.json(), {"status": "updated", "species": "Cactus"})
+        self.assertEqual(self.client.get("/v1/history", params={"device_id": "pot_1"}).json(), [])
+
+    def test_history_pages_cache_and_etag(self):
+        from datetime import datetime, timedelta
+        from sqlmodel import Session
+        from models import Conversation, Device
+        t0 = datetime(2024, 5, 1)
+        with Session(get_engine()) as session:
+            session.add(Device(id="pot_5", name="Pot 5", species="Basil"))
+            session.add_all(Conversation(device_id="pot_5", timestamp=t0 + timedelta(minutes=i // 2), ai_response=f"reply {i}") for i in range(25))
+            session.commit()
+
+        first = self.client.get("/v1/history", params={"device_id": "pot_5"})
+        self.assertEqual([r["reply_text"] for r in first.json()][:2], ["reply 24", "reply 23"])
+        pages, before_id = first.json(), first.headers["X-Next-Before-Id"]
+        while before_id:
+            page = self.client.get("/v1/history", params={"device_id": "pot_5", "before_id": before_id})
+            pages += page.json()
+            before_id = page.headers.get("X-Next-Before-Id")
+        self.assertEqual([r["reply_text"] for r in pages], [f"reply {i}" for i in reversed(range(25))])
+
+        etag = first.headers["ETag"]
+        unchanged = self.client.get("/v1/history", params={"device_id": "pot_5"}, headers={"If-None-Match": etag})
+        self.assertEqual((unchanged.status_code, unchanged.content), (304, b""))
+
+        # A new conversation lands on the cached page straight away and changes the ETag
+        with Session(get_engine()) as session:
+            session.add(Conversation(device_id="pot_5", ai_response="fresh"))
+            session.commit()
+        changed = self.client.get("/v1/history", params={"device_id": "pot_5", "limit": 3}, headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([r["reply_text"] for r in changed.json()], ["fresh", "reply 24", "reply 23"])
+
+        from services.history_cache import history_cache
+        self.assertGreaterEqual(history_cache.stats()["hits"], 2)
+
+    def test_conversation_search(self):
+        from sqlmodel import Session
+        from models import Conversation, Device
+        with Session(get_engine()) as session:
+            session.add_all([Device(id="pot_6", name="Pot 6", species="Basil"), Device(id="pot_7", name="Pot 7", species="Fern")])
+            session.add(Conversation(device_id="pot_6", transcription="Do you want fertilizer?", ai_response="Yes please!"))
+            session.add(Conversation(device_id="pot_7", transcription="Why are your leaves yellow?", ai_response="Too much sun."))
+            session.commit()
+
+        found = self.client.get("/v1/conversations/search", params={"q": "fertilizer or yellow"}).json()
+        self.assertEqual({r["device_id"] for r in found["results"]}, {"pot_6", "pot_7"})
+        self.assertIsNone(found["next_offset"])
+        only = self.client.get("/v1/conversations/search", params={"q": "yellow", "device_id": "pot_6"}).json()
+        self.assertEqual(only["results"], [])
+        self.assertEqual(self.client.get("/v1/conversations/search", params={"q": ""}).status_code, 422)
+
+    def test_moisture_forecast_on_poll_and_endpoints(self):
+        from datetime import datetime, timedelta
+        now = datetime.utcnow()
+        readings = [
+            {"temperature": 21.0, "moisture": 60.0 - i, "light": 50.0,
+             "timestamp": (now - timedelta(minutes=5 * (30 - i))).isoformat() + "Z"}
+            for i in range(31)
+        ]
+        self.client.post("/v1/device/pot_3/readings", json=readings)
+
+        forecast = self.client.get("/v1/device/pot_3/poll").json()["moisture_forecast"]
+        self.assertEqual(forecast["threshold"], 20.0)
+        self.assertAlmostEqual(forecast["moisture_now"], 30.0, delta=2.0)  # Linear drying, exponential fit
+        self.assertLess(forecast["hours_to_threshold"], 6)
+        custom = self.client.get("/v1/device/pot_3/forecast", params={"threshold": 25}).json()["forecast"]
+        self.assertLess(custom["hours_to_threshold"], forecast["hours_to_threshold"])
+        fleet = self.client.get("/v1/forecast/moisture", params={"within_hours": 12}).json()
+        self.assertEqual([d["device_id"] for d in fleet["devices"]], ["pot_3"])
+        self.assertIsNone(self.client.get("/v1/device/pot_4/forecast").json()["forecast"])
+
+    def test_bulk_reading_upload(self):
+        readings = [
+            {"temperature": 21.0, "moisture": 40.0 + i, "light": 50.0, "timestamp": f"2024-05-01T10:{i:02d}:00Z"}
+            for i in range(50)
+        ]
+        readings.append({"temperature": 20.0, "moisture": 12.0, "light": 5.0, "event": "night"})
+        response = self.client.post("/v1/device/pot_2/readings", json=readings)
+        self.assertEqual(response.json(), {"status": "stored", "count": 51})
+
+        from sqlmodel import Session, select
+        from models import SensorReading
+        with Session(get_engine()) as session:
+            rows = session.exec(select(SensorReading).where(SensorReading.device_id == "pot_2").order_by(SensorReading.timestamp)).all()
+        self.assertEqual(len(rows), 51)
+        self.assertEqual(rows[0].timestamp.isoformat(), "2024-05-01T10:00:00")
+        self.assertIsNone(rows[0].event)
+        self.assertEqual(rows[-1].event, "night")
+
+        bad = self.client.post("/v1/device/pot_2/readings", json=[{"moisture": 10, "timestamp": "yesterday"}])
+        self.assertEqual(bad.status_code, 422)
+        for incomplete in ({"temperature": 21.0, "light": 50.0}, {"temperature": 21.0, "moisture": None, "light": 50.0}):
+            response = self.client.post("/v1/device/pot_2/readings", json=[incomplete])
+            self.assertEqual(response.status_code, 422)  # Not stored as a 0% (bone dry) reading
+
+    def test_series_served_from_rollups(self):
+        readings = [
+            {"temperature": 20.0, "moisture": float(m), "light": 50.0, "timestamp": f"2024-05-01T{h:02d}:{m:02d}:00"}
+            for h in range(10, 13) for m in range(60)
+        ]
+        self.client.post("/v1/device/pot_3/readings", json=readings)
+        self.ingest("pot_3", moisture=33.0)  # Live ingest is rolled up too
+
+        hourly = self.client.get("/v1/device/pot_3/series", params={
+            "start": "2024-05-01T10:00:00Z", "end": "2024-05-01T13:00:00Z", "max_points": 10}).json()
+        self.assertEqual(hourly["resolution"], "hour")
+        self.assertEqual([p["count"] for p in hourly["points"]], [60, 60, 60])
+        self.assertEqual(hourly["points"][0]["moisture"], {"min": 0.0, "max": 59.0, "mean": 29.5, "last": 59.0})
+
+        by_minute = self.client.get("/v1/device/pot_3/series", params={
+            "start": "2024-05-01T10:00:00", "end": "2024-05-01T10:30:00"}).json()
+        self.assertEqual(by_minute["resolution"], "minute")
+        self.assertEqual(len(by_minute["points"]), 31)
+
+        recent = self.client.get("/v1/device/pot_3/series").json()
+        self.assertEqual(recent["points"][-1]["moisture"]["last"], 33.0)
+
+    def test_readings_pages_and_exports(self):
+        readings = [
+            {"temperature": 20.0, "moisture": float(i), "light": 50.0, "timestamp": f"2024-05-01T10:{i:02d}:00Z"}
+            for i in range(60)
+        ]
+        self.client.post("/v1/device/pot_4/readings", json=readings)
+        window = {"start": "2024-05-01T10:00:00Z", "end": "2024-05-01T11:00:00Z"}
+
+        page = self.client.get("/v1/device/pot_4/readings", params=dict(window, limit=50)).json()
+        self.assertEqual(len(page["rows"]), 50)
+        rest = self.client.get("/v1/device/pot_4/readings", params=dict(window, limit=50, cursor=page["next_cursor"])).json()
+        self.assertEqual([r["moisture"] for r in page["rows"] + rest["rows"]], [float(i) for i in range(60)])
+        self.assertIsNone(rest["next_cursor"])
+
+        buckets = self.client.get("/v1/device/pot_4/readings", params=dict(window, bucket="15m", agg="mean,last", channels="moisture")).json()
+        self.assertEqual(buckets["source"], "rollups")
+        self.assertEqual(buckets["rows"][0], {"t": "2024-05-01T10:00:00", "count": 15, "moisture_mean": 7.0, "moisture_last": 14.0})
+
+        ndjson = self.client.get("/v1/device/pot_4/readings", params=dict(window, format="ndjson", bucket="10m", agg="std"))
+        self.assertEqual(ndjson.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(len(ndjson.text.splitlines()), 6)
+        csv_lines = self.client.get("/v1/device/pot_4/readings", params=dict(window, format="csv", channels="moisture")).text.splitlines()
+        self.assertEqual(csv_lines[0], "t,moisture,event")
+        self.assertEqual(len(csv_lines), 61)
+
+        for bad in ({"bucket": "soon"}, {"agg": "median"}, {"cursor": "abc"}):
+            self.assertEqual(self.client.get("/v1/device/pot_4/readings", params=dict(window, **bad)).status_code, 422)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlmodel import SQLModel, Session, select
+from models import Device, SensorArchive, SensorReading, SensorRollup, create_db_engine
+import services.archive
+from services.archive import archive_readings, decode_block, decode_floats, decode_timestamps, encode_block, encode_floats, encode_timestamps
+from services.reading_store import bulk_insert_readings, readings_between
+from tests.db_utils import database_url_for_tests, reset_database
+
+class TestGorillaCodec(unittest.TestCase):
+    def test_timestamps_round_trip(self):
+        rng = np.random.default_rng(1)
+        regular = np.arange(0, 600_000_000, 10_000_000, dtype=np.int64) + 1_714_557_600_000_000
+        jittered = regular + rng.integers(-40_000, 40_000, regular.size)  # Server-side utcnow jitter
+        gaps = np.array([0, 1, 2, 86_400_000_000 * 40, 86_400_000_000 * 40 + 7, -5], dtype=np.int64).cumsum()
+        for micros in (regular, jittered, gaps, regular[:1], regular[:0]):
+            self.assertEqual(decode_timestamps(encode_timestamps(micros), micros.size).tolist(), micros.tolist())
+        # A steady heartbeat costs about one bit per reading after the first delta
+        self.assertLess(len(encode_timestamps(regular)), 8 + 5 + regular.size // 8 + 2)
+
+    def test_floats_round_trip_bit_exact(self):
+        rng = np.random.default_rng(2)
+        series = [
+            np.full(100, 22.5),
+            np.round(40 + rng.normal(0, 0.5, 500).cumsum(), 1),
+            rng.normal(0, 1e6, 200),
+            np.array([0.0, -0.0, np.inf, -np.inf, 5e-324, 1.7976931348623157e308, -127.0]),
+        ]
+        for values in series:
+            decoded = decode_floats(encode_floats(values), values.size)
+            self.assertEqual(decoded.view(np.uint64).tolist(), values.view(np.uint64).tolist())
+        self.assertLess(len(encode_floats(series[0])), 8 + 100 // 8 + 2)
+
+    def test_block_round_trip_with_events(self):
+        micros = np.arange(5, dtype=np.int64) * 1_000_000
+        values = np.array([[20.0, 20.5, 21.0, 21.0, 20.0], [50, 49, 48, 47, 10.0], [60, 60, 61, 61, 0.0]])
+        ts, decoded, events = decode_block(encode_block(micros, values, {4: "low_moisture_alert"}))
+        self.assertEqual(ts.tolist(), micros.tolist())
+        self.assertEqual(decoded["moisture"].tolist(), values[1].tolist())
+        self.assertEqual(events, {4: "low_moisture_alert"})
+
+class TestArchiver(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.engine = create_db_engine(database_url_for_tests(self.tmp.name))
+        self.addCleanup(self.engine.dispose)
+        reset_database(self.engine)
+        self.addCleanup(reset_database, self.engine)
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add(Device(id="p", name="P", species="Basil"))
+            session.commit()
+
+    def count(self, model):
+        with Session(self.engine) as session:
+            return session.exec(select(func.count()).select_from(model)).one()
+
+    def read(self, start, end):
+        with self.engine.connect() as conn:
+            return readings_between(conn, "p", start, end)
+
+    def test_archived_history_reads_back_identically(self):
+        start = datetime(2024, 1, 20, 0, 0, 0, 123456)
+        rng = np.random.default_rng(3)
+        readings = [{
+            "device_id": "p", "timestamp": start + timedelta(minutes=15 * i, microseconds=int(rng.integers(0, 900))),
+            "temperature": round(21 + rng.normal(0, 0.3), 2), "moisture": round(60 - i * 0.01, 2), "light": float(i % 80),
+            "event": "low_moisture_alert" if i % 500 == 0 else None,
+        } for i in range(6000)]  # ~2 months of 15-minute readings
+        bulk_insert_readings(readings, engine=self.engine)
+        rollups_before = self.count(SensorRollup)
+        window = (datetime(2024, 1, 1), datetime(2024, 4, 1))
+        before = self.read(*window)
+
+        now = datetime(2024, 2, 15) + timedelta(days=30)  # Retention cut lands mid-February
+        moved = archive_readings(retention_days=30, engine=self.engine, now=now)
+        self.assertEqual(moved + self.count(SensorReading), 6000)
+        self.assertEqual(self.count(SensorArchive), 2)  # January and (part of) February
+        self.assertEqual(self.count(SensorRollup), rollups_before)  # Charts keep working
+
+        after = self.read(*window)
+        self.assertEqual(after["timestamp"].tolist(), before["timestamp"].tolist())
+        for channel in ("temperature", "moisture", "light"):
+            self.assertEqual(after[channel].tolist(), before[channel].tolist())
+        self.assertEqual(after["event"], before["event"])
+
+        # The next run folds the rest of February into the existing block
+        archive_readings(retention_days=0, engine=self.engine, now=datetime(2024, 3, 1))
+        self.assertEqual(self.count(SensorArchive), 2)
+        self.assertEqual(self.read(*window)["timestamp"].tolist(), before["timestamp"].tolist())
+
+        # Partial ranges cut through blocks and raw rows alike
+        part = self.read(datetime(2024, 2, 28), datetime(2024, 3, 2))
+        self.assertEqual(part["timestamp"].size, 3 * 24 * 4)
+
+    def test_paged_read_stops_at_the_block_that_fills_the_page(self):
+        start = datetime(2024, 1, 1)
+        readings = [{"device_id": "p", "timestamp": start + timedelta(hours=i), "temperature": 21.0,
+                     "moisture": 50.0, "light": 40.0} for i in range(24 * 90)]  # January - March
+        bulk_insert_readings(readings, engine=self.engine)
+        archive_readings(retention_days=0, engine=self.engine, now=datetime(2024, 4, 1))
+        self.assertEqual(self.count(SensorArchive), 3)
+
+        window = (datetime(2024, 1, 15), datetime(2024, 4, 1))
+        with patch.object(services.archive, "decode_block", wraps=decode_block) as decode:
+            with self.engine.connect() as conn:
+                page = readings_between(conn, "p", *window, limit=100)
+        self.assertEqual(decode.call_count, 1)  # February and March are never decoded
+        self.assertEqual(page["timestamp"].size, 100)
+        with self.engine.connect() as conn:
+            full = readings_between(conn, "p", *window)
+        self.assertEqual(page["timestamp"].tolist(), full["timestamp"][:100].tolist())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from agents.conversation_agent import ConversationAgent
+from agents.fallbacks import start_budget, complete_sentences
+from services.reply_cache import reply_cache
+from services.semantic_cache import semantic_cache
+
+REPLY = "Mood: happy | Priority: low | Reply: Hello there. I am the king of herbs and I am feeling wonderful today."
+
+class TestConversationBudget(IsolatedAsyncioTestCase):
+    def setUp(self):
+        reply_cache.clear()
+        semantic_cache.clear()
+
+    def agent(self, char_delay):
+        # FakeListChatModel streams one character every `sleep` seconds
+        llm = FakeListChatModel(responses=[REPLY], sleep=char_delay)
+        p = patch("agents.conversation_agent.get_llm", lambda tier="pro": llm)
+        p.start()
+        self.addCleanup(p.stop)
+        return ConversationAgent()
+
+    def state(self, budget, moisture=50.0, query="How are you?"):
+        return {
+            "device_id": "test_device", "species": "Basil", "user_query": query,
+            "sensor_data": {"temperature": 22.0, "moisture": moisture, "light": 60.0},
+            "deadline": start_budget(budget),
+        }
+
+    def test_complete_sentences(self):
+        self.assertEqual(complete_sentences("Hi there. I am bas"), "Hi there.")
+        self.assertEqual(complete_sentences("Hi the"), "")
+
+    async def test_within_budget_uses_llm(self):
+        result = await self.agent(0.0).run(self.state(budget=5.0))
+        self.assertEqual(result["answer_tier"], "llm")
+        self.assertTrue(result["conversation_response"].startswith("Hello there."))
+
+    async def test_deadline_returns_partial_sentences(self):
+        start = time.perf_counter()
+        result = await self.agent(0.005).run(self.state(budget=0.4))
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(result["answer_tier"], "partial")
+        self.assertEqual(result["conversation_response"], "Hello there.")
+        self.assertEqual(result["mood"], "happy")
+
+    async def test_coalesced_waiter_salvages_shared_stream(self):
+        agent = self.agent(0.01)  # Full reply takes ~1s; its first sentence is out after ~0.5s
+        leader = asyncio.ensure_future(agent.run(self.state(budget=5.0)))
+        await asyncio.sleep(0.55)
+        waiter = await agent.run(self.state(budget=0.35))  # Same prompt: joins the leader's flight, then times out
+        self.assertEqual(waiter["answer_tier"], "partial")
+        self.assertEqual(waiter["conversation_response"], "Hello there.")
+        self.assertEqual((await leader)["answer_tier"], "llm")
+
+    async def test_spent_budget_uses_template(self):
+        result = await self.agent(0.0).run(self.state(budget=0.05, moisture=5.0))
+        self.assertEqual(result["answer_tier"], "template")
+        self.assertEqual(result["mood"], "thirsty")
+        self.assertIn("Basil", result["conversation_response"])
+
+    async def test_repeat_is_served_from_cache(self):
+        agent = self.agent(0.0)
+        with patch.object(reply_cache, "variants", 1):
+            await agent.run(self.state(budget=5.0))
+            result = await agent.run(self.state(budget=5.0))
+        self.assertEqual(result["answer_tier"], "cache")
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session
+from migrations import run_migrations
+from models import Conversation, Device, create_db_engine
+from services.conversation_search import fts5_query, search_conversations
+from tests.db_utils import database_url_for_tests, reset_database
+
+T0 = datetime(2024, 5, 1)
+
+class TestFts5Query(unittest.TestCase):
+    def test_websearch_syntax(self):
+        self.assertEqual(fts5_query("fertilizer"), '("fertilizer")')
+        self.assertEqual(fts5_query('fertilizer or "yellow leaves"'), '("fertilizer") OR ("yellow leaves")')
+        self.assertEqual(fts5_query("leaves -spider"), '(("leaves")) NOT ("spider")')
+
+    def test_fts_syntax_is_neutralised(self):
+        self.assertEqual(fts5_query('NEAR(a b) * "unclosed'), '("NEAR a" AND "b" AND "unclosed")')
+        self.assertEqual(fts5_query('  -  "" or '), "")
+
+class TestSearchConversations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.engine = create_db_engine(database_url_for_tests(self.tmp.name))
+        self.addCleanup(self.engine.dispose)
+        reset_database(self.engine)
+        self.addCleanup(reset_database, self.engine)
+        SQLModel.metadata.create_all(self.engine)
+        run_migrations(self.engine)
+
+        lines = [
+            ("a", "How much fertilizer does my basil need?", "A little liquid feed every two weeks."),
+            ("a", "My leaves are turning yellow", "Yellow leaves often mean too much water."),
+            ("b", "Any fertilizer tips?", "Go easy on the fertilizer, I'm a succulent."),
+            ("b", "Good morning", "Morning! The light is lovely today."),
+            ("b", "There are spiders on my yellow leaves", "Spider mites! Wipe my leaves."),
+        ]
+        with Session(self.engine) as session:
+            session.add_all([Device(id="a", name="A", species="Basil"), Device(id="b", name="B", species="Cactus")])
+            session.add_all(Conversation(device_id=d, timestamp=T0 + timedelta(hours=i), transcription=q, ai_response=r)
+                            for i, (d, q, r) in enumerate(lines))
+            session.commit()
+
+    def search(self, query, **filters):
+        with self.engine.connect() as conn:
+            return search_conversations(conn, query, **filters)
+
+    def test_ranked_across_devices(self):
+        results = self.search("fertilizer")
+        self.assertEqual({r["id"] for r in results}, {1, 3})
+        self.assertEqual(results[0]["id"], 3)  # Mentioned in the question and twice in the reply
+        self.assertIn("[", results[0]["snippet"])
+
+        results = self.search('fertilizer or "yellow leaves"')
+        self.assertEqual({r["id"] for r in results}, {1, 2, 3, 5})
+        self.assertEqual({r["id"] for r in self.search('"yellow leaves" -spiders')}, {2})
+
+    def test_stemming(self):
+        self.assertEqual({r["id"] for r in self.search("turn")}, {2})
+
+    def test_device_and_time_filters(self):
+        self.assertEqual([r["id"] for r in self.search("fertilizer", device_id="a")], [1])
+        results = self.search("leaves", start=T0 + timedelta(hours=2), end=T0 + timedelta(hours=5))
+        self.assertEqual([r["id"] for r in results], [5])
+        self.assertEqual(results[0]["timestamp"], (T0 + timedelta(hours=4)).isoformat())
+
+    def test_index_follows_updates_and_deletes(self):
+        with Session(self.engine) as session:
+            convo = session.get(Conversation, 4)
+            convo.ai_response = "Maybe some fertilizer in spring."
+            session.delete(session.get(Conversation, 1))
+            session.commit()
+        self.assertEqual({r["id"] for r in self.search("fertilizer")}, {3, 4})
+        self.assertEqual(self.search("lovely"), [])
+
+    def test_pagination(self):
+        first = self.search("leaves", limit=1)
+        second = self.search("leaves", limit=1, offset=1)
+        self.assertEqual(len(first) + len(second), 2)
+        self.assertNotEqual(first[0]["id"], second[0]["id"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+import models
+from models import get_engine, get_settings
+
+class TestDbEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.url = f"sqlite:///{os.path.join(self.tmp.name, 'pot.db')}"
+        p = patch.object(get_settings(), "DATABASE_URL", self.url)
+        p.start()
+        self.addCleanup(p.stop)
+        self.addCleanup(lambda: models._engines.pop(self.url).dispose())
+
+    def test_engine_is_cached_per_url(self):
+        self.assertIs(get_engine(), get_engine())
+
+    def test_sqlite_pragmas_applied(self):
+        settings = get_settings()
+        with get_engine().connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), settings.SQLITE_BUSY_TIMEOUT_MS)
+
+if __name__ == "__main__":
+    unittest.main()
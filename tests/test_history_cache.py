@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.history_cache import HistoryCache
+
+def row(i, minute):
+    return {"id": i, "user_query": None, "reply_text": f"reply {i}", "mood": None, "audio_url": None,
+            "timestamp": f"2024-05-01T10:{minute:02d}:00"}
+
+class TestHistoryCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = HistoryCache(page_size=3, ttl_seconds=60, max_devices=2)
+
+    def test_insert_prepends_and_trims(self):
+        self.cache.put("p", [row(2, 2), row(1, 1)], self.cache.generation("p"))
+        rows, etag = self.cache.get("p", 10)
+        self.cache.add("p", row(3, 3))
+        self.cache.add("p", row(4, 4))
+        fresh, fresh_etag = self.cache.get("p", 10)
+        self.assertEqual([r["id"] for r in fresh], [4, 3, 2])
+        self.assertNotEqual(etag, fresh_etag)
+        self.assertEqual(self.cache.get("p", 1)[0], [row(4, 4)])
+
+    def test_out_of_order_insert_drops_the_page(self):
+        self.cache.put("p", [row(2, 5)], self.cache.generation("p"))
+        self.cache.add("p", row(3, 1))  # Older than the cached top (e.g. a backfilled archive)
+        self.assertIsNone(self.cache.get("p", 10))
+
+    def test_page_read_before_a_concurrent_insert_is_not_cached(self):
+        generation = self.cache.generation("p")
+        self.cache.add("p", row(9, 9))  # Committed while the request was still querying
+        self.cache.put("p", [row(1, 1)], generation)
+        self.assertIsNone(self.cache.get("p", 10))
+
+    def test_ttl_and_lru(self):
+        for device in ("a", "b", "c"):
+            self.cache.put(device, [row(1, 1)], self.cache.generation(device))
+        self.assertIsNone(self.cache.get("a", 10))
+        with patch("services.history_cache.time.monotonic", return_value=10 ** 9):
+            self.assertIsNone(self.cache.get("c", 10))
+
+if __name__ == "__main__":
+    unittest.main()
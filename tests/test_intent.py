@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.intent import classify_intent, tier_for_intent, is_sensor_query, IntentEngine
+from tests.benchmark_intent import EVAL_SET
+
+class TestIntentTiers(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(classify_intent("hey plant"), "GREETING")
+        self.assertEqual(classify_intent("Tell me a joke!"), "JOKE")
+        self.assertEqual(classify_intent("Who are you?"), "IDENTITY")
+        self.assertEqual(classify_intent("Hey plant, how are you feeling?"), "HEALTH")
+        self.assertEqual(classify_intent("What's the ideal potting mix for you?"), "KNOWLEDGE")
+        self.assertEqual(classify_intent("banana"), "AMBIGUOUS")
+        self.assertEqual(classify_intent(""), "HEALTH")
+
+    def test_tiers(self):
+        for tag in ["GREETING", "JOKE", "AMBIGUOUS"]:
+            self.assertEqual(tier_for_intent(tag), "fast")
+        for tag in ["HEALTH", "KNOWLEDGE", "IDENTITY"]:
+            self.assertEqual(tier_for_intent(tag), "pro")
+
+    def test_sensor_keywords(self):
+        self.assertTrue(is_sensor_query("do you need water?"))
+        self.assertTrue(is_sensor_query("What's the TEMPERATURE"))
+        self.assertFalse(is_sensor_query("tell me a joke"))
+        self.assertFalse(is_sensor_query(""))
+
+    def test_held_out_accuracy_and_confidence(self):
+        engine = IntentEngine()
+        correct = sum(engine.predict(q)[0] == tag for q, tag in EVAL_SET)
+        self.assertGreaterEqual(correct / len(EVAL_SET), 0.85)
+        tag, confidence = engine.predict("tell me a joke")
+        self.assertEqual(tag, "JOKE")
+        self.assertGreater(confidence, 0.55)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.pool import StaticPool
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, create_engine, select
+import models
+from config import get_settings
+from models import PlantKnowledge, create_db_engine, get_engine
+from agents.knowledge_index import KnowledgeIndex, knowledge_index, normalize_species, NO_LOCAL_DATA
+from agents.sensor_rules import SensorRuleEngine
+from tests.db_utils import database_url_for_tests, reset_database
+
+def knowledge(species, lore="I'm the king of herbs!"):
+    return PlantKnowledge(species=species, biological_info="Ocimum basilicum.", care_tips="Keep moist.", lore=lore)
+
+class TestKnowledgeIndex(unittest.TestCase):
+    def test_normalized_and_alias_lookup(self):
+        index = KnowledgeIndex()
+        index.load(rows=[knowledge("Basil"), knowledge("Aloe Vera", lore="First-aid kit.")])
+        for name in ["Basil", "  BASIL ", "sweet basil", "Ocimum basilicum", "Basils"]:
+            self.assertEqual(index.lookup(name).species, "Basil", name)
+        self.assertEqual(index.lookup("aloe-vera").lore, "First-aid kit.")
+        self.assertEqual(index.lookup("Aloe").species, "Aloe Vera")
+        self.assertIsNone(index.lookup("Unknown"))
+        self.assertEqual(normalize_species("Peace-Lily"), "peace lily")
+
+    def test_precomputed_know_text(self):
+        index = KnowledgeIndex()
+        index.load(rows=[knowledge("Basil")])
+        self.assertEqual(
+            index.know_text("basil"),
+            "Biology: Ocimum basilicum.\nCare: Keep moist.\nLore/Identity: I'm the king of herbs!")
+        self.assertEqual(index.know_text("Cactus"), NO_LOCAL_DATA)
+
+    def test_commit_invalidates_singleton(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(engine)
+        knowledge_index.load(rows=[])
+        with Session(engine) as session:
+            session.add(knowledge("Basil"))
+            session.commit()
+            self.assertIsNone(knowledge_index._entries)  # Rebuilt on next lookup
+
+            knowledge_index.load(rows=session.exec(select(PlantKnowledge)).all())
+            row = session.exec(select(PlantKnowledge)).first()
+            row.lore = "New lore."
+            session.add(row)
+            session.commit()
+            knowledge_index.load(rows=session.exec(select(PlantKnowledge)).all())
+        self.assertEqual(knowledge_index.lookup("Basil").lore, "New lore.")
+        knowledge_index.load(rows=[])
+
+    def test_picks_up_writes_from_other_processes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = database_url_for_tests(tmp.name)
+        settings = get_settings()
+        for name, value in [("DATABASE_URL", url), ("KNOWLEDGE_REFRESH_SECONDS", 0.05)]:
+            p = patch.object(settings, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        engine = get_engine()
+        self.addCleanup(lambda: models._engines.pop(url).dispose())
+        reset_database(engine)
+        SQLModel.metadata.create_all(engine)
+        index, rules = KnowledgeIndex(), SensorRuleEngine()
+        self.assertIsNone(index.lookup("Basil"))
+        self.assertEqual(rules.ranges_for("Basil")["moisture"], (30.0, 70.0))
+
+        # Raw SQL on its own connection - no ORM hooks fire, like debug/seed_plants.py in another process
+        other = create_db_engine(url)
+        self.addCleanup(other.dispose)
+        with other.begin() as conn:
+            conn.execute(text("INSERT INTO plantknowledge (species, biological_info, care_tips, lore) "
+                              "VALUES ('Basil', 'Herb.', 'Keep moist.', 'King of herbs.')"))
+            conn.execute(text("INSERT INTO plantidealrange (species, temp_min, temp_max, moisture_min, moisture_max, "
+                              "light_min, light_max) VALUES ('Basil', 21, 30, 40, 75, 50, 90)"))
+        self.assertIsNone(index.lookup("Basil"))  # Not re-checked within the interval
+        time.sleep(0.06)
+        self.assertEqual(index.lookup("Basil").lore, "King of herbs.")
+        self.assertEqual(rules.ranges_for("Basil")["moisture"], (40.0, 75.0))
+        reset_database(engine)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from models import PlantKnowledge
+from agents.knowledge_index import knowledge_index
+from agents.lore_store import LoreStore, split_passages
+
+BASIL = PlantKnowledge(
+    species="Basil",
+    biological_info="Ocimum basilicum is a culinary herb that loves warmth and water.",
+    care_tips="Requires 6-8 hours of sun. Soil should be consistently moist but not soggy. Ideal temp: 21-30C.",
+    lore="I'm the king of herbs! Without enough water, I'll droop faster than a tragic hero."
+)
+CACTUS = PlantKnowledge(
+    species="Cactus",
+    biological_info="Cacti are desert dwellers that store water in their stems.",
+    care_tips="Needs bright direct light. Only water when soil is bone dry.",
+    lore="I'm tough and prickly."
+)
+BASIL_NOTES = """Pinch off flower buds as soon as they appear so the leaves stay sweet.
+
+Basil originated in India and was revered in ancient Greece as a royal herb.
+
+Yellowing lower leaves usually mean overwatering or poor drainage in the pot.
+
+Harvest from the top, just above a pair of leaves, to encourage bushy growth."""
+
+class TestLoreStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        corpus = os.path.join(self.tmp.name, "corpus")
+        os.makedirs(corpus)
+        with open(os.path.join(corpus, "basil.md"), "w") as f:
+            f.write(BASIL_NOTES)
+        with open(os.path.join(corpus, "general.txt"), "w") as f:
+            f.write("Most houseplants prefer rooms between 18 and 24 degrees.")
+
+        knowledge_index.load(rows=[BASIL, CACTUS])
+        self.addCleanup(knowledge_index.load, rows=[])
+        self.store = LoreStore(index_path=os.path.join(self.tmp.name, "index"), corpus_path=corpus)
+
+    def test_split_passages_keeps_sentences_whole(self):
+        text = "One two three. Four five six. Seven eight nine."
+        self.assertEqual(split_passages(text, max_words=6), ["One two three. Four five six.", "Seven eight nine."])
+        self.assertEqual(split_passages("A b.\n\nC d."), ["A b.", "C d."])
+
+    def test_top_k_relevant_passages_for_species(self):
+        passages = self.store.search("Basil", "Where does basil come from originally?", k=2)
+        self.assertEqual(len(passages), 2)
+        self.assertIn("India", passages[0].text)
+        self.assertTrue(all(p.species in ("basil", "general") for p in passages))
+
+        passages = self.store.search("basil", "Why are my leaves turning yellow?", k=1)
+        self.assertIn("Yellowing", passages[0].text)
+
+        cactus = self.store.search("Cactus", "How much water do you need?", k=3)
+        self.assertTrue(all(p.species in ("cactus", "general") for p in cactus))
+
+    def test_context_is_bounded(self):
+        context = self.store.context("Basil", "Tell me about your history", k=3)
+        self.assertEqual(len(context.splitlines()), 3)
+        # Unknown species only get the general notes
+        self.assertEqual(self.store.context("Unknown Fern", "hello"), "Notes: Most houseplants prefer rooms between 18 and 24 degrees.")
+
+    def test_matrix_is_memory_mapped_and_reused(self):
+        self.store.build()
+        self.assertIsInstance(self.store._matrix, np.memmap)
+        mtime = os.path.getmtime(os.path.join(self.store.index_path, "passages.npy"))
+
+        reopened = LoreStore(index_path=self.store.index_path, corpus_path=self.store.corpus_path)
+        reopened.build()
+        self.assertEqual(os.path.getmtime(os.path.join(self.store.index_path, "passages.npy")), mtime)
+
+        knowledge_index.load(rows=[BASIL])  # Knowledge changed -> next search rebuilds
+        self.assertEqual([p.species for p in self.store.search("Cactus", "water")], ["general"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from sqlmodel import SQLModel
+from models import create_db_engine
+from migrations import MIGRATIONS, current_version, run_migrations
+from tests.db_utils import database_url_for_tests, reset_database
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.engine = create_db_engine(database_url_for_tests(self.tmp.name))
+        self.addCleanup(self.engine.dispose)
+        reset_database(self.engine)
+        self.addCleanup(reset_database, self.engine)
+
+    def test_fresh_database_applies_everything_once(self):
+        SQLModel.metadata.create_all(self.engine)
+        self.assertEqual(run_migrations(self.engine), [m.version for m in MIGRATIONS])
+        self.assertEqual(run_migrations(self.engine), [])
+        self.assertEqual(current_version(self.engine), MIGRATIONS[-1].version)
+
+        indexes = {ix["name"]: ix["column_names"] for ix in inspect(self.engine).get_indexes("sensorreading")}
+        self.assertEqual(indexes["ix_sensorreading_device_timestamp"], ["device_id", "timestamp"])
+
+    def test_legacy_database_gains_missing_columns(self):
+        # The shape of a plant_pot.db created before the debug/ upgrade scripts existed
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE device (id VARCHAR PRIMARY KEY, name VARCHAR, species VARCHAR, created_at TIMESTAMP)"))
+            conn.execute(text("CREATE TABLE sensorreading (id INTEGER PRIMARY KEY, device_id VARCHAR, timestamp TIMESTAMP, event VARCHAR)"))
+        SQLModel.metadata.create_all(self.engine)  # Creates the other tables, leaves these alone
+        run_migrations(self.engine)
+
+        columns = {c["name"] for c in inspect(self.engine).get_columns("device")}
+        self.assertTrue({"pending_audio_id", "is_simulator", "last_notified_reading_id"} <= columns)
+        columns = {c["name"] for c in inspect(self.engine).get_columns("sensorreading")}
+        self.assertTrue({"temperature", "moisture", "light"} <= columns)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.moisture_forecast import MoistureForecaster, fit_drying, hours_to_threshold
+from services.recent_readings import RecentReadings
+
+NOW = datetime(2024, 5, 2, 12, 0)
+
+def drying(m0, rate, hours, step_minutes=5):
+    """Exponential drying curve sampled every step_minutes over the last `hours` (oldest first)."""
+    t = np.arange(0, hours * 60 + 1, step_minutes) / 60
+    return t - hours, m0 * np.exp(-rate * t)
+
+class TestFitDrying(unittest.TestCase):
+    def fit(self, rows):
+        width = max(len(h) for h, _ in rows)
+        ts = np.full((len(rows), width), np.nan)
+        moisture = np.full((len(rows), width), np.nan)
+        for i, (hours, values) in enumerate(rows):
+            ts[i, width - len(hours):] = hours * 3600
+            moisture[i, width - len(values):] = values
+        return fit_drying(ts, moisture, watering_jump=5.0, min_samples=6, min_span_seconds=1200)
+
+    def test_recovers_rate_for_every_row(self):
+        rows = [drying(60, 0.05, 6), drying(45, 0.02, 2), drying(70, 0.1, 12)]
+        fit = self.fit(rows)
+        self.assertTrue(fit["ok"].all())
+        np.testing.assert_allclose(fit["rate"], [0.05, 0.02, 0.1], rtol=1e-9)
+        now = np.array([values[-1] for _, values in rows])
+        np.testing.assert_allclose(np.exp(fit["log_now"]), now, rtol=1e-9)
+        np.testing.assert_allclose(hours_to_threshold(fit["rate"], fit["log_now"], 20.0),
+                                   np.log(now / 20.0) / [0.05, 0.02, 0.1])
+
+    def test_fit_starts_after_the_last_watering(self):
+        hours, before = drying(30, 0.2, 10)
+        after = 80 * np.exp(-0.05 * (hours[60:] - hours[60]))  # Watered 5h ago, then drying slower
+        fit = self.fit([(hours, np.r_[before[:60], after])])
+        self.assertAlmostEqual(fit["rate"][0], 0.05)
+        self.assertEqual(fit["samples"][0], len(after))
+
+    def test_too_little_history_or_no_drying(self):
+        flat = (np.arange(20) / 6.0, np.full(20, 40.0))
+        fit = self.fit([drying(60, 0.05, 0.25), flat])
+        self.assertFalse(fit["ok"][0])  # 15 minutes is below the minimum span
+        self.assertTrue(np.isinf(hours_to_threshold(fit["rate"][1:], fit["log_now"][1:], 20.0)[0]))
+        self.assertEqual(hours_to_threshold(np.array([0.1]), np.log([15.0]), 20.0)[0], 0.0)  # Already dry
+
+class TestMoistureForecaster(unittest.TestCase):
+    def setUp(self):
+        self.readings = RecentReadings(capacity=1024, hours=24)
+        self.forecaster = MoistureForecaster(self.readings)
+
+    def record(self, device_id, hours, values):
+        for h, m in zip(hours, values):
+            self.readings.record(device_id, NOW + timedelta(hours=float(h)), 21.0, float(m), 50.0)
+
+    def test_forecasts_and_fleet_ranking(self):
+        self.record("slow", *drying(60, 0.02, 6))
+        self.record("fast", *drying(60, 0.2, 3))
+        self.record("wet", *drying(90, 0.0, 3))
+        self.assertEqual(self.forecaster.refit(NOW), 3)
+
+        fast = self.forecaster.get("fast", now=NOW)
+        expected = np.log(60 * np.exp(-0.6) / 20) / 0.2
+        self.assertAlmostEqual(fast["hours_to_threshold"], expected, places=2)
+        self.assertEqual(fast["eta"], (NOW + timedelta(hours=expected)).isoformat())
+        later = self.forecaster.get("fast", now=NOW + timedelta(hours=1))
+        self.assertAlmostEqual(later["hours_to_threshold"], expected - 1, places=2)
+        self.assertGreater(self.forecaster.get("fast", threshold=30.0, now=NOW)["hours_to_threshold"], 0)
+
+        self.assertIsNone(self.forecaster.get("wet", now=NOW)["hours_to_threshold"])  # Not drying
+        self.assertIsNone(self.forecaster.get("unknown", now=NOW))
+        due = self.forecaster.due_within(48, now=NOW)
+        self.assertEqual([d["device_id"] for d in due], ["fast"])
+        self.assertEqual([d["device_id"] for d in self.forecaster.due_within(14 * 24, now=NOW)], ["fast", "slow"])
+
+    def test_refits_lazily(self):
+        self.assertIsNone(self.forecaster.get("p", now=NOW))
+        self.record("p", *drying(60, 0.1, 2))
+        self.assertIsNone(self.forecaster.get("p", now=NOW))  # Within FORECAST_REFIT_SECONDS
+        self.forecaster.clear()
+        self.assertIsNotNone(self.forecaster.get("p", now=NOW))
+
+if __name__ == "__main__":
+    unittest.main()
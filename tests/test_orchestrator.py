@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.messages import AIMessage
+
+class SlowChatModel(FakeListChatModel):
+    """Fake LLM that answers after `delay` seconds without blocking the event loop."""
+    delay: float = 0.0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responses[0]))])
+
+def fake_llm(content, delay=0.0):
+    return lambda tier="pro": SlowChatModel(responses=[content], delay=delay)
+
+class TestPotGraph(IsolatedAsyncioTestCase):
+    def build(self, sensor_delay=0.3, knowledge_delay=0.3, timeout=2.0):
+        from agents import orchestrator
+        settings = orchestrator.get_settings()
+        patches = [
+            patch.object(settings, "AGENT_NODE_TIMEOUT_SECONDS", timeout),
+            patch.object(settings, "SENSOR_AGENT_USE_LLM", True),
+            patch.object(settings, "KNOWLEDGE_AGENT_USE_LLM", True),
+            patch("agents.router_agent.get_llm", fake_llm("HEALTH")),
+            patch("agents.sensor_agent.get_llm", fake_llm("Soil is bone dry.", sensor_delay)),
+            patch("agents.knowledge_agent.get_llm", fake_llm("Basil loves water. [HEALTH]", knowledge_delay)),
+            patch("agents.conversation_agent.get_llm", fake_llm("Mood: thirsty | Priority: high | Reply: Water me!")),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        from agents.sensor_rules import sensor_rules
+        sensor_rules.load(rows=[])  # Default ranges, no database needed
+        from agents.knowledge_index import knowledge_index
+        knowledge_index.load(rows=[])
+        from services.reply_cache import reply_cache
+        from services.semantic_cache import semantic_cache
+        reply_cache.clear()
+        semantic_cache.clear()
+        return orchestrator.create_pot_graph()
+
+    def state(self, query):
+        return {
+            "device_id": "test_device", "species": "Basil", "user_query": query,
+            "sensor_data": {"temperature": 22.0, "moisture": 8.0, "light": 60.0},
+        }
+
+    async def test_experts_run_in_parallel(self):
+        graph = self.build(sensor_delay=0.5, knowledge_delay=0.5)
+        await graph.ainvoke(self.state("Are you thirsty?"))  # Warm-up (lazy imports, intent model training)
+        start = time.perf_counter()
+        result = await graph.ainvoke(self.state("Do you need water?"))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result["sensor_analysis"], "Soil is bone dry.")
+        self.assertIn("Basil loves water", result["plant_knowledge"])
+        self.assertEqual(result["conversation_response"], "Water me!")
+        self.assertLess(elapsed, 0.9)  # max(0.5, 0.5), not the 1.0 sum
+
+    async def test_simple_intent_skips_experts(self):
+        with patch("agents.sensor_agent.SensorAgent.arun") as sensor, patch("agents.knowledge_agent.KnowledgeAgent.arun") as knowledge:
+            graph = self.build()
+            result = await graph.ainvoke(self.state("Tell me a joke!"))
+        sensor.assert_not_called()
+        knowledge.assert_not_called()
+        self.assertTrue(result["sensor_analysis"].startswith("[CRITICAL]"))  # Local rules still see the dry soil
+        self.assertTrue(result["plant_knowledge"])
+        self.assertEqual(result["mood"], "thirsty")
+
+    async def test_timeout_degrades_to_local_context(self):
+        graph = self.build(sensor_delay=1.0, knowledge_delay=0.05, timeout=0.2)
+        result = await graph.ainvoke(self.state("Do you need water?"))
+        self.assertTrue(result["sensor_analysis"].startswith("[CRITICAL]"))
+        self.assertEqual(result["sensor_severity"], "critical")
+        self.assertIn("Basil loves water", result["plant_knowledge"])
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()
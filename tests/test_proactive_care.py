@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, UTC
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Conversation, Device, SensorReading
+from agents.sensor_rules import sensor_rules
+from agents.knowledge_index import knowledge_index
+from services.proactive_care import ProactiveCareWorker
+from services.reply_cache import reply_cache
+from services.semantic_cache import semantic_cache
+
+REPLY = "Mood: thirsty | Priority: high | Reply: Psst, it's your Basil. I'm parched, please water me!"
+
+class FakeTTS:
+    def __init__(self):
+        self.calls = []
+
+    async def synthesize_stream(self, text, volume_gain_db=0.0, **kwargs):
+        self.calls.append((text, volume_gain_db))
+        return b"ID3-fake-mp3"
+
+class TestProactiveCare(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        reply_cache.clear()
+        semantic_cache.clear()
+        sensor_rules.load(rows=[])
+        knowledge_index.load(rows=[])
+
+        self.engine = create_async_engine("sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with self.session() as session:
+            session.add(Device(id="pot_1", name="Pot 1", species="Basil"))
+            await session.commit()
+
+        self.tts = FakeTTS()
+        self.worker = ProactiveCareWorker(session_factory=self.session, tts_factory=lambda: self.tts)
+        self.storage = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage.cleanup)
+
+        llm = FakeListChatModel(responses=[REPLY])
+        p = patch("agents.conversation_agent.get_llm", lambda tier="pro": llm)
+        p.start()
+        self.addCleanup(p.stop)
+        p = patch.object(self.worker.settings, "STORAGE_PATH", self.storage.name)
+        p.start()
+        self.addCleanup(p.stop)
+
+    async def asyncTearDown(self):
+        await self.worker.stop()
+        await self.engine.dispose()
+
+    def session(self):
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    def reading(self, moisture):
+        return {"temperature": 22.0, "moisture": moisture, "light": 60.0}
+
+    async def test_alert_queues_presynthesized_audio(self):
+        self.assertTrue(self.worker.alert("pot_1", "Basil", self.reading(12.0), reading_id=7))
+        await self.worker.drain()
+
+        async with self.session() as session:
+            device = await session.get(Device, "pot_1")
+            convo = await session.get(Conversation, device.pending_audio_id)
+        self.assertEqual(device.last_notified_reading_id, 7)  # Served instead of the chime
+        self.assertIn("parched", convo.ai_response)
+        self.assertEqual(convo.mood, "thirsty")
+        with open(os.path.join(self.storage.name, convo.audio_file_path), "rb") as f:
+            self.assertEqual(f.read(), b"ID3-fake-mp3")
+        self.assertEqual(self.tts.calls[0][1], self.worker.settings.STREAM_VOLUME_GAIN_DB)
+
+    async def test_one_job_per_device_at_a_time(self):
+        self.assertTrue(self.worker.alert("pot_1", "Basil", self.reading(15.0)))
+        self.assertFalse(self.worker.alert("pot_1", "Basil", self.reading(14.0)))  # Already being prepared
+        await self.worker.drain()
+        self.assertTrue(self.worker.alert("pot_1", "Basil", self.reading(18.0)))
+        await self.worker.drain()
+        self.assertEqual(len(self.tts.calls), 2)
+        with patch.object(self.worker.settings, "PROACTIVE_CARE_ENABLED", False):
+            self.assertFalse(self.worker.alert("pot_1", "Basil", self.reading(10.0)))
+
+    async def test_holds_the_chime_only_for_fresh_engine_alerts(self):
+        now = datetime.now(UTC).replace(tzinfo=None)
+        self.assertTrue(self.worker.holds(SensorReading(device_id="pot_1", timestamp=now, event="alert:moisture_low")))
+        old = now - timedelta(seconds=self.worker.settings.PROACTIVE_ALERT_HOLD_SECONDS + 1)
+        self.assertFalse(self.worker.holds(SensorReading(device_id="pot_1", timestamp=old, event="alert:moisture_low")))
+        self.assertFalse(self.worker.holds(SensorReading(device_id="pot_1", timestamp=now, event="low_moisture_alert")))
+
+    async def test_does_not_clobber_pending_reply(self):
+        async with self.session() as session:
+            device = await session.get(Device, "pot_1")
+            device.pending_audio_id = 42
+            session.add(device)
+            await session.commit()
+
+        self.worker.alert("pot_1", "Basil", self.reading(5.0), reading_id=7)
+        await self.worker.drain()
+        async with self.session() as session:
+            device = await session.get(Device, "pot_1")
+            self.assertEqual(device.pending_audio_id, 42)
+            self.assertIsNone(device.last_notified_reading_id)  # The poll plays the chime instead
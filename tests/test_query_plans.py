@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, select
+from models import Conversation, Device, SensorReading, create_db_engine
+from migrations import run_migrations
+from services.reading_store import (
+    bulk_insert_readings, conversation_history_query, latest_alert_reading_query, latest_hardware_reading_query
+)
+from tests.db_utils import database_url_for_tests, reset_database
+
+class TestQueryPlans(unittest.TestCase):
+    """EXPLAIN regression test: the hot query shapes must keep hitting the migrated indexes."""
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.engine = create_db_engine(database_url_for_tests(cls.tmp.name))
+        reset_database(cls.engine)
+        SQLModel.metadata.create_all(cls.engine)
+
+        # A small fleet: alerts are rare, which is what makes the partial index worthwhile
+        start = datetime(2024, 5, 1)
+        devices = [Device(id=f"pot_{i}", name=f"Pot {i}", species="Basil", is_simulator=(i < 2)) for i in range(30)]
+        readings, convos = [], []
+        for d in devices:
+            for n in range(300):
+                readings.append({
+                    "device_id": d.id, "timestamp": start + timedelta(minutes=5 * n),
+                    "temperature": 22.0, "moisture": 15.0 if n % 100 == 0 else 45.0, "light": 50.0,
+                    "event": "alert:moisture_low" if n % 100 == 0 else None
+                })
+            convos.extend(Conversation(device_id=d.id, timestamp=start + timedelta(hours=n), ai_response="Hi!") for n in range(20))
+        with Session(cls.engine) as session:
+            session.add_all(devices)
+            session.commit()
+            session.add_all(convos)
+            session.commit()
+        bulk_insert_readings(readings, engine=cls.engine)
+        run_migrations(cls.engine)  # Migration 3 also refreshes planner statistics
+
+    @classmethod
+    def tearDownClass(cls):
+        reset_database(cls.engine)
+        cls.engine.dispose()
+        cls.tmp.cleanup()
+
+    def plan(self, statement) -> str:
+        sql = str(statement.compile(self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name == "postgresql":
+                # Compiled for the driver's paramstyle (LIKE '%' is escaped as '%%'), so hand it to the driver as is
+                return "\n".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql, {}))
+            return "\n".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+    def assertNoFullScan(self, plan: str, table: str):
+        for line in plan.splitlines():
+            self.assertNotRegex(line.strip(), rf"^(SCAN {table}$|.*Seq Scan on {table}\b)", plan)
+
+    def test_poll_alert_query_uses_partial_index(self):
+        plan = self.plan(latest_alert_reading_query("pot_7"))
+        self.assertIn("ix_sensorreading_alerts", plan)
+
+    def test_history_uses_conversation_composite_index(self):
+        plan = self.plan(conversation_history_query("pot_7"))
+        self.assertIn("ix_conversation_device_timestamp", plan)
+        self.assertNotIn("TEMP B-TREE", plan)  # ORDER BY comes straight off the index
+        page = self.plan(conversation_history_query("pot_7", before_id=100))
+        self.assertIn("ix_conversation_device_timestamp", page)
+        self.assertNoFullScan(page, "conversation")
+
+    def test_device_time_range_uses_reading_composite_index(self):
+        statement = (
+            select(SensorReading)
+            .where(SensorReading.device_id == "pot_7", SensorReading.timestamp >= datetime(2024, 5, 1, 12))
+            .order_by(SensorReading.timestamp)
+        )
+        self.assertIn("ix_sensorreading_device_timestamp", self.plan(statement))
+
+    def test_hardware_sync_query_avoids_full_scans(self):
+        for statement in (latest_hardware_reading_query(), latest_hardware_reading_query(since=datetime(2024, 5, 1, 20))):
+            plan = self.plan(statement)
+            self.assertNoFullScan(plan, "sensorreading")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session
+from models import Device, SensorReading, create_db_engine
+from services.recent_readings import DeviceRing, RecentReadings, recent_readings
+from tests.db_utils import database_url_for_tests, reset_database
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+class TestDeviceRing(unittest.TestCase):
+    def test_wraparound_keeps_newest_in_order(self):
+        ring = DeviceRing(capacity=4)
+        for i in range(6):
+            self.assertTrue(ring.append(float(i), (i, 10 * i, 0)))
+        ts, values = ring.ordered()
+        self.assertEqual(ts.tolist(), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(values[1].tolist(), [20.0, 30.0, 40.0, 50.0])
+        self.assertEqual(ring.window(3.5)[0].tolist(), [4.0, 5.0])
+        self.assertFalse(ring.append(1.0, (0, 0, 0)))  # Out of order -> stays sorted
+
+class TestRecentReadings(unittest.TestCase):
+    def setUp(self):
+        self.buffer = RecentReadings(capacity=64, hours=1.0)
+
+    def test_window_stats_match_numpy(self):
+        moisture = np.linspace(50, 40, 31)  # -10 % over 30 minutes
+        for i, m in enumerate(moisture):
+            self.buffer.record("p", NOW - timedelta(minutes=30 - i), 20.0 + i % 2, float(m), 60.0)
+
+        stats = self.buffer.stats("p", seconds=3600, now=NOW)
+        self.assertEqual(stats["count"], 31)
+        self.assertAlmostEqual(stats["moisture"]["mean"], moisture.mean(), places=3)
+        self.assertAlmostEqual(stats["moisture"]["std"], moisture.std(), places=3)
+        self.assertAlmostEqual(stats["moisture"]["slope_per_hour"], -20.0, places=3)
+        self.assertEqual((stats["temperature"]["min"], stats["temperature"]["max"]), (20.0, 21.0))
+        self.assertEqual(self.buffer.stats("p", seconds=300, now=NOW)["count"], 6)
+        self.assertEqual(self.buffer.stats("other")["count"], 0)
+
+    def test_quarantined_channel_is_skipped_not_the_reading(self):
+        self.buffer.extend([
+            {"device_id": "p", "timestamp": NOW - timedelta(minutes=10 - i), "temperature": -127.0,
+             "moisture": 30.0 - i, "light": 50.0, "event": "anomaly:temperature_range"}
+            for i in range(5)
+        ])
+        stats = self.buffer.stats("p", seconds=3600, now=NOW)
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual((stats["moisture"]["min"], stats["moisture"]["last"]), (26.0, 26.0))
+        self.assertAlmostEqual(stats["moisture"]["slope_per_hour"], -60.0, places=3)
+        self.assertIsNone(stats["temperature"]["mean"])
+        self.assertEqual(self.buffer.latest("p")["temperature"], None)
+        _, ts, moisture = self.buffer.batch("moisture", seconds=3600, now=NOW)
+        self.assertEqual(moisture[0].tolist(), [30.0, 29.0, 28.0, 27.0, 26.0])
+        self.assertEqual(self.buffer.batch("temperature", seconds=3600, now=NOW)[0], [])
+
+    def test_latest_hardware_skips_simulators_and_stale_readings(self):
+        self.buffer.set_simulator("sim", True)
+        self.buffer.record("sim", NOW, 30.0, 40.0, 50.0)
+        self.buffer.record("hw", NOW - timedelta(minutes=10), 21.5, 40.0, 50.0)
+        self.assertEqual(self.buffer.latest_hardware(since=NOW - timedelta(minutes=30))["device_id"], "hw")
+        self.assertIsNone(self.buffer.latest_hardware(since=NOW - timedelta(minutes=5)))
+
+class TestRecentReadingsFeed(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.engine = create_db_engine(database_url_for_tests(self.tmp.name))
+        self.addCleanup(self.engine.dispose)
+        reset_database(self.engine)
+        self.addCleanup(reset_database, self.engine)
+        SQLModel.metadata.create_all(self.engine)
+        recent_readings.clear()
+        self.addCleanup(recent_readings.clear)
+
+    def test_commits_feed_the_buffer_and_rollbacks_do_not(self):
+        now = datetime.utcnow()
+        with Session(self.engine) as session:
+            session.add(Device(id="sim_1", name="Sim", species="Basil", is_simulator=True))
+            session.add(Device(id="hw_1", name="HW", species="Basil"))
+            session.add(SensorReading(device_id="hw_1", timestamp=now, temperature=19.0, moisture=35.0, light=10.0))
+            session.commit()
+
+            session.add(SensorReading(device_id="hw_1", timestamp=now + timedelta(seconds=5), temperature=99.0, moisture=0.0, light=0.0))
+            session.flush()
+            session.rollback()
+
+        self.assertEqual(recent_readings.latest("hw_1")["temperature"], 19.0)
+        self.assertEqual(recent_readings.latest_hardware()["device_id"], "hw_1")
+
+        # Startup warm-load rebuilds the same view from the database
+        recent_readings.clear()
+        self.assertEqual(recent_readings.warm(self.engine), 1)
+        self.assertEqual(recent_readings.latest_hardware()["temperature"], 19.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.reply_cache import ReplyCache, normalize_query
+
+SENSORS = {"temperature": 24.3, "moisture": 45.0, "light": 62.0}
+
+class TestReplyCache(unittest.TestCase):
+    def reply(self, text):
+        return {"conversation_response": text, "mood": "happy", "priority": "low"}
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Hey, PLANT!! "), "hey plant")
+
+    def test_key_buckets_nearby_readings(self):
+        cache = ReplyCache(temp_band=2.0, moisture_band=10.0, light_band=10.0)
+        a = cache.make_key("Basil", "How are you?", SENSORS)
+        b = cache.make_key("basil", "how are you", {"temperature": 24.9, "moisture": 48.0, "light": 65.0})
+        c = cache.make_key("Basil", "how are you", {"temperature": 24.9, "moisture": 12.0, "light": 65.0})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_collects_variants_then_rotates(self):
+        cache = ReplyCache(ttl_seconds=60, max_entries=10, variants=2)
+        key = cache.make_key("Basil", "hey plant", SENSORS)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, self.reply("Hello!"))
+        self.assertIsNone(cache.get(key))  # still collecting variety
+        cache.put(key, self.reply("Hi there!"))
+        served = [cache.get(key)["conversation_response"] for _ in range(4)]
+        self.assertEqual(served, ["Hello!", "Hi there!", "Hello!", "Hi there!"])
+
+    def test_ttl_expiry(self):
+        cache = ReplyCache(ttl_seconds=0.0, variants=1)
+        key = cache.make_key("Cactus", "hey plant", SENSORS)
+        cache.put(key, self.reply("Howdy."))
+        self.assertIsNone(cache.get(key))
+
+    def test_lru_eviction_drops_audio(self):
+        cache = ReplyCache(ttl_seconds=60, max_entries=1, variants=1)
+        k1 = cache.make_key("Basil", "hey plant", SENSORS)
+        k2 = cache.make_key("Cactus", "hey plant", SENSORS)
+        cache.put(k1, self.reply("Basil here."))
+        cache.put_audio("Basil here.", b"mp3")
+        self.assertEqual(cache.get_audio("Basil here."), b"mp3")
+        cache.put(k2, self.reply("Cactus here."))
+        self.assertIsNone(cache.get(k1))
+        self.assertIsNone(cache.get_audio("Basil here."))
+
+    def test_audio_only_kept_for_cached_replies(self):
+        cache = ReplyCache(variants=1)
+        cache.put_audio("never cached", b"mp3")
+        self.assertIsNone(cache.get_audio("never cached"))
+
+if __name__ == "__main__":
+    unittest.main()
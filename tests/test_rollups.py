@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session, select
+from models import Device, SensorReading, SensorRollup, create_db_engine
+from services.reading_store import bulk_insert_readings, quarantine_event
+from services.rollups import aggregate, bucket_start, choose_resolution, rebuild
+from tests.db_utils import database_url_for_tests, reset_database
+
+T0 = datetime(2024, 5, 1, 10, 0, 0)
+
+class TestRollupMath(unittest.TestCase):
+    def test_bucket_start(self):
+        ts = datetime(2024, 5, 1, 10, 17, 42, 123)
+        self.assertEqual(bucket_start(ts, 60), datetime(2024, 5, 1, 10, 17))
+        self.assertEqual(bucket_start(ts, 3600), datetime(2024, 5, 1, 10))
+        self.assertEqual(bucket_start(ts, 86400), datetime(2024, 5, 1))
+
+    def test_aggregate_keeps_last_by_timestamp_not_arrival(self):
+        readings = [
+            {"device_id": "p", "timestamp": T0 + timedelta(seconds=30), "temperature": 21.0, "moisture": 10.0, "light": 5.0},
+            {"device_id": "p", "timestamp": T0, "temperature": 25.0, "moisture": 30.0, "light": 7.0},
+        ]
+        minute = next(r for r in aggregate(readings) if r["resolution"] == 60)
+        self.assertEqual(minute["count"], 2)
+        self.assertEqual((minute["moisture_min"], minute["moisture_max"], minute["moisture_sum"]), (10.0, 30.0, 40.0))
+        self.assertEqual(minute["moisture_last"], 10.0)
+
+    def test_choose_resolution(self):
+        self.assertEqual(choose_resolution(T0, T0 + timedelta(hours=2), 500), ("minute", 60))
+        self.assertEqual(choose_resolution(T0, T0 + timedelta(days=7), 500), ("hour", 3600))
+        self.assertEqual(choose_resolution(T0, T0 + timedelta(days=365), 500), ("day", 86400))
+
+class TestRollupMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.engine = create_db_engine(database_url_for_tests(self.tmp.name))
+        self.addCleanup(self.engine.dispose)
+        reset_database(self.engine)
+        self.addCleanup(reset_database, self.engine)
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add(Device(id="p", name="P", species="Basil"))
+            session.commit()
+
+    def rollups(self, resolution):
+        with Session(self.engine) as session:
+            rows = session.exec(select(SensorRollup).where(SensorRollup.resolution == resolution).order_by(SensorRollup.bucket)).all()
+            return [r.model_dump() for r in rows]
+
+    def test_orm_and_bulk_writes_match_a_full_rebuild(self):
+        with Session(self.engine) as session:
+            for i in range(5):
+                session.add(SensorReading(device_id="p", timestamp=T0 + timedelta(seconds=i), temperature=20.0, moisture=50.0 - i, light=1.0))
+            session.commit()
+        # Late batch upload overlapping the same buckets, older than what ingest saw
+        bulk_insert_readings([
+            {"device_id": "p", "timestamp": T0 - timedelta(minutes=m), "temperature": 30.0, "moisture": 90.0, "light": 2.0}
+            for m in range(90)
+        ], engine=self.engine)
+
+        hourly = self.rollups(3600)
+        self.assertEqual([r["count"] for r in hourly], [29, 60, 6])
+        self.assertEqual(hourly[-1]["moisture_last"], 46.0)
+        self.assertEqual(hourly[-1]["moisture_max"], 90.0)
+        self.assertEqual(self.rollups(86400)[0]["count"], 95)
+
+        incremental = {res: self.rollups(res) for res in (60, 3600, 86400)}
+        with self.engine.begin() as conn:
+            self.assertEqual(rebuild(conn, chunk_size=7), 95)
+        self.assertEqual({res: self.rollups(res) for res in (60, 3600, 86400)}, incremental)
+
+    def test_quarantined_channel_leaves_the_others_rolled_up(self):
+        dead = quarantine_event({"temperature": "range"})
+        with Session(self.engine) as session:
+            for i in range(5):
+                session.add(SensorReading(device_id="p", timestamp=T0 + timedelta(seconds=i), temperature=20.0 if i < 3 else -127.0,
+                                          moisture=50.0 - i, light=1.0, event=dead if i >= 3 else None))
+            session.commit()
+            # Merged into the existing bucket by the upsert: newer, but it has no temperature to offer
+            session.add(SensorReading(device_id="p", timestamp=T0 + timedelta(seconds=5), temperature=-127.0,
+                                      moisture=44.0, light=1.0, event=dead))
+            session.commit()
+
+        minute = self.rollups(60)[0]
+        self.assertEqual((minute["count"], minute["moisture_count"], minute["temperature_count"]), (6, 6, 3))
+        self.assertEqual((minute["moisture_min"], minute["moisture_last"]), (44.0, 44.0))
+        self.assertEqual((minute["temperature_min"], minute["temperature_last"]), (20.0, 20.0))
+
+        incremental = {res: self.rollups(res) for res in (60, 3600, 86400)}
+        with self.engine.begin() as conn:
+            self.assertEqual(rebuild(conn), 6)
+        self.assertEqual({res: self.rollups(res) for res in (60, 3600, 86400)}, incremental)
+
+if __name__ == "__main__":
+    unittest.main()
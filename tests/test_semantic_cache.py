@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.intent import classify_intent
+from services.reply_cache import ReplyCache
+from services.semantic_cache import SemanticCache
+
+SENSORS = {"temperature": 24.0, "moisture": 45.0, "light": 62.0}
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        self.keys = ReplyCache()
+        self.cache = SemanticCache(threshold=0.5, max_entries=50, ttl_seconds=60)
+        for query in ["do you need water", "tell me a joke", "who are you", "what is the ideal temperature",
+                      "do you like the sun"]:
+            self.add(query)
+
+    def add(self, query, cache=None, intent=None):
+        key = self.keys.make_key("Basil", query, SENSORS)
+        reply = {"conversation_response": f"Answer to {query}", "mood": "happy", "priority": "low"}
+        (cache or self.cache).add(key, reply, intent or classify_intent(query))
+
+    def lookup(self, query, species="Basil", sensors=SENSORS, intent=None):
+        return self.cache.lookup(self.keys.make_key(species, query, sensors), intent or classify_intent(query))
+
+    def test_paraphrase_hits(self):
+        hit = self.lookup("Are you thirsty?")
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit["conversation_response"], "Answer to do you need water")
+        self.assertEqual(hit["mood"], "happy")
+
+    def test_paraphrase_hits_in_a_large_cache(self):
+        from agents.intent import TRAINING_DATA
+        self.cache = SemanticCache(threshold=0.5, max_entries=1024, ttl_seconds=60)
+        for query in ["do you need water"] + [q for q, _ in TRAINING_DATA if q != "are you thirsty"]:
+            self.add(query)
+        hit = self.lookup("are you thirsty")
+        self.assertIsNotNone(hit)
+        self.assertIn("water", hit["conversation_response"])
+
+    def test_different_questions_on_the_same_topic_miss(self):
+        for asked, cached in [("is the water too much", "do you need water"),
+                              ("do you hate the sun", "do you like the sun")]:
+            hit = self.lookup(asked)
+            self.assertTrue(hit is None or hit["conversation_response"] != f"Answer to {cached}", asked)
+
+    def test_current_reading_and_ideal_range_miss(self):
+        # Kept apart by the query features even when both are routed to the same intent
+        for intent in (None, "HEALTH", "KNOWLEDGE"):
+            self.add("what is the ideal temperature", intent=intent)
+            hit = self.lookup("what is the temperature right now", intent=intent)
+            self.assertTrue(hit is None or "ideal" not in hit["conversation_response"], intent)
+
+    def test_scope_includes_intent(self):
+        self.assertIsNotNone(self.lookup("are you thirsty", intent="HEALTH"))
+        self.assertIsNone(self.lookup("are you thirsty", intent="KNOWLEDGE"))
+
+    def test_unrelated_query_misses(self):
+        self.assertIsNone(self.lookup("what time is it"))
+
+    def test_opposite_questions_miss(self):
+        pairs = [("is the soil too wet", "is the soil too dry"), ("are you too hot", "are you too cold"),
+                 ("do you need more light", "do you need less light"), ("are you cold", "are you not cold")]
+        for asked, opposite in pairs + [(b, a) for a, b in pairs]:
+            self.add(asked)
+            hit = self.lookup(opposite)
+            self.assertTrue(hit is None or hit["conversation_response"] != f"Answer to {asked}", opposite)
+
+    def test_scope_is_species_and_sensor_bands(self):
+        self.assertIsNone(self.lookup("are you thirsty", species="Cactus"))
+        self.assertIsNone(self.lookup("are you thirsty", sensors={"temperature": 24.0, "moisture": 5.0, "light": 62.0}))
+
+    def test_exact_repeat_is_left_to_reply_cache(self):
+        self.assertIsNone(self.lookup("do you need water"))
+
+    def test_stats(self):
+        self.lookup("are you thirsty")
+        self.lookup("what time is it", intent="HEALTH")  # Scored against the health questions
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["similarity"]["samples"], 2)
+        self.assertEqual(sum(stats["similarity"]["histogram"].values()), 2)
+
+    def test_capacity(self):
+        cache = SemanticCache(threshold=0.0, max_entries=2, ttl_seconds=60)
+        for query in ["one", "two", "three"]:
+            self.add(query, cache, intent="AMBIGUOUS")
+        self.assertEqual(cache.stats()["entries"], 2)
+        hit = cache.lookup(self.keys.make_key("Basil", "three two one", SENSORS), "AMBIGUOUS")
+        self.assertEqual(hit["conversation_response"], "Answer to three")  # "one" was overwritten
+        self.assertEqual(cache._tf.shape, (2, cache.vectorizer.dim))  # Preallocated, never grown
+
+    def test_expired_slots_are_reused(self):
+        cache = SemanticCache(threshold=0.0, max_entries=2, ttl_seconds=0)
+        self.add("one", cache, intent="AMBIGUOUS")
+        self.assertIsNone(cache.lookup(self.keys.make_key("Basil", "one two", SENSORS), "AMBIGUOUS"))
+        self.add("two", cache, intent="AMBIGUOUS")
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache._by_scope[cache._scope(self.keys.make_key("Basil", "two", SENSORS), "AMBIGUOUS")], {"two": 0})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from models import PlantIdealRange
+from agents.sensor_rules import SensorRuleEngine, parse_ideal_ranges
+
+SEED_TIPS = {
+    "Basil": "Requires 6-8 hours of sun. Soil should be consistently moist but not soggy. Ideal temp: 21-30C.",
+    "Cactus": "Needs bright direct light. Only water when soil is bone dry. Ideal temp: 18-35C.",
+    "Peace Lily": "Prefers low to medium indirect light. Loves humidity. Ideal temp: 18-27C.",
+}
+
+def rows():
+    out = []
+    for species, tips in SEED_TIPS.items():
+        r = parse_ideal_ranges(tips)
+        out.append(PlantIdealRange(
+            species=species, temp_min=r["temperature"][0], temp_max=r["temperature"][1],
+            moisture_min=r["moisture"][0], moisture_max=r["moisture"][1],
+            light_min=r["light"][0], light_max=r["light"][1]))
+    return out
+
+class TestSensorRules(unittest.TestCase):
+    def setUp(self):
+        self.engine = SensorRuleEngine()
+        self.engine.load(rows())
+
+    def test_parse_care_tips(self):
+        basil = parse_ideal_ranges(SEED_TIPS["Basil"])
+        self.assertEqual(basil["temperature"], (21.0, 30.0))
+        self.assertEqual(basil["moisture"], (40.0, 75.0))
+        cactus = parse_ideal_ranges(SEED_TIPS["Cactus"])
+        self.assertEqual(cactus["moisture"], (5.0, 35.0))
+        self.assertEqual(cactus["light"], (60.0, 100.0))
+
+    def test_analysis_text_and_severity(self):
+        ok = self.engine.analyze("basil", {"temperature": 25.0, "moisture": 55.0, "light": 80.0})
+        self.assertEqual(ok["sensor_severity"], "ok")
+        dry = self.engine.analyze("Basil", {"temperature": 25.0, "moisture": 10.0, "light": 80.0})
+        self.assertEqual(dry["sensor_severity"], "critical")
+        self.assertIn("Moisture 10.0% is critically low (ideal 40-75%)", dry["sensor_analysis"])
+
+    def test_unavailable_channel_is_not_scored(self):
+        result = self.engine.analyze("Basil", {"temperature": None, "moisture": 55.0, "light": 80.0})
+        self.assertEqual(result["sensor_severity"], "ok")
+        self.assertIn("Temperature reading unavailable (sensor fault).", result["sensor_analysis"])
+
+    def test_same_reading_differs_by_species(self):
+        reading = {"temperature": 25.0, "moisture": 20.0, "light": 80.0}
+        self.assertEqual(self.engine.analyze("Cactus", reading)["sensor_severity"], "ok")
+        self.assertNotEqual(self.engine.analyze("Basil", reading)["sensor_severity"], "ok")
+
+    def test_unknown_species_uses_defaults(self):
+        result = self.engine.analyze("Triffid", {"temperature": 22.0, "moisture": 50.0, "light": 50.0})
+        self.assertEqual(result["sensor_severity"], "ok")
+
+    def test_fleet_evaluation_is_vectorized(self):
+        n = 10000
+        species = ["Basil", "Cactus", "Peace Lily", "Unknown"] * (n // 4)
+        readings = np.column_stack([np.full(n, 25.0), np.linspace(0, 100, n), np.full(n, 50.0)])
+        start = time.perf_counter()
+        deviation, severity = self.engine.evaluate(species, readings)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(severity.shape, (n, 3))
+        self.assertLess(elapsed, 0.5)
+
+if __name__ == "__main__":
+    unittest.main()
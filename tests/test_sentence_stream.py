@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.sentence_stream import SentenceStreamer
+
+def run(text, chunk_size=3):
+    streamer = SentenceStreamer()
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events.extend(streamer.feed(text[i:i + chunk_size]))
+    events.extend(streamer.finish())
+    return events
+
+def sentences(events):
+    return [e["text"] for e in events if e["type"] == "sentence"]
+
+class TestSentenceStreamer(unittest.TestCase):
+    def test_metadata_first(self):
+        events = run("Mood: Thirsty | Priority: HIGH | Reply: I need water. Please hurry!")
+        self.assertEqual(events[0], {"type": "metadata", "mood": "thirsty", "priority": "high"})
+        self.assertEqual(sentences(events), ["I need water.", "Please hurry!"])
+
+    def test_metadata_emitted_when_header_closes(self):
+        streamer = SentenceStreamer()
+        self.assertEqual(streamer.feed("Mood: happy | Priority: low | Rep"), [])
+        self.assertEqual(streamer.feed("ly: Hel"), [{"type": "metadata", "mood": "happy", "priority": "low"}])
+
+    def test_no_false_splits(self):
+        text = ("Mood: happy | Priority: low | Reply: It's 21.5C in here, which is lovely. "
+                "Dr. Green says hi... and so do I. Hmm... Let me think! Basil (approx. 30cm) loves sun.")
+        self.assertEqual(sentences(run(text)), [
+            "It's 21.5C in here, which is lovely.",
+            "Dr. Green says hi... and so do I.",
+            "Hmm...",
+            "Let me think!",
+            "Basil (approx. 30cm) loves sun.",
+        ])
+
+    def test_chunking_does_not_matter(self):
+        text = "Mood: sunny | Priority: low | Reply: First one. Second one?! Third... fourth. Fifth"
+        expected = sentences(run(text, chunk_size=1000))
+        for size in (1, 2, 5, 7):
+            self.assertEqual(sentences(run(text, chunk_size=size)), expected)
+        self.assertEqual(expected, ["First one.", "Second one?!", "Third... fourth.", "Fifth"])
+
+    def test_sentence_emitted_before_stream_ends(self):
+        streamer = SentenceStreamer()
+        streamer.feed("Mood: happy | Priority: low | Reply: Hello there. ")
+        self.assertEqual(sentences(streamer.feed("I")), ["Hello there."])
+
+    def test_missing_header(self):
+        events = run("I am a cactus. Leave me alone.")
+        self.assertEqual(events[0]["mood"], "neutral")
+        self.assertEqual(sentences(events), ["I am a cactus.", "Leave me alone."])
+
+    def test_header_never_closed(self):
+        events = run("Mood: grumpy | Priority: medium | Hi.")
+        self.assertEqual(events[0]["mood"], "grumpy")
+        self.assertEqual(sentences(events), ["Hi."])
+
+if __name__ == "__main__":
+    unittest.main()
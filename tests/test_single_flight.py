@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from services.single_flight import SingleFlight, fingerprint
+
+class TestSingleFlight(IsolatedAsyncioTestCase):
+    async def test_concurrent_duplicates_share_one_call(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return b"mp3"
+
+        key = fingerprint("Hello there.", -2.0)
+        results = await asyncio.gather(*[flight.do("tts", key, work) for _ in range(5)])
+        self.assertEqual(results, [b"mp3"] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(flight.stats()["tts"], {"calls": 5, "executed": 1, "coalesced": 4})
+        self.assertEqual(flight.in_flight(), 0)
+
+        # Sequential calls are not coalesced
+        await flight.do("tts", key, work)
+        self.assertEqual(calls, 2)
+
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("TTS down")
+
+        results = await asyncio.gather(*[flight.do("tts", "k", boom) for _ in range(3)], return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_waiter_timeout_does_not_cancel_shared_call(self):
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            return "done"
+
+        impatient = asyncio.wait_for(flight.do("llm", "k", slow), timeout=0.01)
+        patient = flight.do("llm", "k", slow)
+        results = await asyncio.gather(impatient, patient, return_exceptions=True)
+        self.assertIsInstance(results[0], asyncio.TimeoutError)
+        self.assertEqual(results[1], "done")
+
+    async def test_conversation_agent_coalesces_identical_prompts(self):
+        from agents.conversation_agent import ConversationAgent
+        from services.reply_cache import reply_cache
+        from services.semantic_cache import semantic_cache
+        reply_cache.clear()
+        semantic_cache.clear()
+
+        llm = FakeListChatModel(responses=["Mood: happy | Priority: low | Reply: Hi friend."], sleep=0.01)
+        calls = 0
+        original = llm._astream
+
+        async def counting_astream(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            async for chunk in original(*args, **kwargs):
+                yield chunk
+
+        with patch("agents.conversation_agent.get_llm", lambda tier="pro": llm), \
+                patch.object(FakeListChatModel, "_astream", lambda self, *a, **k: counting_astream(*a, **k)):
+            agent = ConversationAgent()
+            state = {"device_id": "d", "species": "Basil", "user_query": "hey plant",
+                     "sensor_data": {"temperature": 22.0, "moisture": 50.0, "light": 60.0}}
+            results = await asyncio.gather(agent.run(dict(state)), agent.run(dict(state)))
+        self.assertEqual(calls, 1)
+        self.assertEqual([r["conversation_response"] for r in results], ["Hi friend."] * 2)
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()